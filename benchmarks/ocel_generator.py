@@ -0,0 +1,121 @@
+import argparse
+import json
+import sys
+from datetime import datetime, timedelta
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+# Synthetic object-centric event logs (OCEL 1.0, .jsonocel) of configurable size, used by the benchmarks.
+# Usage: python ocel_generator.py --events 10000 --objects 3000 > synthetic.jsonocel
+
+START_TIME = datetime(2023, 1, 1)
+MEAN_EVENT_GAP_MINUTES = 10
+# Standard deviation of the object choice around an event's position, in objects. Objects are related to events
+# close in time, such that process executions (connected components) stay bounded as the log grows.
+OBJECT_SPREAD = 2.0
+
+
+def generate_ocel(events: int = 10000,
+                  objects: int = 3000,
+                  object_types: int = 3,
+                  activities: int = 8,
+                  objects_per_event: float = 2.0,
+                  seed: int = 0) -> Dict:
+    """
+    Generates a synthetic object-centric event log.
+    Each activity has a primary object type, related to every event of the activity.
+    Further objects of random types are added such that events relate to objects_per_event objects on average.
+    Activity frequencies follow a Zipf distribution, objects are distributed evenly over the object types.
+    :param events: The number of events
+    :param objects: The number of objects
+    :param object_types: The number of object types
+    :param activities: The number of activities
+    :param objects_per_event: The mean number of objects related to an event (at least 1)
+    :param seed: Seed of the random number generator
+    :return: The event log as a JSON-serializable dict
+    """
+    if object_types < 1 or activities < 1 or events < 1 or objects < object_types:
+        raise ValueError("At least one event, activity and object type, and one object per type are required.")
+    rng = np.random.default_rng(seed)
+    ot_names = [f"type_{i}" for i in range(object_types)]
+    act_names = [f"activity_{i}" for i in range(activities)]
+
+    # Objects, distributed evenly over the object types
+    ot_sizes = np.full(object_types, objects // object_types)
+    ot_sizes[:objects % object_types] += 1
+    ot_offsets = np.concatenate([[0], np.cumsum(ot_sizes)[:-1]])
+    object_ids = np.array([f"o{i}" for i in range(objects)], dtype=object)
+    object_ots = np.repeat(np.arange(object_types), ot_sizes)
+
+    # Events, ordered by time
+    weights = 1 / np.arange(1, activities + 1)
+    event_acts = rng.choice(activities, size=events, p=weights / weights.sum())
+    gaps = rng.exponential(MEAN_EVENT_GAP_MINUTES * 60, size=events)
+    event_times = [START_TIME + timedelta(seconds=float(s)) for s in np.cumsum(gaps).round()]
+
+    # Object slots: the first slot of each event has the activity's primary type, further slots random types
+    num_slots = 1 + rng.poisson(max(0.0, objects_per_event - 1), size=events)
+    slot_events = np.repeat(np.arange(events), num_slots)
+    first_slot = np.zeros(len(slot_events), dtype=bool)
+    first_slot[np.concatenate([[0], np.cumsum(num_slots)[:-1]])] = True
+    slot_ots = np.where(first_slot, event_acts[slot_events] % object_types,
+                        rng.integers(0, object_types, size=len(slot_events)))
+
+    # Choose objects close to the event's relative position within each type
+    position = slot_events / max(1, events - 1) * (ot_sizes[slot_ots] - 1)
+    position = position + rng.normal(0, OBJECT_SPREAD, size=len(slot_events))
+    index = np.clip(np.rint(position), 0, ot_sizes[slot_ots] - 1).astype(np.int64)
+    relations = pd.DataFrame({"event": slot_events, "object": ot_offsets[slot_ots] + index}).drop_duplicates()
+    omaps = relations.groupby("event", sort=True)["object"].agg(list)
+
+    costs = rng.integers(1, 100, size=events)
+    log_events = {
+        f"e{e}": {
+            "ocel:activity": act_names[event_acts[e]],
+            "ocel:timestamp": event_times[e].isoformat(),
+            "ocel:omap": object_ids[omaps[e]].tolist(),
+            "ocel:vmap": {"cost": int(costs[e])}
+        } for e in range(events)
+    }
+    log_objects = {oid: {"ocel:type": ot_names[ot], "ocel:ovmap": {}} for oid, ot in zip(object_ids, object_ots)}
+    return {
+        "ocel:global-event": {"ocel:activity": "__INVALID__"},
+        "ocel:global-object": {"ocel:type": "__INVALID__"},
+        "ocel:global-log": {
+            "ocel:attribute-names": ["cost"],
+            "ocel:object-types": ot_names,
+            "ocel:version": "1.0",
+            "ocel:ordering": "timestamp"
+        },
+        "ocel:events": log_events,
+        "ocel:objects": log_objects
+    }
+
+
+def write_ocel(log: Dict, path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(log, f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generates a synthetic object-centric event log (.jsonocel).")
+    parser.add_argument("--events", type=int, default=10000)
+    parser.add_argument("--objects", type=int, default=3000)
+    parser.add_argument("--object-types", type=int, default=3)
+    parser.add_argument("--activities", type=int, default=8)
+    parser.add_argument("--objects-per-event", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    args = parser.parse_args(argv)
+    log = generate_ocel(events=args.events, objects=args.objects, object_types=args.object_types,
+                        activities=args.activities, objects_per_event=args.objects_per_event, seed=args.seed)
+    if args.output:
+        write_ocel(log, args.output)
+    else:
+        json.dump(log, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
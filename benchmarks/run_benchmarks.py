@@ -0,0 +1,252 @@
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, List
+
+BENCHMARK_DIR = Path(__file__).resolve().parent
+SRC_DIR = BENCHMARK_DIR.parent / "src"
+sys.path.insert(0, str(SRC_DIR))
+sys.path.insert(0, str(BENCHMARK_DIR))
+
+from ocel_generator import generate_ocel, write_ocel
+from model.constants import BACKEND_PM4PY, SNAPSHOT_DIR
+
+# Scaling benchmarks of the model operations on synthetic event logs, reported as JSON.
+# Usage: python run_benchmarks.py --events 1000 10000 -o results.json [--compare baseline.json]
+
+OPERATIONS = ["import", "import_snapshot", "filter", "heatmap", "extended_table", "petri_net", "ocpa_conversion",
+              "opera", "variants"]
+# Ratio of the median times (current / baseline) reported as a regression when comparing results
+REGRESSION_THRESHOLD = 1.2
+
+logger = logging.getLogger("app_logger")
+
+
+class Benchmark:
+    """
+    Runs the model operations on one event log, in a fresh model without persistent caching.
+    Each operation is timed on repeated runs with cleared result caches. The peak memory allocated during an
+    operation is measured in an additional run with tracemalloc enabled, since tracing slows down the computation.
+    """
+
+    def __init__(self, path: Path, repeat: int = 3, measure_memory: bool = True):
+        self.path = path
+        self.repeat = repeat
+        self.measure_memory = measure_memory
+        self.dataset = {"dataset": str(path), "execution_extraction": "connected_components"}
+        self.model = None
+
+    def _clear_snapshot(self):
+        shutil.rmtree(SNAPSHOT_DIR, ignore_errors=True)
+
+    def _load(self):
+        from model.model import Model
+        self.model = Model(self.dataset, use_persistent_cache=False)
+        self.model.init_ocel(self.dataset, backend=BACKEND_PM4PY)
+
+    def _filter(self):
+        model = self.model
+        all_ot, all_activities = sorted(model.object_types), sorted(model.activities)
+        model.active_ot = all_ot[:max(1, len(all_ot) - 1)]
+        model.active_activities = all_activities[:max(1, len(all_activities) - 1)]
+        model.filter_ocel()
+        # Restore the unfiltered event log from the filter state cache, keeping the filtered state out of it
+        model.active_ot, model.active_activities = all_ot, all_activities
+        model.filter_ocel()
+        model._filter_states.clear()
+
+    def _reset(self):
+        """
+        Clears the result cache, the intermediate results of the event log and the incremental OPerA caches,
+        and drops the ocpa event log
+        """
+        from model.ocel import opera
+        self.model.reset_cache()
+        self.model._ocels[0]._executions = None
+        opera._starts_cache.clear()
+        opera._partials_cache.clear()
+        del self.model._ocels[1:]
+
+    def _variants(self):
+        _ = self.model.cases, self.model.variants, self.model.variant_frequencies
+
+    def operations(self) -> Dict[str, Dict]:
+        """ Maps operation names to the operation and a setup function, called before every run """
+        return {
+            "import": {"func": self._load, "setup": self._clear_snapshot},
+            "import_snapshot": {"func": self._load, "setup": lambda: None},
+            "filter": {"func": self._filter, "setup": self._reset},
+            "heatmap": {"func": lambda: self.model.compute_heatmap(), "setup": self._reset},
+            "extended_table": {"func": lambda: self.model.extended_table, "setup": self._reset},
+            "petri_net": {"func": lambda: self.model.compute_petri_net(), "setup": self._reset},
+            "ocpa_conversion": {"func": lambda: self.model.duplicate_first_to_ocpa(self.model._ocels),
+                                "setup": self._reset},
+            "opera": {"func": lambda: self.model.compute_opera(), "setup": self._reset},
+            "variants": {"func": self._variants, "setup": self._reset},
+        }
+
+    def run(self, operations: List[str]) -> Dict[str, Dict]:
+        specs = self.operations()
+        results = {}
+        # Importing is required by all other operations
+        for name in ["import"] + [op for op in operations if op != "import"]:
+            if name not in specs:
+                continue
+            try:
+                results[name] = self._measure(specs[name]["func"], specs[name]["setup"])
+            except Exception as e:
+                results[name] = {"error": f"{type(e).__name__}: {e}"}
+            logger.info(f"{self.path.name} {name}: {results[name]}")
+        return {name: result for name, result in results.items() if name in operations}
+
+    def _measure(self, func: Callable, setup: Callable) -> Dict:
+        times, cpu_times = [], []
+        for _ in range(self.repeat):
+            setup()
+            gc.collect()
+            t0, c0 = time.perf_counter(), time.process_time()
+            func()
+            times.append(time.perf_counter() - t0)
+            cpu_times.append(time.process_time() - c0)
+        result = {
+            "times": times,
+            "min": min(times),
+            "median": statistics.median(times),
+            "cpu_median": statistics.median(cpu_times),
+        }
+        if self.measure_memory:
+            setup()
+            gc.collect()
+            tracemalloc.start()
+            try:
+                func()
+                result["peak_memory"] = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+        return result
+
+
+def log_statistics(path: Path) -> Dict:
+    with open(path, encoding="utf-8") as f:
+        log = json.load(f)
+    events = log["ocel:events"].values()
+    return {
+        "file_size": os.path.getsize(path),
+        "events": len(log["ocel:events"]),
+        "objects": len(log["ocel:objects"]),
+        "relations": sum(len(e["ocel:omap"]) for e in events),
+    }
+
+
+def environment() -> Dict:
+    versions = {}
+    for module in ["numpy", "pandas", "pm4py", "ocpa", "networkx", "pyarrow"]:
+        try:
+            versions[module] = __import__(module).__version__
+        except Exception:
+            versions[module] = None
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=BENCHMARK_DIR, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "versions": versions,
+    }
+
+
+def compare(results: Dict, baseline: Dict) -> List[str]:
+    """ Lists the operations whose median time changed notably compared to a baseline result file """
+    lines = []
+    baseline_runs = {json.dumps(run["config"], sort_keys=True): run for run in baseline["runs"]}
+    for run in results["runs"]:
+        base = baseline_runs.get(json.dumps(run["config"], sort_keys=True))
+        if base is None:
+            continue
+        for name, result in run["operations"].items():
+            base_result = base["operations"].get(name, {})
+            if "median" not in result or "median" not in base_result or base_result["median"] <= 0:
+                continue
+            ratio = result["median"] / base_result["median"]
+            status = "REGRESSION" if ratio > REGRESSION_THRESHOLD else \
+                "improvement" if ratio < 1 / REGRESSION_THRESHOLD else ""
+            lines.append(f"{run['config']['events']:>9} events  {name:<16} {base_result['median']:>9.3f}s -> "
+                         f"{result['median']:>9.3f}s  x{ratio:.2f}  {status}")
+    return lines
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks the model operations on synthetic event logs.")
+    parser.add_argument("--events", type=int, nargs="+", default=[1000, 3000, 10000],
+                        help="Log sizes (number of events) to benchmark")
+    parser.add_argument("--objects-ratio", type=float, default=0.3,
+                        help="Number of objects per event of the log (default: 0.3)")
+    parser.add_argument("--object-types", type=int, default=3)
+    parser.add_argument("--activities", type=int, default=8)
+    parser.add_argument("--objects-per-event", type=float, default=2.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--operations", nargs="+", choices=OPERATIONS, default=OPERATIONS)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per operation (default: 3)")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the memory measurement runs")
+    parser.add_argument("-o", "--output", help="Output file (default: stdout)")
+    parser.add_argument("--compare", help="Result file of a previous version to compare against")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print log messages")
+    args = parser.parse_args(argv)
+
+    logger.propagate = False
+    if args.verbose:
+        logger.addHandler(logging.StreamHandler())
+        logger.setLevel(logging.INFO)
+    output = Path(args.output).resolve() if args.output else None
+    baseline_path = Path(args.compare).resolve() if args.compare else None
+
+    results = {"environment": environment(), "runs": []}
+    with tempfile.TemporaryDirectory() as workdir:
+        # The model uses paths relative to the src folder, keep its snapshots and caches in the temporary directory
+        os.makedirs(Path(workdir) / "src")
+        os.chdir(Path(workdir) / "src")
+        for events in args.events:
+            config = {
+                "events": events,
+                "objects": max(args.object_types, int(events * args.objects_ratio)),
+                "object_types": args.object_types,
+                "activities": args.activities,
+                "objects_per_event": args.objects_per_event,
+                "seed": args.seed,
+            }
+            path = Path(workdir) / f"synthetic_{events}.jsonocel"
+            write_ocel(generate_ocel(**config), str(path))
+            print(f"Benchmarking {events} events ...", file=sys.stderr)
+            operations = Benchmark(path, repeat=args.repeat, measure_memory=not args.no_memory).run(args.operations)
+            results["runs"].append({"config": config, "log": log_statistics(path), "operations": operations})
+
+    text = json.dumps(results, indent=2)
+    if output is not None:
+        output.write_text(text)
+    else:
+        print(text)
+    if baseline_path is not None:
+        with open(baseline_path) as f:
+            print("\n".join(compare(results, json.load(f))), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
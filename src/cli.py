@@ -0,0 +1,232 @@
+import argparse
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+from model.constants import *
+from model.execution import execution_scope
+from model import instrumentation
+from controller.export import Export
+
+CONN_COMP = "connected_components"
+LEAD_TYPE = "leading_type"
+
+# Analysis results that can be computed headlessly, in their default order
+ARTIFACTS = ["petri_net", "opera", "variants", "heatmap"]
+OCPA_ARTIFACTS = ["opera", "variants"]  # The Petri net and heatmap are computed on pm4py event logs
+
+logger = logging.getLogger("app_logger")
+
+# Headless batch mode: computes the analysis results of the app for an event log and writes them to a directory.
+# Usage (from the src folder): python cli.py ../data/datasets/recruiting.jsonocel -o ../export
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        prog="cli.py",
+        description="Computes analysis results of an object-centric event log without the user interface.")
+    parser.add_argument("log", help="Path to the event log (.jsonocel)")
+    parser.add_argument("-o", "--output", default="../export",
+                        help="Output directory (created if missing, default: ../export)")
+    parser.add_argument("-a", "--artifacts", nargs="+", choices=ARTIFACTS,
+                        help="Analysis results to compute (default: all supported by the backend)")
+    parser.add_argument("--object-types", nargs="+", metavar="OT",
+                        help="Only keep these object types (default: all)")
+    parser.add_argument("--activities", nargs="+", metavar="ACT",
+                        help="Only keep these activities (default: all)")
+    parser.add_argument("--execution-extraction", choices=[CONN_COMP, LEAD_TYPE], default=CONN_COMP,
+                        help="Extraction of process executions (default: connected components)")
+    parser.add_argument("--leading-type", help="Leading object type, required for leading type extraction")
+    parser.add_argument("--sample", type=float, metavar="FRACTION",
+                        help="Analyze a stratified sample of this fraction of the process executions (default: all)")
+    parser.add_argument("--backend", choices=[BACKEND_PM4PY, BACKEND_OCPA], default=BACKEND_PM4PY,
+                        help="Event log backend (filters are only supported for pm4py, default: pm4py)")
+    parser.add_argument("--execution", choices=[EXECUTION_THREAD, EXECUTION_PROCESS], default=EXECUTION_PROCESS,
+                        help="Run the computations in threads or in worker processes (default: process)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Do not cache anything on disk (results, event log snapshots, file fingerprints)")
+    parser.add_argument("--trace", metavar="FILE",
+                        help="Record the computations and save them as trace events (.json, e.g. for chrome://tracing)")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print log messages")
+    args = parser.parse_args(argv)
+    if args.execution_extraction == LEAD_TYPE and not args.leading_type:
+        parser.error("--leading-type is required for leading type extraction")
+    if args.backend != BACKEND_PM4PY and (args.object_types or args.activities or args.sample):
+        parser.error("filters and sampling are only supported for the pm4py backend")
+    supported = ARTIFACTS if args.backend == BACKEND_PM4PY else OCPA_ARTIFACTS
+    if args.artifacts is None:
+        args.artifacts = supported
+    elif set(args.artifacts) - set(supported):
+        parser.error(f"the {args.backend} backend only supports the artifacts {', '.join(supported)}")
+    if args.sample is not None and not 0 < args.sample <= 1:
+        parser.error("--sample must be in (0, 1]")
+    return args
+
+
+class StageTimer:
+    """ Measures the wall time of named stages, possibly running in parallel """
+
+    def __init__(self):
+        self.timings: Dict[str, float] = {}
+        self.failures: Dict[str, str] = {}
+        self._t0 = time.perf_counter()
+
+    def run(self, stage: str, func, *args):
+        t0 = time.perf_counter()
+        try:
+            return func(*args)
+        except Exception as e:
+            self.failures[stage] = f"{type(e).__name__}: {e}"
+            logger.debug(f"Stage '{stage}' failed", exc_info=True)
+            return None
+        finally:
+            self.timings[stage] = time.perf_counter() - t0
+
+    def report(self):
+        width = max([len(stage) for stage in self.timings] + [5])
+        print(f"{'stage':<{width}}  {'time [s]':>9}")
+        for stage, duration in self.timings.items():
+            status = f"  FAILED ({self.failures[stage]})" if stage in self.failures else ""
+            print(f"{stage:<{width}}  {duration:>9.3f}{status}")
+        print(f"{'total':<{width}}  {time.perf_counter() - self._t0:>9.3f}")
+
+
+def export_to(directory: Path, export: Export) -> Path:
+    """ Executes an export to a fixed path inside the output directory (no dialog) """
+    export.path = directory / f"{export.name}.{export.ext}"
+    if not export.execute():
+        raise RuntimeError(f"Export '{export.name}' was not executed")
+    return export.path
+
+
+def compute_petri_net(model, workdir: str) -> List[Export]:
+    from view import rendering
+    ocpn = model.compute_petri_net()
+    opera_kpis = model.compute_opera()
+    path = rendering.render_petri_net(ocpn, opera_kpis["lagging_time"], opera_kpis["pooling_time"],
+                                      filename=os.path.join(workdir, "ocpn.png"))
+    return [Export("petrinet", "png", copy_from_path=path, use_dialog=False)]
+
+
+def compute_opera(model, workdir: str) -> List[Export]:
+    dfs = model.compute_opera()
+    return [Export(f"opera_{measure}_{agg}", "csv", write_to_path=df.to_csv, use_dialog=False)
+            for measure, aggs in dfs.items() for agg, df in aggs.items()]
+
+
+def compute_variants(model, workdir: str) -> List[Export]:
+    cases = model.cases
+    frequencies = model.variant_frequencies
+
+    def write_variants(f):
+        f.write("variant,frequency\n")
+        for variant, frequency in sorted(frequencies.items(), key=lambda item: -item[1]):
+            f.write(f"{variant},{frequency}\n")
+
+    def write_cases(f):
+        json.dump([sorted(case) for case in cases], f, default=str)
+
+    return [Export("variants", "csv", write_to_file=write_variants, use_dialog=False),
+            Export("cases", "json", write_to_file=write_cases, use_dialog=False)]
+
+
+def compute_heatmap(model, workdir: str) -> List[Export]:
+    number_matrix, _ = model.compute_heatmap()
+    dfs = model.compute_opera()
+    exports = [Export("heatmap_object_types", "csv", write_to_path=number_matrix.to_csv, use_dialog=False)]
+    for measure in ["pooling_time", "lagging_time"]:
+        exports += [Export(f"heatmap_{measure.split('_')[0]}_{agg}", "csv", write_to_path=df.to_csv, use_dialog=False)
+                    for agg, df in dfs[measure].items()]
+    return exports
+
+
+ARTIFACT_FUNCTIONS = {
+    "petri_net": compute_petri_net,
+    "opera": compute_opera,
+    "variants": compute_variants,
+    "heatmap": compute_heatmap,
+}
+
+
+def run(args: argparse.Namespace) -> int:
+    from model.model import Model
+
+    log_path = Path(args.log).resolve()
+    output = Path(args.output).resolve()
+    trace_path = Path(args.trace).resolve() if args.trace else None
+    if not log_path.is_file():
+        print(f"Event log not found: {log_path}", file=sys.stderr)
+        return 2
+    # The model uses paths relative to the src folder
+    os.chdir(Path(__file__).resolve().parent)
+    os.makedirs(output, exist_ok=True)
+
+    dataset = {"dataset": str(log_path), "execution_extraction": args.execution_extraction}
+    if args.leading_type:
+        dataset["leading_type"] = args.leading_type
+
+    if trace_path is not None:
+        instrumentation.enable()
+    timer = StageTimer()
+    model = Model(dataset, use_persistent_cache=not args.no_cache)
+    try:
+        timer.run("load", model.init_ocel, dataset, args.backend)
+        if "load" in timer.failures:
+            timer.report()
+            return 1
+
+        if args.object_types or args.activities or args.sample:
+            unknown = sorted(set(args.object_types or []) - set(model.object_types)) + \
+                      sorted(set(args.activities or []) - set(model.activities))
+            if unknown:
+                print(f"Unknown object types or activities: {', '.join(unknown)}", file=sys.stderr)
+                return 2
+            model.active_ot = list(args.object_types or model.active_ot)
+            model.active_activities = list(args.activities or model.active_activities)
+            model.sample_fraction = args.sample
+            timer.run("filter", model.filter_ocel)
+
+        def compute(artifact: str, workdir: str):
+            with execution_scope(args.execution):
+                return timer.run(artifact, ARTIFACT_FUNCTIONS[artifact], model, workdir)
+
+        # Independent artifacts are computed in parallel, shared results (e.g. OPerA) are computed only once
+        with tempfile.TemporaryDirectory() as workdir:
+            with ThreadPoolExecutor(max_workers=len(args.artifacts)) as pool:
+                futures = {artifact: pool.submit(compute, artifact, workdir) for artifact in args.artifacts}
+            for artifact, future in futures.items():
+                exports = future.result()
+                if exports is not None:
+                    timer.run(f"export {artifact}",
+                              lambda: [export_to(output, export) for export in exports])
+    finally:
+        model.shutdown()
+
+    timer.report()
+    print(f"Results written to {output}")
+    if trace_path is not None:
+        instrumentation.export_trace(str(trace_path))
+        print(f"Trace written to {trace_path}")
+    return 1 if timer.failures else 0
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    # Some libraries configure the root logger, only print the app's log messages if requested
+    logger.propagate = False
+    if args.verbose:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
+        logger.addHandler(handler)
+        logger.setLevel(logging.DEBUG)
+    return run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
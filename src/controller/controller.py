@@ -4,6 +4,8 @@ from view.view import View
 from typing import Dict, List, Union, Optional
 from controller.tasks import *
 from controller.export import Export
+from model.cancellation import check_cancelled
+from controller.scheduler import PrecomputationScheduler
 
 logger = logging.getLogger("app_logger")
 
@@ -17,6 +19,10 @@ class Controller:
         self.TASKS = {}
         init_tasks(self)
         self.current_exports = []  # Usually only the latest export (last element) is used
+        self.scheduler = PrecomputationScheduler(model)
+        # Running precomputations are cancelled before the filtered event log is replaced, then rescheduled
+        self.model.before_filter_callbacks.append(self.scheduler.cancel)
+        self.model.after_filter_callbacks.append(self.scheduler.start)
 
     def init_view(self):
         self.view.init_object_types(object_types=self.model.original_ocel.object_types,
@@ -28,12 +34,34 @@ class Controller:
         self.view.init_ocel_df(model=self.model)
 
     def pre_computations(self):
-        """ Run as task: This function computes several statistics / visualizations on the model in the background,
+        """ This function computes several statistics / visualizations on the model in the background,
         as soon as the window is ready. This way, the cached results are already available when requesting them later."""
-        logger.info("Start pre-computations...")
-        _ = self.model.compute_opera()
-        # ...
-        logger.info("Pre-computations finished.")
+        self.scheduler.start()
+
+    def on_tab_change(self, tab):
+        """ Prioritizes the precomputations needed by the newly opened tab """
+        self.scheduler.prioritize(tab.precomputations)
+        self.view.sampling_bar.update_estimate(tab)
+
+    def set_sample_fraction(self, fraction: Optional[float]):
+        """
+        Switches between previews on a sample of the event log and exact results, then updates the open tab.
+        :param fraction: The fraction of process executions (or object clusters) to sample, or None for exact results
+        """
+        self.model.update_sample_fraction(fraction)
+        self.view.on_filter()
+        tab = self.view.tab_widget.active_tab
+        if tab is not None and tab is not self.view.tab1:
+            tab.on_open()
+        self.view.sampling_bar.update_estimate(tab)
+
+    def compute_exact(self):
+        """
+        Leaves sampling mode: The open tab computes its exact result, the other results are precomputed in the
+        background (see PrecomputationScheduler).
+        """
+        self.view.tab1.sample_var.set(0)
+        self.set_sample_fraction(None)
 
     def render_petri_net(self, renderer):
         # run as task
@@ -41,6 +69,7 @@ class Controller:
         ocpn = self.model.compute_petri_net()
         # Call performance metrics (within Model)
         opera_kpis = self.model.compute_opera()
+        check_cancelled()
         # Call renderer (within View)
         path = renderer(ocpn, opera_kpis["lagging_time"], opera_kpis["pooling_time"])
         return path
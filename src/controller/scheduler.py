@@ -0,0 +1,146 @@
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from model.cancellation import CancellationToken, TaskCancelled, cancellation_scope
+from model.constants import EXECUTION_PROCESS, PROCESS_POOL_WORKERS
+from model.execution import execution_scope
+from model import instrumentation
+
+logger = logging.getLogger("app_logger")
+
+# ----- PRECOMPUTATION GRAPH -------------------------------------------------------------------------------------------
+# Model results computed in the background, with the results they depend on.
+# Petri net discovery and OPerA share no results: pm4py discovers the object-centric petri net from the directly-follows
+# graph of each object type, while the native OPerA (model/ocel/opera.py) mines the flattened log of each object type,
+# like ocpa. The variants are derived from the process executions (cases).
+PRECOMPUTATIONS = {
+    "petri_net": {"func": lambda model: model.compute_petri_net(), "deps": []},
+    "opera": {"func": lambda model: model.compute_opera(), "deps": []},
+    "heatmap": {"func": lambda model: model.compute_heatmap(), "deps": []},
+    "cases": {"func": lambda model: model.cases, "deps": []},
+    "variants": {"func": lambda model: model.variants, "deps": ["cases"]},
+    "variant_frequencies": {"func": lambda model: model.variant_frequencies, "deps": ["variants"]},
+}
+PRECOMPUTATION_WORKERS = PROCESS_POOL_WORKERS
+# ----------------------------------------------------------------------------------------------------------------------
+
+
+class PrecomputationScheduler:
+    """
+    Computes the model results of the precomputation graph in the background, such that every tab is ready
+    when it is opened. Nodes whose dependencies are finished run in parallel, preferring the nodes needed by the
+    currently open tab. When the filters change, running computations are cancelled and the graph is rescheduled.
+    With EXECUTION_PROCESS, independent nodes are spread over the worker processes, while a dependent node is sent to
+    the worker that computed its (first) dependency, which still holds the intermediate results (e.g. the process
+    executions of the cases) instead of recomputing them.
+    """
+
+    def __init__(self, model, nodes: Dict = None, max_workers: int = PRECOMPUTATION_WORKERS,
+                 backend: str = EXECUTION_PROCESS):
+        self.model = model
+        self.nodes = nodes if nodes is not None else PRECOMPUTATIONS
+        self.max_workers = max_workers
+        self.backend = backend
+
+        self._condition = threading.Condition()
+        self._generation = 0
+        self._token: Optional[CancellationToken] = None
+        self._done = set()
+        self._running = set()
+        self._failed = set()
+        self._workers: Dict[str, int] = {}  # Worker process of each started node
+        self._priorities: List[str] = []
+
+    def start(self):
+        """ (Re-)schedules all nodes for the current state of the model """
+        with self._condition:
+            self._cancel()
+            self._token = token = CancellationToken()
+            self._done, self._running, self._failed = set(), set(), set()
+            self._workers = {}
+            generation = self._generation
+        logger.info("Starting background precomputations")
+        scheduled = time.perf_counter()
+        for i in range(self.max_workers):
+            threading.Thread(target=self._work, args=(generation, token, scheduled, i), daemon=True,
+                             name=f"precomputation_{generation}_{i}").start()
+
+    def cancel(self):
+        """ Cancels all running computations, their results are discarded """
+        with self._condition:
+            self._cancel()
+
+    def _cancel(self):
+        self._generation += 1
+        if self._token is not None:
+            self._token.cancel()
+            self._token = None
+        self._condition.notify_all()
+
+    def prioritize(self, nodes: List[str]):
+        """ Prefers the given nodes (and their dependencies) when choosing the next computation """
+        with self._condition:
+            self._priorities = [node for node in self._with_dependencies(nodes) if node in self.nodes]
+
+    def _with_dependencies(self, nodes: List[str]) -> List[str]:
+        ordered = []
+
+        def visit(node):
+            if node in ordered or node not in self.nodes:
+                return
+            for dep in self.nodes[node]["deps"]:
+                visit(dep)
+            ordered.append(node)
+
+        for node in nodes:
+            visit(node)
+        return ordered
+
+    def _next_node(self) -> Optional[str]:
+        ready = [node for node, spec in self.nodes.items()
+                 if node not in self._done | self._running | self._failed
+                 and all(dep in self._done for dep in spec["deps"])]
+        if not ready:
+            return None
+        order = list(self.nodes)
+        return min(ready, key=lambda node: (self._priorities.index(node) if node in self._priorities
+                                            else len(self._priorities) + order.index(node)))
+
+    def _work(self, generation: int, token: CancellationToken, scheduled: float, index: int):
+        while True:
+            with self._condition:
+                while True:
+                    if generation != self._generation:
+                        return
+                    node = self._next_node()
+                    if node is not None:
+                        self._running.add(node)
+                        deps = self.nodes[node]["deps"]
+                        worker = self._workers[deps[0]] if deps else index
+                        self._workers[node] = worker
+                        break
+                    if not self._running:
+                        # Everything is computed, or the remaining nodes depend on failed ones
+                        return
+                    self._condition.wait()
+
+            logger.info(f"Precomputing '{node}'")
+            try:
+                with cancellation_scope(token), execution_scope(self.backend, worker=worker), \
+                        instrumentation.span(node, category="precomputation", queue_wait=time.perf_counter() - scheduled):
+                    self.nodes[node]["func"](self.model)
+                succeeded = True
+            except TaskCancelled:
+                return
+            except Exception as e:
+                logger.warning(f"Precomputation of '{node}' failed ({type(e).__name__}: {e})")
+                succeeded = False
+
+            with self._condition:
+                if generation != self._generation:
+                    return
+                self._running.discard(node)
+                (self._done if succeeded else self._failed).add(node)
+                self._condition.notify_all()
@@ -11,9 +11,14 @@ from view.constants import *
 from view.widgets.spinner import Spinner
 from controller.tasks import *
 from controller.export import Export
-from cefpython3 import cefpython as cef
 import json
 
+try:
+    from cefpython3 import cefpython as cef
+except (ImportError, OSError):
+    # The binary module fails to load (OSError) on platforms without a matching build
+    cef = None
+
 CONN_COMP = "connected_components"
 LEAD_TYPE = "leading_type"
 
@@ -40,14 +45,17 @@ DATASET_CELONIS = {"dataset": "celonis.jsonocel", "leading_type": "xxx"}
 
 # instantiate logger
 logger = logging.getLogger("app_logger")
-logger.setLevel(logging.DEBUG)
-# define handler and formatter
-if not os.path.exists("../logs/"):
-   os.makedirs("../logs")
-file_handler = logging.FileHandler(r'../logs/app.log', mode='w')
-file_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s")
-file_handler.setFormatter(file_formatter)
-logger.addHandler(file_handler)
+
+
+def init_logger():
+    logger.setLevel(logging.DEBUG)
+    # define handler and formatter
+    if not os.path.exists("../logs/"):
+       os.makedirs("../logs")
+    file_handler = logging.FileHandler(r'../logs/app.log', mode='w')
+    file_formatter = logging.Formatter("%(asctime)s - %(levelname)s - %(name)s - %(message)s")
+    file_handler.setFormatter(file_formatter)
+    logger.addHandler(file_handler)
 
 
 class App:
@@ -80,7 +88,10 @@ class App:
 
     def start(self):
         self.window.mainloop()
-        cef.Shutdown()
+        if self.model is not None:
+            self.model.shutdown()
+        if cef is not None:
+            cef.Shutdown()
 
     def delayed_import(self):
         # Perform the delayed import inside a separate thread
@@ -132,7 +143,7 @@ class App:
         self.controller.init_view()
 
         # Run pre-computations
-        # self.controller.run_task(TASK_PRE_COMPUTATIONS, callback=None)
+        self.controller.pre_computations()
 
     @staticmethod
     def load_preferences() -> dict:
@@ -183,6 +194,8 @@ class App:
 
 
 if __name__ == "__main__":
+    # Not at import time: worker processes (see model/execution.py) re-import this module and must not truncate the log
+    init_logger()
     logger.info("Program started")
     app = App()
     App.instance = app
@@ -0,0 +1,193 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Callable, Optional, Tuple
+
+from model.constants import RESULT_CACHE_DIR, RESULT_CACHE_MAX_SIZE
+
+logger = logging.getLogger("app_logger")
+
+HASH_CHUNK_SIZE = 1024 * 1024
+FINGERPRINTS_FILE = "fingerprints.json"
+CACHE_FILE_EXT = ".pkl"
+TMP_DIR_PREFIX = ".tmp-"
+
+
+def file_content_hash(path, cache_dir=RESULT_CACHE_DIR) -> str:
+    """
+    Computes a SHA-256 hash of a file's content.
+    Hashing a multi-GB log takes a few seconds, so the hash is remembered per (path, size, mtime)
+    and only recomputed when the file has changed on disk.
+    :param path: The file to be hashed
+    :param cache_dir: Directory where the known fingerprints are saved
+    :return: The hex digest of the file content
+    """
+    path = Path(path).resolve()
+    stat = path.stat()
+    fingerprints_path = Path(cache_dir) / FINGERPRINTS_FILE
+    fingerprints = {}
+    if fingerprints_path.exists():
+        try:
+            with open(fingerprints_path, "r") as f:
+                fingerprints = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            fingerprints = {}
+
+    known = fingerprints.get(str(path))
+    if known is not None and known["size"] == stat.st_size and known["mtime"] == stat.st_mtime_ns:
+        return known["hash"]
+
+    logger.info(f"Hashing file {path} ...")
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            sha.update(chunk)
+    digest = sha.hexdigest()
+
+    fingerprints[str(path)] = {"size": stat.st_size, "mtime": stat.st_mtime_ns, "hash": digest}
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(fingerprints_path, "w") as f:
+            json.dump(fingerprints, f, indent=2)
+    except OSError:
+        logger.warning(f"Could not save file fingerprint to {fingerprints_path}")
+    return digest
+
+
+def make_key(*parts) -> str:
+    """ Builds a stable key from hashable parts (strings, numbers, tuples, None) """
+    return hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()
+
+
+class LruFileStore:
+    """
+    A directory of cache files, one per key. Files are written atomically (in a temporary directory first).
+    When the total size exceeds the limit, the least recently used files are deleted. Reading a file should touch it,
+    the modification time serves as its access time.
+    """
+
+    def __init__(self, directory, file_ext: str, max_size: int, name: str = "Cache"):
+        self.directory = Path(directory)
+        self.file_ext = file_ext
+        self.max_size = max_size
+        self.name = name
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, key: str) -> Path:
+        return self.directory / f"{key}{self.file_ext}"
+
+    @staticmethod
+    def touch(path: Path):
+        """ Updates the access time of a file for the LRU eviction """
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+    def write(self, key: str, write_func: Callable[[str], Any]) -> Path:
+        """
+        Writes a file and evicts the least recently used files if the size limit is exceeded.
+        The file is written into a temporary directory of the store, which is deleted afterwards with any other files
+        the writer created there (e.g. the DOT source saved by graphviz). Concurrent writes of the same key are safe.
+        :param write_func: Function writing the file to the given (temporary) path. Its exceptions are raised.
+        :return: The path of the file
+        """
+        path = self.path(key)
+        with tempfile.TemporaryDirectory(prefix=TMP_DIR_PREFIX, dir=self.directory) as tmp_dir:
+            tmp_path = Path(tmp_dir) / path.name
+            write_func(str(tmp_path))
+            os.replace(tmp_path, path)
+        self.evict()
+        return path
+
+    def evict(self, max_size: Optional[int] = None):
+        """ Deletes the least recently used files until the store fits the size limit. """
+        if max_size is None:
+            max_size = self.max_size
+        with self._lock:
+            entries = []
+            for path in self.directory.glob(f"*{self.file_ext}"):
+                try:
+                    stat = path.stat()
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total_size = sum(size for _, size, _ in entries)
+            if total_size <= max_size:
+                return
+            entries.sort(key=lambda entry: entry[0])
+            for _, size, path in entries:
+                if total_size <= max_size:
+                    break
+                self.delete(path)
+                total_size -= size
+            logger.info(f"{self.name} evicted to {total_size / 1024 ** 2:.1f} MB")
+
+    def clear(self):
+        self.evict(max_size=0)
+
+    @staticmethod
+    def delete(path: Path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class PersistentResultCache:
+    """
+    Disk-backed cache for model results, surviving app restarts.
+    Each entry is pickled to its own file, named by a hash of the entry key.
+    When the total size exceeds the limit, the least recently used entries are deleted.
+    """
+    make_key = staticmethod(make_key)
+
+    def __init__(self, directory=RESULT_CACHE_DIR, max_size: int = RESULT_CACHE_MAX_SIZE):
+        self.store = LruFileStore(directory, CACHE_FILE_EXT, max_size, name="Result cache")
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        Looks up a cache entry.
+        :return: A tuple (hit, value)
+        """
+        path = self.store.path(key)
+        if not path.exists():
+            return False, None
+        try:
+            with open(path, "rb") as f:
+                value = pickle.load(f)
+        except Exception:
+            logger.warning(f"Corrupt result cache entry {path.name}, deleting it")
+            self.store.delete(path)
+            return False, None
+        self.store.touch(path)
+        return True, value
+
+    def set(self, key: str, value: Any) -> bool:
+        """
+        Saves a cache entry. Values that cannot be pickled are skipped.
+        :return: Whether the value has been saved
+        """
+        def write_value(path: str):
+            with open(path, "wb") as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+        try:
+            self.store.write(key, write_value)
+        except Exception as e:
+            logger.warning(f"Could not write result cache entry ({type(e).__name__}: {e})")
+            return False
+        return True
+
+    def evict(self, max_size: Optional[int] = None):
+        """ Deletes the least recently used entries until the cache fits the size limit. """
+        self.store.evict(max_size)
+
+    def clear(self):
+        self.store.clear()
@@ -0,0 +1,62 @@
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Optional
+
+logger = logging.getLogger("app_logger")
+
+_local = threading.local()
+
+
+class TaskCancelled(BaseException):
+    """
+    Raised inside a computation whose task has been cancelled.
+    Like KeyboardInterrupt, it does not derive from Exception, such that it is not swallowed by generic error handling.
+    """
+
+
+class CancellationToken:
+    """
+    Cancellation state of a task, shared between the controller (cancelling) and the worker thread (computing).
+    Cancellation is cooperative: model code checks the token at safe points (see check_cancelled), and requests
+    executed in worker processes are cancelled there (see model/execution.py). Threads are never interrupted
+    asynchronously, as that could happen while they hold one of the model's locks.
+    """
+
+    def __init__(self):
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise TaskCancelled()
+
+
+def current_token() -> Optional[CancellationToken]:
+    """ The cancellation token of the task running in the current thread, if any """
+    return getattr(_local, "token", None)
+
+
+@contextmanager
+def cancellation_scope(token: CancellationToken):
+    """ Makes the token available to the model code executed by the current thread """
+    previous = current_token()
+    _local.token = token
+    try:
+        yield token
+    finally:
+        _local.token = previous
+
+
+def check_cancelled():
+    """ Check point for long computations: raises TaskCancelled if the current task has been cancelled """
+    token = current_token()
+    if token is not None:
+        token.raise_if_cancelled()
+
@@ -1,6 +1,33 @@
-
+import os
 
 BACKEND_DUMMY = "BACKEND_DUMMY"
 BACKEND_OCPA = "BACKEND_OCPA"
 BACKEND_PM4PY = "BACKEND_PM4PY"
 
+
+RESULT_CACHE_DIR = "../cache/results"
+RESULT_CACHE_MAX_SIZE = 2 * 1024 ** 3  # [bytes]
+RESULT_CACHE_VERSION = 1  # Format of the cached results, bump to invalidate all entries (see PERSISTENT_CACHE_METHODS)
+FILTER_STATE_CACHE_SIZE = 5  # Number of recent filter states whose event logs and results are kept in memory
+SNAPSHOT_DIR = "../cache/snapshots"  # Columnar snapshots of imported event logs
+FILTERED_SNAPSHOT_DIR = "../cache/filtered"  # Columnar snapshots of filtered event logs, loaded by worker processes
+FILTERED_SNAPSHOT_COUNT = 10  # Number of recently used filtered snapshots kept on disk
+IMPORT_CHUNK_SIZE = 50000  # Number of events/objects parsed before being converted to a DataFrame chunk
+OPERA_STARTS_CACHE_SIZE = 64  # Number of token start time arrays of object types kept for incremental OPerA updates
+OPERA_PARTIALS_CACHE_SIZE = 1000  # Number of partial OPerA aggregates of activities kept for incremental updates
+PROCESS_EXECUTION_CHUNK_SIZE = 500  # Number of process executions (or variant graphs) processed per chunk
+PROCESS_EXECUTION_THREADS = max(1, min(4, os.cpu_count() or 1))  # Threads extracting chunks of process executions
+VARIANT_HASH_PARALLEL_MIN_GRAPHS = 2000  # Minimum number of distinct graphs to hash variants in worker processes
+SAMPLE_FRACTION = 0.1  # Fraction of process executions / object clusters analyzed in sampling mode
+SAMPLE_ERROR_GROUPS = 5  # Number of random groups the sample is split into for error estimates
+SAMPLE_SEED = 0  # Seed of the sample selection, such that worker processes draw the same sample
+
+EXECUTION_THREAD = "thread"
+EXECUTION_PROCESS = "process"
+PROCESS_POOL_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+PROCESS_POLL_INTERVAL = 0.1  # [s] Interval for checking task cancellation while waiting for a worker process
+PROCESS_CANCEL_SLOTS = 64  # Number of requests to worker processes that can be cancelled while running
+PROCESS_WORKER_MODELS = 1  # Number of (dataset, filter) states whose event logs are kept in each worker process
+
+INSTRUMENTATION_ENABLED = False  # Record spans of tasks and model methods from startup (see model/instrumentation.py)
+INSTRUMENTATION_MAX_EVENTS = 100000  # Maximum number of recorded spans and counter events kept in memory
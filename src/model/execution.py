@@ -0,0 +1,290 @@
+import logging
+import logging.handlers
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+from model.cancellation import CancellationToken, TaskCancelled, cancellation_scope, check_cancelled
+from model.constants import *
+from model import instrumentation
+
+logger = logging.getLogger("app_logger")
+
+_local = threading.local()
+
+# Worker-side: models of recently used (dataset, filter) states, such that consecutive tasks on the same state
+# do not need to reload the event log. Each model holds a copy of its (filtered) event log.
+_worker_models: OrderedDict = OrderedDict()
+# Worker-side: cancellation flags shared with the parent process, one per running request (see ProcessExecutor.run)
+_cancel_flags = None
+
+
+def in_worker() -> bool:
+    """ Whether the current process is a worker of a ProcessExecutor """
+    return _cancel_flags is not None
+
+
+def current_backend() -> str:
+    """ The execution backend of the task running in the current thread """
+    return getattr(_local, "backend", EXECUTION_THREAD)
+
+
+def current_worker() -> Optional[int]:
+    """ The worker process the task running in the current thread sends its requests to, None for any worker """
+    return getattr(_local, "worker", None)
+
+
+@contextmanager
+def execution_scope(backend: str, worker: Optional[int] = None):
+    """
+    Sets the execution backend used by the model methods called from the current thread.
+    :param worker: The worker process of EXECUTION_PROCESS requests (see ProcessExecutor.run), None for any worker
+    """
+    previous = current_backend(), current_worker()
+    _local.backend, _local.worker = backend, worker
+    try:
+        yield
+    finally:
+        _local.backend, _local.worker = previous
+
+
+class ProcessExecutor:
+    """
+    Runs model methods in a pool of worker processes, bypassing the GIL shared with the Tk main loop.
+    The event log is not pickled. Instead, each worker opens the dataset itself (memory-mapping its columnar snapshot),
+    or the columnar snapshot of the filtered event log saved by the parent. The filters are not re-applied by the
+    workers, so they never hold the whole event log and a filtered copy at the same time.
+    Only the method name, arguments and the result are pickled.
+    Every worker process has a pool of its own, such that requests can be routed to the worker which has already
+    computed their inputs (e.g. the process executions needed for the variants).
+    Memory: each worker keeps the event logs of PROCESS_WORKER_MODELS filter states (one by default), so the pool holds
+    at most max_workers * PROCESS_WORKER_MODELS copies of the (filtered) event log besides the parent's.
+    Requests are cancelled through flags in shared memory, which the worker's model code checks at its check points.
+    """
+
+    def __init__(self, max_workers: int = PROCESS_POOL_WORKERS):
+        self.max_workers = max_workers
+        # One single-process pool per worker, started on first use
+        self._pools: List[Optional[ProcessPoolExecutor]] = [None] * max_workers
+        # Number of requests submitted to each worker and not finished yet
+        self._pending = [0] * max_workers
+        self._lock = threading.Lock()
+        self._context = None
+        self._cancel_flags = None
+        self._free_slots = []
+        self._log_queue = None
+        self._log_listener: Optional[logging.handlers.QueueListener] = None
+
+    def _start(self):
+        """ Creates the state shared by all workers: cancellation flags and the log queue """
+        with self._lock:
+            if self._context is None:
+                logger.info(f"Starting process pool with {self.max_workers} workers")
+                # Forking the Tk process (with its running threads) is unsafe, always start fresh interpreters
+                self._context = multiprocessing.get_context("spawn")
+                self._cancel_flags = self._context.RawArray("b", PROCESS_CANCEL_SLOTS)
+                self._free_slots = list(range(PROCESS_CANCEL_SLOTS))
+                # Workers send their log records to the parent, which passes them to the app's log handlers
+                self._log_queue = self._context.Queue()
+                self._log_listener = logging.handlers.QueueListener(self._log_queue, _ForwardHandler())
+                self._log_listener.start()
+
+    def _get_pool(self, worker: int) -> ProcessPoolExecutor:
+        self._start()
+        with self._lock:
+            if self._pools[worker] is None:
+                self._pools[worker] = ProcessPoolExecutor(max_workers=1, mp_context=self._context,
+                                                          initializer=_init_worker,
+                                                          initargs=(self._cancel_flags, logger.getEffectiveLevel(),
+                                                                    self._log_queue))
+            return self._pools[worker]
+
+    def _submit(self, worker: Optional[int], func: Callable, *args) -> Future:
+        """ Submits a function call to the given worker, or to the worker with the fewest pending requests """
+        with self._lock:
+            if worker is None:
+                worker = min(range(self.max_workers), key=lambda i: self._pending[i])
+            worker %= self.max_workers
+            self._pending[worker] += 1
+        try:
+            future = self._get_pool(worker).submit(func, *args)
+        except BaseException:
+            self._finish(worker)
+            raise
+        future.add_done_callback(lambda _: self._finish(worker))
+        return future
+
+    def _finish(self, worker: int):
+        with self._lock:
+            self._pending[worker] -= 1
+
+    def _acquire_slot(self) -> Optional[int]:
+        """ :return: A free cancellation flag, or None if all are in use (the request cannot be cancelled then) """
+        with self._lock:
+            if not self._free_slots:
+                return None
+            slot = self._free_slots.pop()
+            self._cancel_flags[slot] = 0
+            return slot
+
+    def _release_slot(self, slot: Optional[int]):
+        if slot is not None:
+            with self._lock:
+                self._free_slots.append(slot)
+
+    def run(self, dataset: Dict, backend: str, filter_signature: tuple, use_persistent_cache: bool, method_name: str,
+            args: tuple, filtered_log: Optional[str] = None, worker: Optional[int] = None):
+        """
+        Executes a model method in a worker process and waits for the result.
+        The worker opens the dataset with the same event log backend (BACKEND_PM4PY or BACKEND_OCPA) as the caller.
+        If the path of a filtered snapshot (see model/snapshot.py) is given, the worker loads this filtered event log.
+        :param worker: The index of the worker process (modulo max_workers), None for the least busy worker
+        While waiting, the current task's cancellation token is checked. A cancelled task drops its request;
+        if the worker has already started the computation, it is cancelled at the worker's next check point.
+        """
+        self._start()
+        slot = self._acquire_slot()
+        future = self._submit(worker, _execute_in_worker, dataset, backend, filter_signature, use_persistent_cache,
+                              method_name, args, filtered_log, slot, instrumentation.settings())
+        # The flag stays reserved until the worker is done with the request
+        future.add_done_callback(lambda _: self._release_slot(slot))
+        while True:
+            try:
+                check_cancelled()
+            except TaskCancelled:
+                if not future.cancel() and slot is not None:
+                    self._cancel_flags[slot] = 1
+                raise
+            try:
+                result, recording = future.result(timeout=PROCESS_POLL_INTERVAL)
+            except FutureTimeoutError:
+                continue
+            if recording is not None:
+                instrumentation.merge(recording)
+            return result
+
+    @property
+    def parallel(self) -> bool:
+        """ Whether map distributes chunks to several processes """
+        return self.max_workers > 1 and not in_worker()
+
+    def map(self, func: Callable, chunks: List) -> List:
+        """
+        Applies a function to chunks of data in the worker processes, e.g. to hash many graphs.
+        Worker processes do not start pools of their own, they (and executors with a single worker) apply the
+        function to the chunks in the current thread.
+        :return: The results, in the order of the chunks
+        """
+        if not self.parallel:
+            results = []
+            for chunk in chunks:
+                check_cancelled()
+                results.append(func(chunk))
+            return results
+        futures = [self._submit(i, func, chunk) for i, chunk in enumerate(chunks)]
+        try:
+            results = []
+            for future in futures:
+                while True:
+                    check_cancelled()
+                    try:
+                        results.append(future.result(timeout=PROCESS_POLL_INTERVAL))
+                        break
+                    except FutureTimeoutError:
+                        continue
+            return results
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def shutdown(self):
+        with self._lock:
+            for i, pool in enumerate(self._pools):
+                if pool is not None:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    self._pools[i] = None
+            self._context = None
+            if self._log_listener is not None:
+                self._log_listener.stop()
+                self._log_listener = None
+
+
+class _ForwardHandler(logging.Handler):
+    """ Passes log records of the worker processes to the handlers of the parent's app_logger """
+
+    def handle(self, record: logging.LogRecord) -> bool:
+        if logger.isEnabledFor(record.levelno):
+            logger.handle(record)
+        return True
+
+
+def _init_worker(cancel_flags, log_level: int, log_queue):
+    global _cancel_flags
+    _cancel_flags = cancel_flags
+    # Same level as the parent's app_logger. Some libraries configure the root logger, so records do not propagate.
+    logger.setLevel(log_level)
+    logger.propagate = False
+    logger.handlers = [logging.handlers.QueueHandler(log_queue)]
+
+
+class _WorkerToken(CancellationToken):
+    """ Cancellation token of a request executed in a worker process, cancelled by the parent process """
+
+    def __init__(self, slot: Optional[int]):
+        super().__init__()
+        self.slot = slot
+
+    @property
+    def cancelled(self) -> bool:
+        return self.slot is not None and _cancel_flags is not None and bool(_cancel_flags[self.slot])
+
+
+def _execute_in_worker(dataset: Dict, backend: str, filter_signature: tuple, use_persistent_cache: bool,
+                       method_name: str, args: tuple, filtered_log: Optional[str] = None, slot: Optional[int] = None,
+                       instrumentation_settings: Tuple[bool, bool] = (False, False)):
+    """ :return: The result, and the spans and counters recorded while computing it if the parent records them """
+    record, trace_memory = instrumentation_settings
+    if instrumentation.settings() != instrumentation_settings:
+        if record:
+            instrumentation.enable(trace_memory=trace_memory)
+        else:
+            instrumentation.disable()
+    instrumentation.recorder.clear()
+    with cancellation_scope(_WorkerToken(slot)):
+        result = _execute_request(dataset, backend, filter_signature, use_persistent_cache, method_name, args,
+                                  filtered_log)
+    return result, instrumentation.worker_snapshot() if record else None
+
+
+def _execute_request(dataset: Dict, backend: str, filter_signature: tuple, use_persistent_cache: bool,
+                     method_name: str, args: tuple, filtered_log: Optional[str] = None):
+    from model.model import Model
+    from model.snapshot import load_filtered_snapshot
+    key = (tuple(sorted(dataset.items())), backend, filter_signature)
+    model = _worker_models.get(key)
+    if model is None:
+        # Release the least recently used event logs before loading the next one
+        while len(_worker_models) >= PROCESS_WORKER_MODELS:
+            _worker_models.popitem(last=False)
+        model = Model(dataset, use_persistent_cache=use_persistent_cache)
+        ocel = load_filtered_snapshot(filtered_log) if filtered_log is not None else None
+        if ocel is not None:
+            logger.info(f"Worker {os.getpid()}: loading filtered {dataset['dataset']} ({backend})")
+            model.init_filtered_ocel(ocel, filter_signature)
+        else:
+            logger.info(f"Worker {os.getpid()}: loading {dataset['dataset']} ({backend})")
+            model.init_ocel(dataset, backend=backend)
+        if model.filter_signature != filter_signature:
+            object_types, activities, timestamp, sample_fraction = filter_signature
+            model.active_ot = list(object_types)
+            model.active_activities = list(activities)
+            model.filter_timestamp = timestamp
+            model.sample_fraction = sample_fraction
+            model.filter_ocel()
+        _worker_models[key] = model
+    _worker_models.move_to_end(key)
+    return model._execute_ocel_method(method_name, *args)
@@ -0,0 +1,276 @@
+import json
+import logging
+import os
+import threading
+import time
+import tracemalloc
+from collections import deque, defaultdict
+from typing import Dict, List, Tuple
+
+import pandas as pd
+
+from model.constants import INSTRUMENTATION_ENABLED, INSTRUMENTATION_MAX_EVENTS
+
+logger = logging.getLogger("app_logger")
+
+# Lightweight profiling of tasks and model methods. Instrumented code wraps its work in span(...) and reports cache
+# lookups with count(...). While recording is disabled, both return immediately without allocating anything.
+# The recorded spans are summarized for the diagnostics panel and exported in the trace event format
+# (https://docs.google.com/document/d/1CvAClvFfyA5R-PhYUmn5OOQtYMH4h6I0nSsKchNAySU), which can be opened in
+# chrome://tracing, Perfetto or speedscope.
+# Model methods executed in worker processes (see model/execution.py) are recorded by the worker and sent back with
+# the result, where they are merged into the parent's recording (see worker_snapshot and merge).
+
+_enabled = INSTRUMENTATION_ENABLED
+_trace_memory = False
+
+
+class _NullSpan:
+    """ Span used while recording is disabled """
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **args):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """ A timed section of a thread, recording wall time, CPU time of the thread and (optionally) peak memory """
+
+    def __init__(self, recorder: "Recorder", name: str, category: str, args: Dict):
+        self.recorder = recorder
+        self.name = name
+        self.category = category
+        self.args = args
+        self.start = None
+        self.traces_memory = False
+
+    def set(self, **args):
+        """ Adds arguments to the span, e.g. results of the computation """
+        self.args.update(args)
+
+    def __enter__(self):
+        if _trace_memory:
+            self.recorder.start_memory_trace()
+            self.traces_memory = True
+            self.memory_start = tracemalloc.get_traced_memory()[0]
+        self.start = time.perf_counter()
+        self.cpu_start = time.thread_time()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter()
+        args = self.args
+        args["cpu"] = time.thread_time() - self.cpu_start
+        if exc_type is not None:
+            args["error"] = exc_type.__name__
+        if self.traces_memory:
+            args["peak_memory"] = max(0, tracemalloc.get_traced_memory()[1] - self.memory_start)
+            self.recorder.stop_memory_trace()
+        self.recorder.add({
+            "name": self.name,
+            "cat": self.category,
+            "ph": "X",
+            "start": self.start,
+            "dur": end - self.start,
+            "tid": threading.get_ident(),
+            "thread": threading.current_thread().name,
+            "args": args,
+        })
+        return False
+
+
+class Recorder:
+    """
+    Collects the spans and counters of all threads. The number of kept events is bounded, older events are dropped.
+    Memory is traced with tracemalloc while at least one span is active. Its peak is reset only when no other span
+    traces memory, such that the peak memory of overlapping computations is an upper bound.
+    """
+
+    def __init__(self, max_events: int = INSTRUMENTATION_MAX_EVENTS):
+        self._lock = threading.Lock()
+        self.events = deque(maxlen=max_events)
+        self.counters = defaultdict(int)
+        self.origin = time.perf_counter()
+        self._memory_spans = 0
+
+    def add(self, event: Dict):
+        with self._lock:
+            self.events.append(event)
+
+    def count(self, name: str, category: str):
+        with self._lock:
+            self.counters[(category, name)] += 1
+            self.events.append({"name": name, "cat": category, "ph": "i", "start": time.perf_counter(),
+                                "tid": threading.get_ident(), "thread": threading.current_thread().name,
+                                "args": {}})
+
+    def clear(self):
+        with self._lock:
+            self.events.clear()
+            self.counters.clear()
+            self.origin = time.perf_counter()
+
+    def start_memory_trace(self):
+        with self._lock:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+            elif self._memory_spans == 0:
+                tracemalloc.reset_peak()
+            self._memory_spans += 1
+
+    def stop_memory_trace(self):
+        with self._lock:
+            self._memory_spans -= 1
+            if self._memory_spans == 0 and not _trace_memory:
+                tracemalloc.stop()
+
+    def snapshot(self) -> Tuple[List[Dict], Dict]:
+        with self._lock:
+            return list(self.events), dict(self.counters)
+
+    def merge(self, events: List[Dict], counters: Dict):
+        with self._lock:
+            self.events.extend(events)
+            for key, n in counters.items():
+                self.counters[key] += n
+
+
+recorder = Recorder()
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def settings() -> Tuple[bool, bool]:
+    """ :return: Whether recording is enabled and whether memory is traced """
+    return _enabled, _trace_memory
+
+
+def enable(trace_memory: bool = False):
+    """
+    Starts recording.
+    :param trace_memory: Whether to measure the peak memory of spans using tracemalloc (slows down computations)
+    """
+    global _enabled, _trace_memory
+    _enabled, _trace_memory = True, trace_memory
+    logger.info(f"Instrumentation enabled (memory tracing: {trace_memory})")
+
+
+def disable():
+    global _enabled, _trace_memory
+    _enabled, _trace_memory = False, False
+    if tracemalloc.is_tracing() and recorder._memory_spans == 0:
+        tracemalloc.stop()
+    logger.info("Instrumentation disabled")
+
+
+def span(name: str, category: str = "model", **args):
+    """
+    Context manager timing a section of the current thread. Arguments are saved with the span.
+    :param name: The name of the span, e.g. the model method
+    :param category: The category, e.g. "task", "model" or "render"
+    """
+    if not _enabled:
+        return _NULL_SPAN
+    return Span(recorder, name, category, args)
+
+
+def record(name: str, category: str, start: float, **args):
+    """
+    Records a span that started at an earlier time and ends now, e.g. the latency from an input event to its paint.
+    :param start: The start time (time.perf_counter())
+    """
+    if not _enabled:
+        return
+    recorder.add({"name": name, "cat": category, "ph": "X", "start": start, "dur": time.perf_counter() - start,
+                  "tid": threading.get_ident(), "thread": threading.current_thread().name, "args": args})
+
+
+def count(name: str, category: str):
+    """ Increments a counter, e.g. count(method_name, "cache_hit") """
+    if _enabled:
+        recorder.count(name, category)
+
+
+def worker_snapshot() -> Dict:
+    """ The spans and counters recorded in a worker process, to be merged into the parent's recording """
+    events, counters = recorder.snapshot()
+    return {"pid": os.getpid(), "clock": time.perf_counter() - time.time(), "events": events, "counters": counters}
+
+
+def merge(snapshot: Dict):
+    """
+    Adds the spans and counters recorded in a worker process. Start times are converted to the parent's clock,
+    and the spans get their own category, e.g. "model (worker)", such that they are not summarized with the parent's
+    spans waiting for the worker. Cache lookups in the worker are counted like the parent's.
+    """
+    if not _enabled:
+        return
+    offset = time.perf_counter() - time.time() - snapshot["clock"]
+    events = [dict(e, start=e["start"] + offset, cat=f"{e['cat']} (worker)", pid=snapshot["pid"],
+                   thread=f"worker {snapshot['pid']}") for e in snapshot["events"]]
+    recorder.merge(events, snapshot["counters"])
+
+
+def summary() -> pd.DataFrame:
+    """ Aggregates the recorded spans by category and name, including the cache hits and misses of model methods """
+    events, counters = recorder.snapshot()
+    rows = [{"category": e["cat"], "name": e["name"], "wall": e["dur"], "cpu": e["args"].get("cpu"),
+             "queue_wait": e["args"].get("queue_wait"), "peak_memory": e["args"].get("peak_memory")}
+            for e in events if e["ph"] == "X"]
+    columns = ["category", "name", "count", "total [s]", "mean [s]", "max [s]", "cpu [s]", "queue wait [s]",
+               "peak memory [MB]", "cache hits", "cache misses", "persistent cache hits"]
+    cache_kinds = ["cache_hit", "cache_miss", "persistent_cache_hit"]
+    if not rows:
+        df = pd.DataFrame(columns=["category", "name"])
+    else:
+        df = pd.DataFrame(rows).groupby(["category", "name"], sort=False).agg(
+            count=("wall", "size"), total=("wall", "sum"), mean=("wall", "mean"), max=("wall", "max"),
+            cpu=("cpu", "sum"), queue_wait=("queue_wait", "mean"), peak_memory=("peak_memory", "max")).reset_index()
+        df["peak_memory"] = df["peak_memory"] / 2 ** 20
+    cache = pd.DataFrame([{"name": name, kind: n} for (kind, name), n in counters.items()
+                          if kind in cache_kinds], columns=["name"] + cache_kinds)
+    if not cache.empty:
+        cache = cache.groupby("name", sort=False).sum(min_count=1).reset_index()
+        cache["category"] = "model"
+        df = df.merge(cache, on=["category", "name"], how="outer")
+    df = df.reindex(columns=["category", "name", "count", "total", "mean", "max", "cpu", "queue_wait", "peak_memory"]
+                    + cache_kinds)
+    df[["count"] + cache_kinds] = df[["count"] + cache_kinds].astype("Int64")
+    df.columns = columns
+    return df.sort_values("total [s]", ascending=False, na_position="last").round(4).reset_index(drop=True)
+
+
+def trace_events() -> Dict:
+    """ The recorded spans and counters in the trace event format (timestamps in microseconds) """
+    events, _ = recorder.snapshot()
+    pid = os.getpid()
+    origin = recorder.origin
+    trace = []
+    threads = {}
+    for e in events:
+        threads[e.get("pid", pid), e["tid"]] = e["thread"]
+        event = {"name": e["name"], "cat": e["cat"], "ph": e["ph"], "pid": e.get("pid", pid), "tid": e["tid"],
+                 "ts": (e["start"] - origin) * 1e6, "args": e["args"]}
+        if e["ph"] == "X":
+            event["dur"] = e["dur"] * 1e6
+        else:
+            event["s"] = "t"
+        trace.append(event)
+    trace += [{"name": "thread_name", "ph": "M", "pid": thread_pid, "tid": tid, "args": {"name": name}}
+              for (thread_pid, tid), name in threads.items()]
+    return {"traceEvents": trace, "displayTimeUnit": "ms"}
+
+
+def export_trace(path: str):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(trace_events(), f, default=str)
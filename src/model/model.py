@@ -1,5 +1,9 @@
 import logging
-import os
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 from typing import List, Dict, Union, Optional
 from builtins import property
 from pathlib import Path
@@ -11,9 +15,15 @@ import tkinter.filedialog as filedialog
 from model.ocel.base import OCEL, DummyEventLog
 from model.ocel.ocpa import OcpaEventLog, OCPA_DEFAULT_SETTINGS
 from model.ocel.pm4py import Pm4pyEventLog
+from model.ocel.executions import LEAD_TYPE
+from model.sampling import StratifiedSample
+from model.cache import PersistentResultCache, file_content_hash, make_key
+from model.snapshot import SNAPSHOT_TABLES, save_filtered_snapshot, snapshots_available
+from model.cancellation import TaskCancelled, check_cancelled
+from model.execution import ProcessExecutor, current_backend, current_worker
+from model import instrumentation
 from model.constants import *
 from controller.export import Export
-import pm4py
 
 OCEL_CONSTRUCTORS = {
     BACKEND_OCPA: OcpaEventLog,
@@ -21,16 +31,47 @@ OCEL_CONSTRUCTORS = {
     BACKEND_DUMMY: DummyEventLog
 }
 
+# Results of these methods are expensive to compute and are saved to the persistent result cache.
+# The version of each method's output is part of the cache key: Bump it whenever the method's result changes
+# (values, order, ids or types), such that results pickled by an older implementation are not served anymore.
+PERSISTENT_CACHE_METHODS = {
+    "_compute_opera": 2,  # 2: native OPerA, missing values are NaN instead of None
+    "_compute_petri_net": 1,
+    "_compute_heatmap": 3,  # 2: object types sorted alphabetically, 3: Horvitz-Thompson estimates on samples
+    "_get_cases": 3,  # 2: native process executions, 3: ordered by the first event of the leading objects
+    "_get_variants": 3,  # 2: native variant hashes, 3: ties ordered by the first process execution (see _get_cases)
+    "_get_variant_frequencies": 4,  # 4: Horvitz-Thompson estimates on samples
+    "_get_variant_graph": 3,
+    "_get_sampling_error": 2,  # 2: errors of the Horvitz-Thompson estimates, number of strata
+}
+
+# These methods are executed in a worker process when called from a task using the process backend
+PROCESS_METHODS = {
+    "_compute_opera",
+    "_compute_petri_net",
+    "_compute_heatmap",
+    "_get_cases",
+    "_get_variants",
+    "_get_variant_frequencies",
+    "_get_sampling_error",
+}
+
 logger = logging.getLogger("app_logger")
 
 
 class Model:
 
-    def __init__(self, dataset):
+    def __init__(self, dataset, use_persistent_cache: bool = True):
         """
         The list self.ocels saves one or more OCEL objects (e.g. one Pm4pyEventLog and one OcpaEventLog).
         When accessing a model method, the corresponding OCEL method is called on the OCELs in the order as they are saved in the list.
         Caching is used to completely omit duplicate method calls on the OCEL objects.
+        Expensive results are additionally saved to a persistent cache on disk, keyed by the content hash of the
+        source file and the active filters, such that reopening a file does not require recomputing them.
+        The model is shared by the UI, tasks and background precomputations: The filter state and caches are guarded
+        by a lock, and concurrent identical requests are computed only once.
+        In sampling mode, all analyses run on a stratified sample of the filtered event log (see model/sampling.py).
+        :param use_persistent_cache: Whether results, snapshots of event logs and file fingerprints are cached on disk
         """
         self._ocels = []  # originally filtered_ocel
         self.original_ocel: OCEL = None
@@ -38,13 +79,32 @@ class Model:
         self.active_ot = []
         self.active_activities = []
         self.filter_timestamp = None
+        self.sample_fraction: Optional[float] = None  # None: exact results on the whole (filtered) event log
 
         self.dataset = dataset
+        self.backend = BACKEND_PM4PY  # Backend of the original event log, see init_ocel
         self.result_cache: dict = {}
+        # Recently used filter states, mapping filter signatures to tuples (ocels, result_cache)
+        self._filter_states: OrderedDict = OrderedDict()
+        self._active_filter_signature: Optional[tuple] = None
+        self.disk_cache = use_persistent_cache  # Whether anything is cached in ../cache
+        self.persistent_cache: Optional[PersistentResultCache] = PersistentResultCache() if use_persistent_cache else None
+        self.source_hash: Optional[str] = None
+        self.process_executor = ProcessExecutor()
+        # Functions called before and after the filtered event log is replaced
+        self.before_filter_callbacks = []
+        self.after_filter_callbacks = []
         self.ocels_traverse_extensions = [
             self.duplicate_first_to_ocpa,
             None
         ]
+        self._lock = threading.RLock()  # Guards _ocels, result_cache, the filter state and _in_flight
+        self._extension_lock = threading.Lock()  # Serializes extensions of OCEL lists (ocpa conversion)
+        self._worker_logs_lock = threading.Lock()  # Serializes saving filtered event logs for worker processes
+        # Without the disk cache, filtered event logs for worker processes are saved to a temporary directory
+        self._worker_logs_dir: Optional[str] = None
+        # Requests currently being computed, mapping (filter signature, method name, args) to futures
+        self._in_flight: Dict[tuple, Future] = {}
 
     def init_ocel(self, dataset, backend=BACKEND_PM4PY):
         event_log_constructor = OCEL_CONSTRUCTORS[backend]
@@ -52,23 +112,55 @@ class Model:
         ocel = event_log_constructor(self, **dataset)
         if len(self._ocels) == 0:
             self.original_ocel = ocel
+            self.backend = backend
+            if self.persistent_cache is not None and "dataset" in dataset:
+                self.source_hash = file_content_hash(Path("../data/datasets") / dataset["dataset"])
         self._ocels.append(ocel)
 
         self.active_ot = self.object_types
         self.active_activities = self.activities
+        if self._active_filter_signature is None:
+            self._active_filter_signature = self.filter_signature
         logger.info(f"OCEL loaded successfully ({backend})")
 
     def update_active_ot_in_model(self, active_ot):
-        self.active_ot = active_ot
-        self.filter_ocel()
+        with self._lock:
+            self.active_ot = active_ot
+            self.filter_ocel()
 
     def update_active_activities_in_model(self, active_activities):
-        self.active_activities = active_activities
-        self.filter_ocel()
+        with self._lock:
+            self.active_activities = active_activities
+            self.filter_ocel()
 
     def update_timestamp_filter(self, start, end):
-        self.filter_timestamp = (start, end)
-        self.filter_ocel()
+        with self._lock:
+            self.filter_timestamp = (start, end)
+            self.filter_ocel()
+
+    def update_sample_fraction(self, fraction: Optional[float]):
+        """
+        Switches sampling mode on or off.
+        :param fraction: The fraction of process executions (or object clusters) to sample, or None for exact results
+        """
+        with self._lock:
+            self.sample_fraction = fraction
+            self.filter_ocel()
+
+    @property
+    def filter_signature(self) -> tuple:
+        """ A canonical, hashable representation of the active filters and the sampling fraction """
+        timestamp = None
+        if self.filter_timestamp is not None:
+            timestamp = tuple(str(t) if t is not None else None for t in self.filter_timestamp)
+        return tuple(sorted(self.active_ot)), tuple(sorted(self.active_activities)), timestamp, self.sample_fraction
+
+    def _persistent_cache_key(self, method_name, args, signature) -> Optional[str]:
+        if self.persistent_cache is None or self.source_hash is None or method_name not in PERSISTENT_CACHE_METHODS:
+            return None
+        settings = tuple(sorted((k, str(v)) for k, v in self.dataset.items() if k != "dataset"))
+        version = (RESULT_CACHE_VERSION, PERSISTENT_CACHE_METHODS[method_name])
+        return PersistentResultCache.make_key(version, self.source_hash, settings, signature, method_name, args)
 
     def filter_ocel(self):
         """
@@ -77,52 +169,109 @@ class Model:
             - timestamp
             - object types
             - activities
+        In sampling mode, the filtered event log is sampled afterwards.
+        The filtered event logs and results of the most recent filter states are kept in an LRU cache,
+        such that returning to a previously seen filter combination does not require any recomputation.
+        Background computations are notified before and after the event log changes.
         """
         if not isinstance(self.original_ocel, Pm4pyEventLog):
             raise NotImplementedError("Filtering is only supported for pm4py event logs.")
-        ocel = self.original_ocel.ocel
-
-        # Timestamp
-        # if self.filter_timestamp is not None:
-        #     start, end = self.filter_timestamp
-        #     if start is None:
-        #         start = ocel.events['ocel:timestamp'].min()
-        #     if end is None:
-        #         end = ocel.events['ocel:timestamp'].max()
-        #     ocel = pm4py.filter_ocel_events_timestamp(ocel, start, end)
-
-        # Object types and activities
-        if self.active_ot and self.active_activities:
-            # example for desired dictionary: {“order”: [“Create Order”], “element”: [“Create Order”, “Create Delivery”]}
-            ot_activity_dict = self.original_ocel.ot_activities
-            active_ot_activity_filter_dict = {}
-            for ot in self.active_ot:
-                active_ot_activity_filter_dict[ot] = []
-                for activity in self.active_activities:
-                    if activity in ot_activity_dict[ot]:
-                        active_ot_activity_filter_dict[ot].append(activity)
-
-            ocel = pm4py.filter_ocel_object_types_allowed_activities(ocel, active_ot_activity_filter_dict)
-
-        # save filtered event log and delete cache
-        self._ocels = [Pm4pyEventLog(self, ocel=ocel)]
+
+        with self._lock:
+            for callback in self.before_filter_callbacks:
+                callback()
+            self._apply_filters()
+            for callback in self.after_filter_callbacks:
+                callback()
+
+    def _apply_filters(self):
+        # Save the current state (the list of OCELs might have been extended in the meantime)
+        if self._active_filter_signature is not None:
+            self._filter_states[self._active_filter_signature] = (self._ocels, self.result_cache)
+
+        signature = self.filter_signature
+        self._active_filter_signature = signature
+        if signature in self._filter_states:
+            logger.info("Filter state found in cache, restoring filtered event log and results")
+            self._ocels, self.result_cache = self._filter_states[signature]
+            self._filter_states.move_to_end(signature)
+            return
+
+        ocel = self.original_ocel.filter_index.apply(object_types=self.active_ot,
+                                                     activities=self.active_activities,
+                                                     timestamp=self.filter_timestamp)
+
+        # save filtered event log with an empty cache
+        self._ocels = self._filtered_ocels(ocel)
+        self.reset_cache()
+        self._filter_states[signature] = (self._ocels, self.result_cache)
+        while len(self._filter_states) > FILTER_STATE_CACHE_SIZE:
+            self._filter_states.popitem(last=False)
+
+    def _filtered_ocels(self, ocel) -> List[OCEL]:
+        """ The OCEL list of a filtered pm4py event log, which is sampled in sampling mode """
+        if self.sample_fraction is not None:
+            sample = StratifiedSample(ocel, self.sample_fraction,
+                                      execution_extraction=self.dataset.get("execution_extraction", LEAD_TYPE),
+                                      leading_type=self.dataset.get("leading_type"))
+            return [Pm4pyEventLog(self, ocel=sample.ocel, sample=sample)]
+        return [Pm4pyEventLog(self, ocel=ocel)]
+
+    def init_filtered_ocel(self, ocel, filter_signature: tuple):
+        """
+        Opens an event log that has been filtered before, e.g. by the parent of a worker process.
+        The original event log is not loaded, so the filters cannot be changed afterwards.
+        :param ocel: The filtered pm4py event log
+        :param filter_signature: The filters applied to the event log (see filter_signature)
+        """
+        self.init_ocel({**self.dataset, "ocel": ocel}, backend=BACKEND_PM4PY)
+        object_types, activities, timestamp, sample_fraction = filter_signature
+        self.active_ot = list(object_types)
+        self.active_activities = list(activities)
+        self.filter_timestamp = timestamp
+        self.sample_fraction = sample_fraction
+        if sample_fraction is not None:
+            self._ocels = self._filtered_ocels(ocel)
+        self._active_filter_signature = self.filter_signature
         self.reset_cache()
 
-    def duplicate_first_to_ocpa(self):
-        """
-        Reduces the self.ocels list to the first entry (assume Pm4pyEventLog), then exports this event log to a file
-        and imports it as an OcpaEventLog, saving it as the second entry in self.ocels
-        """
-        logger.info("Reading the filtered OCEL with ocpa module")
-        target_file = 'tmp.jsonocel'
-        target_path = Path("../data/datasets") / target_file
-        pm4py_ocel = self._ocels[0]
-        self._ocels = [pm4py_ocel]
-        pm4py_ocel.export_json_ocel(target_path)
-        self.init_ocel(dataset={"dataset": target_file, **{k: v for k, v in self.dataset.items() if k != "dataset"}},
-                       backend=BACKEND_OCPA,
-                       )
-        os.remove(target_path)
+    def _worker_log(self, ocels: List[OCEL], signature: tuple) -> Optional[str]:
+        """
+        Saves the filtered event log of a filter state for the worker processes, which load it instead of loading
+        the whole event log and filtering it again (see model/execution.py).
+        Without the disk cache, the snapshots are saved to a temporary directory, which is deleted on shutdown.
+        :return: The path of the filtered snapshot, or None if the workers open the dataset itself
+        """
+        if not isinstance(ocels[0], Pm4pyEventLog) or not snapshots_available():
+            return None
+        sample = ocels[0].sample
+        ocel, original = sample.source if sample is not None else ocels[0].ocel, self.original_ocel.ocel
+        if all(len(getattr(ocel, table)) == len(getattr(original, table)) for table in SNAPSHOT_TABLES):
+            # Nothing filtered
+            return None
+        # Saved once per filter state, later calls only mark the snapshot as recently used
+        with self._worker_logs_lock:
+            if self.disk_cache:
+                source_hash = self.source_hash or file_content_hash(Path("../data/datasets") / self.dataset["dataset"])
+                return save_filtered_snapshot(ocel, make_key(source_hash, signature[:3]))
+            if self._worker_logs_dir is None:
+                self._worker_logs_dir = tempfile.mkdtemp(prefix="filtered-")
+            return save_filtered_snapshot(ocel, make_key(signature[:3]), directory=self._worker_logs_dir)
+
+    def duplicate_first_to_ocpa(self, ocels: List[OCEL]):
+        """
+        Reduces the given OCEL list to the first entry (assume Pm4pyEventLog), then converts this event log
+        to an OcpaEventLog in memory, saving it as the second entry.
+        The list is modified in place, such that the saved filter state stays consistent.
+        """
+        pm4py_ocel = ocels[0]
+        if not isinstance(pm4py_ocel, Pm4pyEventLog):
+            # Event logs opened with BACKEND_OCPA cannot be extended
+            return False
+        logger.info("Converting the filtered OCEL to an ocpa event log")
+        settings = {k: v for k, v in self.dataset.items() if k != "dataset"}
+        ocpa_ocel = OcpaEventLog(self, ocel=pm4py_ocel.ocel, **settings)
+        ocels[1:] = [ocpa_ocel]
         return True
 
     def export_json_ocel(self, path):
@@ -150,37 +299,102 @@ class Model:
     def _execute_ocel_method(self, method_name, *args):
         """
         Manages multiple OCEL wrapper instances, with caching.
+        Concurrent requests with the same method, args and filter state are computed only once (single-flight):
+        the first caller computes the result, the others wait for it.
         :param method_name: The name of the method to be called on an OCEL wrapper instance
         :param *args: Further args. Must be hashable.
         """
-
-        if args:
-            args_key = tuple(args)
-        if self.result_cache.get(method_name, None) is not None:
-            if args:
-                if args_key in self.result_cache[method_name]:
-                    return self.result_cache[method_name][args_key]
+        with self._lock:
+            # The request is answered for the filter state at the time of calling, even if the filters change meanwhile
+            ocels, result_cache, signature = self._ocels, self.result_cache, self._active_filter_signature
+            hit, result = self._get_from_cache(result_cache, method_name, args)
+            if hit:
+                instrumentation.count(method_name, "cache_hit")
+                return result
+            key = (signature, method_name, tuple(args))
+            future = self._in_flight.get(key)
+            if future is None:
+                future = self._in_flight[key] = Future()
+                is_leader = True
             else:
-                return self.result_cache[method_name]
+                is_leader = False
+
+        if not is_leader:
+            logger.info(f"Request '{method_name}' (waiting for concurrent computation)")
+            try:
+                with instrumentation.span(method_name, category="wait"):
+                    return self._wait_for(future)
+            except TaskCancelled:
+                # Either this request has been cancelled (raises again), or only the computing one (retry)
+                check_cancelled()
+                return self._execute_ocel_method(method_name, *args)
+
+        instrumentation.count(method_name, "cache_miss")
+        try:
+            with instrumentation.span(method_name, category="model"):
+                result = self._compute(method_name, args, ocels, signature)
+            # A cancelled task's result must not be cached
+            check_cancelled()
+            with self._lock:
+                self._save_to_cache(result_cache, method_name, args, result)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                if self._in_flight.get(key) is future:
+                    del self._in_flight[key]
+
+    @staticmethod
+    def _wait_for(future: Future):
+        """ Waits for the result of a concurrent computation, while staying responsive to cancellation """
+        while True:
+            check_cancelled()
+            try:
+                return future.result(timeout=PROCESS_POLL_INTERVAL)
+            except FutureTimeoutError:
+                continue
+
+    def _compute(self, method_name, args, ocels: List[OCEL], signature):
+        persistent_key = self._persistent_cache_key(method_name, args, signature)
+        if persistent_key is not None:
+            hit, result = self.persistent_cache.get(persistent_key)
+            if hit:
+                logger.info(f"Request '{method_name}' (loaded from persistent cache)")
+                instrumentation.count(method_name, "persistent_cache_hit")
+                return result
+
+        if method_name in PROCESS_METHODS and current_backend() == EXECUTION_PROCESS and "dataset" in self.dataset:
+            logger.info(f"Request '{method_name}' (not in cache, executing in worker process)")
+            # The worker saves the result to the persistent cache
+            with instrumentation.span(method_name, category="process"):
+                return self.process_executor.run(self.dataset, self.backend, signature,
+                                                 self.persistent_cache is not None, method_name, tuple(args),
+                                                 filtered_log=self._worker_log(ocels, signature),
+                                                 worker=current_worker())
 
         logger.info(f"Request '{method_name}' (not in cache)")
         i = 0
-        while i < len(self._ocels):
-            method = getattr(self._ocels[i], method_name)
+        while i < len(ocels):
+            check_cancelled()
+            method = getattr(ocels[i], method_name)
             result = method(*args)
             if result is not None:
-                if args:
-                    if method_name not in self.result_cache:
-                        self.result_cache[method_name] = {}
-                    self.result_cache[method_name][args_key] = result
-                else:
-                    self.result_cache[method_name] = result
+                check_cancelled()
+                if persistent_key is not None:
+                    self.persistent_cache.set(persistent_key, result)
                 return result
 
             # Extend OCEL list? (copy pm4py log to ocpa)
-            if len(self._ocels) == i + 1 and self.ocels_traverse_extensions[i] is not None:
-                logger.info("Extend OCEL list ...")
-                extended = self.ocels_traverse_extensions[i]()
+            if len(ocels) == i + 1 and self.ocels_traverse_extensions[i] is not None:
+                with self._extension_lock:
+                    # Another request might have extended the list while waiting for the lock
+                    extended = True
+                    if len(ocels) == i + 1:
+                        logger.info("Extend OCEL list ...")
+                        extended = self.ocels_traverse_extensions[i](ocels)
                 if not extended:
                     break
 
@@ -188,6 +402,26 @@ class Model:
 
         raise NotImplementedError("The model's event log(s) do not support the requested method.")
 
+    @staticmethod
+    def _get_from_cache(result_cache: dict, method_name, args):
+        """ :return: A tuple (hit, result) """
+        if result_cache.get(method_name, None) is not None:
+            if args:
+                if tuple(args) in result_cache[method_name]:
+                    return True, result_cache[method_name][tuple(args)]
+            else:
+                return True, result_cache[method_name]
+        return False, None
+
+    @staticmethod
+    def _save_to_cache(result_cache: dict, method_name, args, result):
+        if args:
+            if method_name not in result_cache:
+                result_cache[method_name] = {}
+            result_cache[method_name][tuple(args)] = result
+        else:
+            result_cache[method_name] = result
+
     @property
     def object_types(self) -> List[str]:
         return self._execute_ocel_method("_get_object_types")
@@ -239,10 +473,26 @@ class Model:
     def compute_heatmap_lagging(self):
         return self._execute_ocel_method("_compute_heatmap_lagging")
     
+    def sampling_error(self, method_name: str, *args) -> Optional[Dict]:
+        """
+        Estimates the sampling error of a model method's result (see Pm4pyEventLog._get_sampling_error).
+        :param method_name: The name of the OCEL method, e.g. '_compute_heatmap'
+        :return: The sample description and error estimate, or None if sampling mode is off
+        """
+        if self.sample_fraction is None:
+            return None
+        return self._execute_ocel_method("_get_sampling_error", method_name, tuple(args)) or None
+
     def reset_cache(self) -> None:
         """
         When any event log changes are made, this function is called.
         """
         self.result_cache = {}
-        
 
+    def shutdown(self) -> None:
+        """ Stops the worker processes, called when the app is closed. """
+        self.process_executor.shutdown()
+        with self._worker_logs_lock:
+            if self._worker_logs_dir is not None:
+                shutil.rmtree(self._worker_logs_dir, ignore_errors=True)
+                self._worker_logs_dir = None
@@ -0,0 +1,275 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Collection, Dict, List, Optional, Tuple
+
+import networkx as nx
+import numpy as np
+import pandas as pd
+from pm4py.ocel import OCEL as Pm4pyEventLogObject
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+from model.cancellation import check_cancelled
+from model.constants import PROCESS_EXECUTION_CHUNK_SIZE, PROCESS_EXECUTION_THREADS, VARIANT_HASH_PARALLEL_MIN_GRAPHS
+
+logger = logging.getLogger("app_logger")
+
+# Process execution extraction techniques (same names as in ocpa)
+CONN_COMP = "connected_components"
+LEAD_TYPE = "leading_type"
+
+MULTILINE_GRAPH_LABELS = True
+
+
+class ProcessExecutions:
+    """
+    Process executions (object-centric cases) of a pm4py event log and their variants, extracted like ocpa does,
+    but on sparse matrices instead of networkx graphs:
+        - Connected components: components of the event-object incidence graph
+        - Leading type: For each object of the leading type, objects are added level by level along the object graph
+          (objects sharing an event). Each object type is only added on the level where it is first reached.
+          The process execution contains all events of these objects. Chunks of leading objects are expanded in
+          parallel threads (the sparse products release the GIL).
+          Process executions are ordered like ocpa's: by the first event of their leading object. ocpa orders leading
+          objects first appearing in the same event by set iteration, which depends on the string hash seed of the
+          process; here they are ordered by their id.
+    Variants are the Weisfeiler-Lehman hashes of the process executions' event graphs (events connected by the
+    objects' directly-follows relations, labeled with activities and object types), as in ocpa's two-phase variant
+    calculation without refinement. Isomorphic graphs with the same event order are hashed only once.
+    Events are identified by their index in the chronologically sorted event log, like the event ids of ocpa.
+    :param leading_objects: Object ids of the leading type to extract process executions for (default: all)
+    :param compute_variants: Whether to compute the variants of the process executions
+    :param executor: Optional ProcessExecutor (see model/execution.py) hashing many variant graphs in its workers
+    """
+
+    def __init__(self, ocel: Pm4pyEventLogObject, execution_extraction: str = LEAD_TYPE,
+                 leading_type: Optional[str] = None, leading_objects: Optional[Collection[str]] = None,
+                 compute_variants: bool = True, executor=None):
+        self.executor = executor
+        eid_col, act_col, ts_col = ocel.event_id_column, ocel.event_activity, ocel.event_timestamp
+        events = ocel.events.sort_values(ts_col, kind="stable").reset_index(drop=True)
+        self.event_ids = events[eid_col].values
+        self.activities = events[act_col].values
+        num_events = len(events)
+
+        relations = ocel.relations
+        rel = pd.DataFrame({
+            "event": pd.Index(events[eid_col]).get_indexer(relations[eid_col]),
+            "ot": relations[ocel.object_type_column].values,
+            "oid": relations[ocel.object_id_column].values,
+        })
+        rel = rel[rel["event"] >= 0].drop_duplicates(["event", "oid"])
+        # Object codes in the order of (object type, object id), like the sorted object lists of ocpa's graph labels
+        codes, objects = pd.factorize(pd.MultiIndex.from_arrays([rel["ot"], rel["oid"]]), sort=True)
+        self.objects: List[Tuple[str, str]] = list(objects)
+        self.object_types = [ot for ot, _ in self.objects]
+        num_objects = len(self.objects)
+
+        self.incidence = sparse.csr_matrix((np.ones(len(rel), dtype=bool), (rel["event"].values, codes)),
+                                           shape=(num_events, num_objects))
+        self.incidence.sort_indices()
+        self.event_objects = np.split(self.incidence.indices, self.incidence.indptr[1:-1])
+
+        # Directly-follows relations of the objects' events (ocpa's event graph)
+        order = np.lexsort((rel["event"].values, codes))
+        ordered_events, ordered_objects = rel["event"].values[order], codes[order]
+        same_object = ordered_objects[1:] == ordered_objects[:-1]
+        edges = sparse.csr_matrix((np.ones(same_object.sum(), dtype=bool),
+                                   (ordered_events[:-1][same_object], ordered_events[1:][same_object])),
+                                  shape=(num_events, num_events))
+        edges.sort_indices()
+        self.successors = np.split(edges.indices, edges.indptr[1:-1])
+        check_cancelled()
+
+        # Ids of the leading objects of the process executions (leading type extraction only)
+        self.leading_objects: Optional[List[str]] = None
+        if execution_extraction == LEAD_TYPE and leading_type in self.object_types:
+            leading, self.cases, case_objects = self._leading_type_executions(leading_type, leading_objects)
+            self.leading_objects = [self.objects[o][1] for o in leading]
+        else:
+            if execution_extraction == LEAD_TYPE:
+                logger.warning(f"Leading type '{leading_type}' not found, using connected components")
+            self.cases, case_objects = self._connected_components()
+        self.case_objects = [[self.objects[o] for o in objs] for objs in case_objects]
+        check_cancelled()
+
+        self._case_object_codes = case_objects
+        self.variants, self.variant_frequencies, self.variant_cases = [], [], {}
+        if compute_variants:
+            self.variants, self.variant_frequencies, self.variant_cases = self._compute_variants()
+
+    def _connected_components(self) -> Tuple[List[List[int]], List[np.ndarray]]:
+        num_events = self.incidence.shape[0]
+        adjacency = sparse.bmat([[None, self.incidence], [self.incidence.T, None]], format="csr")
+        _, labels = connected_components(adjacency, directed=False)
+        event_labels = labels[:num_events]
+        order = np.argsort(event_labels, kind="stable")
+        boundaries = np.flatnonzero(np.diff(event_labels[order])) + 1
+        components = sorted(np.split(order, boundaries) if num_events else [], key=len, reverse=True)
+        cases = [np.sort(events).tolist() for events in components]
+        case_objects = [np.unique(self.incidence[events].indices) for events in components]
+        return cases, case_objects
+
+    def _leading_type_executions(self, leading_type: str, leading_objects: Optional[Collection[str]] = None) \
+            -> Tuple[np.ndarray, List[List[int]], List[np.ndarray]]:
+        """ :return: The leading objects (codes), and the events and objects of their process executions """
+        object_type_list = sorted(set(self.object_types))
+        ot_codes = pd.Categorical(self.object_types, categories=object_type_list).codes
+        leading_code = object_type_list.index(leading_type)
+        leading = np.flatnonzero(ot_codes == leading_code)
+        if leading_objects is not None:
+            leading_ids = pd.Index([self.objects[o][1] for o in leading])
+            leading = leading[leading_ids.isin(list(leading_objects))]
+        # ocpa's order: by first event, objects are already sorted by id
+        by_object = self.incidence.tocsc()
+        by_object.sort_indices()
+        leading = leading[np.argsort(by_object.indices[by_object.indptr[leading]], kind="stable")]
+        num_objects, num_ots = len(self.objects), len(object_type_list)
+
+        # Object graph: objects sharing an event
+        adjacency = (self.incidence.T.astype(np.int32) @ self.incidence.astype(np.int32)).tocsr()
+        adjacency.setdiag(0)
+        adjacency.eliminate_zeros()
+        type_matrix = sparse.csr_matrix((np.ones(num_objects), (np.arange(num_objects), ot_codes)),
+                                        shape=(num_objects, num_ots))
+        object_events = self.incidence.T.astype(np.float64).tocsr()
+
+        def expand(chunk: np.ndarray) -> Tuple[List[List[int]], List[np.ndarray]]:
+            rows = np.arange(len(chunk))
+            members = sparse.csr_matrix((np.ones(len(chunk)), (rows, chunk)), shape=(len(chunk), num_objects))
+            # Level on which each object type was first reached, per leading object
+            type_levels = np.full((len(chunk), num_ots), -1)
+            type_levels[:, leading_code] = 0
+            frontier = members @ adjacency
+            for level in range(1, num_ots):
+                candidates = frontier.tocoo()
+                reached = (frontier.astype(bool).astype(np.int32) @ type_matrix).toarray() > 0
+                type_levels[reached & (type_levels < 0)] = level
+                keep = type_levels[candidates.row, ot_codes[candidates.col]] == level
+                level_members = sparse.csr_matrix((np.ones(keep.sum()), (candidates.row[keep], candidates.col[keep])),
+                                                  shape=members.shape)
+                members = members + level_members
+                frontier = level_members @ adjacency
+            members = members.tocsr()
+            members.sort_indices()
+            chunk_events = (members @ object_events).tocsr()
+            chunk_events.sort_indices()
+            return ([chunk_events.indices[chunk_events.indptr[i]:chunk_events.indptr[i + 1]].tolist() for i in rows],
+                    [members.indices[members.indptr[i]:members.indptr[i + 1]] for i in rows])
+
+        chunks = [leading[start:start + PROCESS_EXECUTION_CHUNK_SIZE]
+                  for start in range(0, len(leading), PROCESS_EXECUTION_CHUNK_SIZE)]
+        cases, case_objects = [], []
+        threads = min(PROCESS_EXECUTION_THREADS, len(chunks))
+        # The threads do not see the task's cancellation token, it is checked here after each chunk
+        pool = ThreadPoolExecutor(max_workers=threads, thread_name_prefix="executions") if threads > 1 else None
+        try:
+            for chunk_cases, chunk_objects in (pool.map(expand, chunks) if pool is not None else map(expand, chunks)):
+                check_cancelled()
+                cases += chunk_cases
+                case_objects += chunk_objects
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        return leading, cases, case_objects
+
+    def _case_graph(self, case: int) -> Tuple[List[int], List[str], List[Tuple[int, int, List[int]]]]:
+        """
+        Projects the event graph on a process execution, like ocpa: Events and edges are labeled with the object types
+        of their (shared) objects that belong to the process execution.
+        :return: The events, their labels and the edges (source, target, shared objects) using indices of the events
+        """
+        case_objects = set(self._case_object_codes[case].tolist())
+        nodes, labels, index = [], [], {}
+        for event in self.cases[case]:
+            objects = [o for o in self.event_objects[event].tolist() if o in case_objects]
+            if not objects:
+                continue
+            index[event] = len(nodes)
+            nodes.append(event)
+            labels.append(self.activities[event] + ": ".join(self.object_types[o] for o in objects))
+        edges = []
+        for event in nodes:
+            source_objects = None
+            for target in self.successors[event].tolist():
+                if target not in index:
+                    continue
+                if source_objects is None:
+                    source_objects = [o for o in self.event_objects[event].tolist() if o in case_objects]
+                target_objects = set(self.event_objects[target].tolist())
+                shared = [o for o in source_objects if o in target_objects]
+                if shared:
+                    edges.append((index[event], index[target], shared))
+        return nodes, labels, edges
+
+    def _compute_variants(self) -> Tuple[List[str], List[float], Dict[str, List[int]]]:
+        # Cases with identical graphs (including the order of events) are hashed once
+        signatures: Dict[tuple, List[int]] = {}
+        for case in range(len(self.cases)):
+            _, labels, edges = self._case_graph(case)
+            signature = (tuple(labels), tuple((i, j, ": ".join(self.object_types[o] for o in shared))
+                                              for i, j, shared in edges))
+            signatures.setdefault(signature, []).append(case)
+            if case % PROCESS_EXECUTION_CHUNK_SIZE == 0:
+                check_cancelled()
+        unique = list(signatures)
+        hashes = hash_graphs_in_chunks(unique, self.executor)
+
+        variant_cases: Dict[str, List[int]] = {}
+        for signature, variant in zip(unique, hashes):
+            variant_cases.setdefault(variant, []).extend(signatures[signature])
+        for cases in variant_cases.values():
+            cases.sort()
+        num_cases = len(self.cases)
+        ordered = sorted(variant_cases.items(), key=lambda item: (-len(item[1]), item[1][0]))
+        variants = [variant for variant, _ in ordered]
+        frequencies = [len(cases) / num_cases for _, cases in ordered]
+        return variants, frequencies, dict(ordered)
+
+    def variant_graph(self, variant_id: str) -> Tuple[nx.DiGraph, Dict[Tuple[int, int], Dict[str, int]]]:
+        """
+        The event graph of the first process execution of a variant, labeled for display.
+        :return: The graph (nodes are event ids) and the object type counts per edge
+        """
+        case = self.variant_cases[variant_id][0]
+        nodes, _, edges = self._case_graph(case)
+        G = nx.DiGraph()
+        for event in nodes:
+            G.add_node(event, label=self.activities[event])
+        ot_label_connector = "\n" if MULTILINE_GRAPH_LABELS else ", "
+        ot_counts = {}
+        for i, j, shared in edges:
+            edge_ot_counts = pd.Series([self.object_types[o] for o in shared]).value_counts(sort=False).to_dict()
+            label_parts = [f"{count}x {ot}" if count > 1 else ot for ot, count in edge_ot_counts.items()]
+            G.add_edge(nodes[i], nodes[j], label=ot_label_connector.join(label_parts))
+            ot_counts[(nodes[i], nodes[j])] = edge_ot_counts
+        return G, ot_counts
+
+
+def graph_hash(signature: tuple) -> str:
+    """ Weisfeiler-Lehman hash of a graph given as (node labels, edges (source, target, type)) """
+    labels, edges = signature
+    G = nx.DiGraph()
+    G.add_nodes_from((i, {"label": label}) for i, label in enumerate(labels))
+    G.add_edges_from((i, j, {"type": edge_type}) for i, j, edge_type in edges)
+    return nx.weisfeiler_lehman_graph_hash(G, node_attr="label", edge_attr="type")
+
+
+def _hash_chunk(signatures: List[tuple]) -> List[str]:
+    return [graph_hash(signature) for signature in signatures]
+
+
+def hash_graphs_in_chunks(signatures: List[tuple], executor=None) -> List[str]:
+    """
+    Hashes graphs in chunks. Large numbers of graphs are distributed to the workers of the executor, if given.
+    """
+    chunks = [signatures[i:i + PROCESS_EXECUTION_CHUNK_SIZE] for i in range(0, len(signatures), PROCESS_EXECUTION_CHUNK_SIZE)]
+    if executor is not None and executor.parallel and len(signatures) >= VARIANT_HASH_PARALLEL_MIN_GRAPHS:
+        logger.info(f"Hashing {len(signatures)} graphs in {executor.max_workers} worker processes")
+        chunk_hashes = executor.map(_hash_chunk, chunks)
+    else:
+        chunk_hashes = []
+        for chunk in chunks:
+            check_cancelled()
+            chunk_hashes.append(_hash_chunk(chunk))
+    return [h for hashes in chunk_hashes for h in hashes]
@@ -0,0 +1,95 @@
+import logging
+from copy import copy
+from typing import Collection, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pm4py.ocel import OCEL as Pm4pyEventLogObject
+
+logger = logging.getLogger("app_logger")
+
+
+class OcelFilterIndex:
+    """
+    Index over a pm4py event log, built once at load time, that turns filters into cheap mask operations.
+    Activities and object types of the relations are stored as categorical codes, next to event and object positions,
+    such that a filter only needs to look up the active categories per code and gather the matching rows.
+    The filtered event log is equivalent to the one produced by pm4py's filtering functions, except for objects without
+    events: pm4py drops them on any filter, here they are kept unless their object type is filtered out.
+    """
+
+    def __init__(self, ocel: Pm4pyEventLogObject):
+        self.ocel = ocel
+        events, objects, relations = ocel.events, ocel.objects, ocel.relations
+
+        self.activities = pd.Index(pd.unique(events[ocel.event_activity]))
+        self.object_types = pd.Index(pd.unique(objects[ocel.object_type_column]))
+        event_ids = pd.Index(events[ocel.event_id_column])
+        object_ids = pd.Index(objects[ocel.object_id_column])
+
+        self.timestamps = pd.DatetimeIndex(events[ocel.event_timestamp])
+
+        # Per relation: positions of the event and object, and categorical codes of activity and object type
+        self.relation_events = event_ids.get_indexer(relations[ocel.event_id_column])
+        self.relation_objects = object_ids.get_indexer(relations[ocel.object_id_column])
+        self.relation_activities = self.activities.get_indexer(relations[ocel.event_activity])
+        self.relation_types = self.object_types.get_indexer(relations[ocel.object_type_column])
+        self.valid_relations = (self.relation_events >= 0) & (self.relation_objects >= 0)
+
+        # Per object: categorical code of the object type, and whether it has no events at all
+        self.object_codes = self.object_types.get_indexer(objects[ocel.object_type_column])
+        self.isolated_objects = np.bincount(self.relation_objects[self.valid_relations],
+                                            minlength=len(object_ids)) == 0
+
+    def _category_mask(self, categories: pd.Index, active: Collection[str]) -> np.ndarray:
+        """ Boolean lookup table, indexed by categorical code """
+        mask = np.zeros(len(categories) + 1, dtype=bool)  # The last entry is used for unknown values (code -1)
+        mask[categories.get_indexer(list(active))] = True
+        mask[-1] = False
+        return mask
+
+    def _timestamp_mask(self, start, end) -> np.ndarray:
+        mask = np.ones(len(self.timestamps), dtype=bool)
+        if start is not None:
+            mask &= self.timestamps >= pd.Timestamp(start)
+        if end is not None:
+            mask &= self.timestamps <= pd.Timestamp(end)
+        return mask
+
+    def apply(self,
+              object_types: Optional[Collection[str]] = None,
+              activities: Optional[Collection[str]] = None,
+              timestamp: Optional[Tuple] = None) -> Pm4pyEventLogObject:
+        """
+        Filters the event log. Objects are kept if any of their relations is kept, or if they have no events
+        (and an active object type).
+        :param object_types: Object types to keep. Only applied together with activities.
+        :param activities: Activities to keep. Only applied together with object types.
+        :param timestamp: A tuple (start, end) of the allowed timestamp range. Both values can be None.
+        :return: The filtered pm4py event log
+        """
+        num_events, num_objects = len(self.timestamps), len(self.ocel.objects)
+        event_mask = np.ones(num_events, dtype=bool)
+        if timestamp is not None:
+            event_mask = self._timestamp_mask(*timestamp)
+        relation_mask = event_mask[self.relation_events] & self.valid_relations
+        # Objects without events are not affected by the timestamp and activity filters
+        isolated_mask = self.isolated_objects
+
+        if object_types and activities:
+            # Keep relations of active object types with active activities, then keep their events
+            type_mask = self._category_mask(self.object_types, object_types)
+            relation_mask &= type_mask[self.relation_types]
+            relation_mask &= self._category_mask(self.activities, activities)[self.relation_activities]
+            event_mask = np.bincount(self.relation_events[relation_mask], minlength=num_events) > 0
+            isolated_mask = isolated_mask & type_mask[self.object_codes]
+
+        object_mask = (np.bincount(self.relation_objects[relation_mask], minlength=num_objects) > 0) | isolated_mask
+
+        filtered_ocel = copy(self.ocel)
+        filtered_ocel.events = self.ocel.events[event_mask]
+        filtered_ocel.relations = self.ocel.relations[relation_mask]
+        filtered_ocel.objects = self.ocel.objects[object_mask]
+        logger.info(f"Filtered event log: {event_mask.sum()}/{num_events} events, "
+                    f"{object_mask.sum()}/{num_objects} objects")
+        return filtered_ocel
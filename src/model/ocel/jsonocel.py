@@ -0,0 +1,148 @@
+import logging
+from datetime import datetime
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+import pm4py
+from pm4py.ocel import OCEL as Pm4pyEventLogObject
+from pm4py.objects.ocel import constants as ocel_constants
+
+from model.constants import IMPORT_CHUNK_SIZE
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+logger = logging.getLogger("app_logger")
+
+EVENT_ID = ocel_constants.DEFAULT_EVENT_ID
+EVENT_ACTIVITY = ocel_constants.DEFAULT_EVENT_ACTIVITY
+EVENT_TIMESTAMP = ocel_constants.DEFAULT_EVENT_TIMESTAMP
+OBJECT_ID = ocel_constants.DEFAULT_OBJECT_ID
+OBJECT_TYPE = ocel_constants.DEFAULT_OBJECT_TYPE
+GLOBAL_KEYS = [ocel_constants.OCEL_GLOBAL_LOG, ocel_constants.OCEL_GLOBAL_EVENT, ocel_constants.OCEL_GLOBAL_OBJECT]
+
+
+def read_ocel(filename: str, chunk_size: int = IMPORT_CHUNK_SIZE) -> Pm4pyEventLogObject:
+    """
+    Imports an event log. jsonocel files are streamed if ijson is available, other formats are read by pm4py.
+    :param filename: Path to the event log file
+    :param chunk_size: Number of events or objects that are parsed before being converted to a DataFrame chunk
+    :return: The pm4py event log
+    """
+    if ijson is None or not filename.lower().endswith("jsonocel"):
+        return pm4py.read_ocel(filename)
+    return read_jsonocel_streaming(filename, chunk_size=chunk_size)
+
+
+def read_jsonocel_streaming(filename: str, chunk_size: int = IMPORT_CHUNK_SIZE) -> Pm4pyEventLogObject:
+    """
+    Imports a jsonocel file without loading the whole JSON document into memory.
+    Objects and events are parsed one by one in separate passes over the file, collected in column buffers,
+    and converted to DataFrames chunk by chunk. The result equals pm4py's jsonocel importer.
+    :param filename: Path to the jsonocel file
+    :param chunk_size: Number of events or objects that are parsed before being converted to a DataFrame chunk
+    :return: The pm4py event log
+    """
+    objects = _read_objects(filename, chunk_size)
+    events, relations = _read_events(filename, chunk_size)
+
+    object_types = pd.Series(objects[OBJECT_TYPE].values, index=objects[OBJECT_ID].values)
+    relations[OBJECT_TYPE] = relations[OBJECT_ID].map(object_types)
+
+    # Same order as pm4py: by timestamp, ties broken by the position in the file
+    events = events.sort_values(EVENT_TIMESTAMP, kind="stable")
+    relations = relations.sort_values(EVENT_TIMESTAMP, kind="stable")
+
+    return Pm4pyEventLogObject(events, objects, relations, _read_globals(filename))
+
+
+def _read_globals(filename: str) -> Dict:
+    globals_ = {}
+    for key in GLOBAL_KEYS:
+        # The global sections usually precede the events, the parser stops as soon as it finds them
+        with open(filename, "rb") as f:
+            globals_[key] = next(ijson.items(f, key, use_float=True), {})
+    return globals_
+
+
+def _read_objects(filename: str, chunk_size: int) -> pd.DataFrame:
+    chunks = []
+    ids, types, attributes = [], [], []
+
+    def flush():
+        chunk = pd.DataFrame({OBJECT_ID: ids, OBJECT_TYPE: types})
+        chunks.append(_with_attributes(chunk, attributes))
+        ids.clear()
+        types.clear()
+        attributes.clear()
+
+    with open(filename, "rb") as f:
+        for object_id, obj in ijson.kvitems(f, ocel_constants.OCEL_OBJECTS_KEY, use_float=True):
+            ids.append(object_id)
+            types.append(obj[OBJECT_TYPE])
+            attributes.append(obj.get(ocel_constants.OCEL_OVMAP_KEY, {}))
+            if len(ids) >= chunk_size:
+                flush()
+    if ids or not chunks:
+        flush()
+    return pd.concat(chunks, ignore_index=True, sort=False)
+
+
+def _read_events(filename: str, chunk_size: int):
+    event_chunks, relation_chunks = [], []
+    ids, activities, timestamps, attributes = [], [], [], []
+    relation_counts, relation_objects = [], []
+
+    def flush():
+        timestamp_values = _parse_timestamps(timestamps)
+        chunk = pd.DataFrame({EVENT_ID: ids, EVENT_TIMESTAMP: timestamp_values, EVENT_ACTIVITY: activities})
+        event_chunks.append(_with_attributes(chunk, attributes))
+
+        # One relation per (event, object) pair, repeating the event's columns
+        positions = np.repeat(np.arange(len(ids)), relation_counts)
+        relation_chunks.append(pd.DataFrame({
+            EVENT_ID: np.array(ids, dtype=object)[positions],
+            EVENT_ACTIVITY: np.array(activities, dtype=object)[positions],
+            EVENT_TIMESTAMP: timestamp_values.iloc[positions].reset_index(drop=True),
+            OBJECT_ID: pd.Series(relation_objects, dtype=object),
+        }))
+        for buffer in [ids, activities, timestamps, attributes, relation_counts, relation_objects]:
+            buffer.clear()
+
+    with open(filename, "rb") as f:
+        for event_id, event in ijson.kvitems(f, ocel_constants.OCEL_EVENTS_KEY, use_float=True):
+            ids.append(event_id)
+            activities.append(event[EVENT_ACTIVITY])
+            timestamps.append(event[EVENT_TIMESTAMP])
+            attributes.append(event.get(ocel_constants.OCEL_VMAP_KEY, {}))
+            omap = event.get(ocel_constants.OCEL_OMAP_KEY, [])
+            relation_counts.append(len(omap))
+            relation_objects.extend(omap)
+            if len(ids) >= chunk_size:
+                flush()
+    if ids or not event_chunks:
+        flush()
+    events = pd.concat(event_chunks, ignore_index=True, sort=False)
+    relations = pd.concat(relation_chunks, ignore_index=True, sort=False)
+    return events, relations
+
+
+def _with_attributes(chunk: pd.DataFrame, attributes: List[Dict]) -> pd.DataFrame:
+    """ Appends the attribute maps (vmap/ovmap) of a chunk as columns, in order of appearance """
+    if not any(attributes):
+        return chunk
+    attribute_df = pd.DataFrame.from_records(attributes)
+    attribute_df = attribute_df.drop(columns=[c for c in attribute_df.columns if c in chunk.columns])
+    return pd.concat([chunk, attribute_df], axis=1)
+
+
+def _parse_timestamps(values: List[str]) -> pd.Series:
+    """ Vectorized version of the ISO timestamp parsing done by pm4py """
+    try:
+        return pd.Series(pd.to_datetime(values, format="ISO8601"))
+    except (ValueError, TypeError):
+        # e.g. mixed UTC offsets, which pandas cannot hold in one datetime column
+        return pd.Series([datetime.fromisoformat(value) for value in values], dtype=object)
@@ -9,8 +9,17 @@ from ocpa.algo.enhancement.token_replay_based_performance import algorithm as pe
 from ocpa.algo.util.process_executions.factory import LEAD_TYPE
 from ocpa.algo.util.variants.factory import TWO_PHASE
 from ocpa.objects.log.importer.ocel import factory as ocel_import_factory
+from ocpa.objects.log.ocel import OCEL as OcpaEventLogObject
+from ocpa.objects.log.variants.obj import Event, Obj, ObjectCentricEventLog, MetaObjectCentricData, \
+    RawObjectCentricData
+from ocpa.objects.log.variants.table import Table
+from ocpa.objects.log.variants.graph import EventGraph
+import ocpa.objects.log.variants.util.table as table_utils
+from pm4py.ocel import OCEL as Pm4pyEventLogObject
 
 from model.ocel.base import OCEL
+from model.ocel.executions import MULTILINE_GRAPH_LABELS
+from model.ocel.opera import OPERA_OT_MEASURES, OPERA_OVERALL_MEASURES, OPERA_MEASURES
 
 OCPA_DEFAULT_SETTINGS = {
     "execution_extraction": LEAD_TYPE,
@@ -19,29 +28,30 @@ OCPA_DEFAULT_SETTINGS = {
     "exact_variant_calculation": False
 }
 
-OPERA_OT_MEASURES = ["lagging_time", "pooling_time"]
-OPERA_OVERALL_MEASURES = ['waiting_time', 'service_time', 'sojourn_time', 'synchronization_time', 'flow_time']
-OPERA_MEASURES = OPERA_OVERALL_MEASURES + OPERA_OT_MEASURES
 
 logger = logging.getLogger("app_logger")
 
-MULTILINE_GRAPH_LABELS = True
-
 
 class OcpaEventLog(OCEL):
     """
     Event log wrapper using the ocpa module
     """
 
-    def __init__(self, model, dataset, **kwargs):
+    def __init__(self, model, **kwargs):
         super().__init__(model, ocel_type="ocpa", **kwargs)
 
-        filename = Path("../data/datasets") / dataset
-        logger.info(f"Importing dataset {filename}")
         # https://ocpa.readthedocs.io/en/latest/eventlogmanagement.html
         params = {k: kwargs.get(k, default) for k, default in OCPA_DEFAULT_SETTINGS.items()}
 
-        self.ocel = ocel_import_factory.apply(filename, parameters=params)
+        if "ocel" in kwargs and isinstance(kwargs["ocel"], Pm4pyEventLogObject):
+            logger.info("Converting pm4py event log to ocpa")
+            self.ocel = pm4py_to_ocpa(kwargs["ocel"], parameters=params)
+        elif "dataset" in kwargs:
+            filename = Path("../data/datasets") / kwargs["dataset"]
+            logger.info(f"Importing dataset {filename}")
+            self.ocel = ocel_import_factory.apply(filename, parameters=params)
+        else:
+            raise ValueError("ocpa event log could not be instantiated.")
 
     def _get_object_types(self):
         return self.ocel.object_types
@@ -157,3 +167,121 @@ class OcpaEventLog(OCEL):
 
     def _get_extended_table(self):
         return None  # Use pm4py
+
+
+def _group_lists(keys, values) -> Dict:
+    """ Groups values by key into lists (much faster than DataFrame.groupby(...).agg(list)), keeping their order """
+    codes, uniques = pd.factorize(np.asarray(keys))
+    if len(codes) == 0:
+        return {}
+    order = np.argsort(codes, kind="stable")
+    codes, values = codes[order], np.asarray(values, dtype=object)[order]
+    boundaries = np.flatnonzero(codes[1:] != codes[:-1]) + 1
+    starts = np.concatenate([[0], boundaries])
+    return {uniques[codes[start]]: chunk.tolist() for start, chunk in zip(starts, np.split(values, boundaries))}
+
+
+def _value_maps(df: pd.DataFrame, columns: List[str]) -> List[Dict]:
+    """ Converts the given columns of a DataFrame to one dict per row, omitting missing values """
+    if not columns:
+        return [{} for _ in range(len(df))]
+    return [{k: v for k, v in row.items() if not _is_missing(v)} for row in df[columns].to_dict("records")]
+
+
+def _is_missing(value) -> bool:
+    return not isinstance(value, (list, dict)) and pd.isna(value)
+
+
+def pm4py_to_ocpa(pm4py_ocel: Pm4pyEventLogObject, parameters: Optional[Dict] = None) -> OcpaEventLogObject:
+    """
+    Builds an ocpa event log directly from the events, objects and relations DataFrames of a pm4py event log,
+    replacing the export to and re-import from a jsonocel file.
+    Mirrors ocpa's jsonocel importer: Events are numbered in chronological order, event attributes are prefixed
+    with "event_" in the log table, and the start timestamp defaults to the event timestamp.
+    :param pm4py_ocel: The pm4py event log
+    :param parameters: ocpa settings (see OCPA_DEFAULT_SETTINGS)
+    :return: An ocpa OCEL object, including log table, object index and event graph
+    """
+    if parameters is None:
+        parameters = {}
+    eid_col, act_col, ts_col = pm4py_ocel.event_id_column, pm4py_ocel.event_activity, pm4py_ocel.event_timestamp
+    oid_col, type_col = pm4py_ocel.object_id_column, pm4py_ocel.object_type_column
+    core_event_cols = {eid_col, act_col, ts_col}
+
+    events = pm4py_ocel.events.sort_values(ts_col, kind="stable").reset_index(drop=True)
+    objects = pm4py_ocel.objects.reset_index(drop=True)
+    event_attributes = [c for c in events.columns if c not in core_event_cols and not c.startswith("ocel:")]
+    object_attributes = [c for c in objects.columns if c not in {oid_col, type_col} and not c.startswith("ocel:")]
+    object_types = list(objects[type_col].unique())
+
+    # ocpa uses integer event ids
+    event_ids = np.arange(len(events))
+    ocpa_eid = pd.Series(event_ids, index=events[eid_col].values)
+    relations = pd.DataFrame({
+        "event_id": pm4py_ocel.relations[eid_col].map(ocpa_eid).values,
+        "ot": pm4py_ocel.relations[type_col].values,
+        "oid": pm4py_ocel.relations[oid_col].values,
+    }).dropna(subset=["event_id"]).drop_duplicates(subset=["event_id", "oid"])
+    relations["event_id"] = relations["event_id"].astype(int)
+    relations = relations.sort_values("event_id", kind="stable")
+
+    timestamps = pd.to_datetime(events[ts_col])
+    if "start_timestamp" in events.columns:
+        start_timestamps = pd.to_datetime(events["start_timestamp"]).fillna(timestamps)
+    else:
+        start_timestamps = timestamps
+
+    # Log table (one row per event, one list-valued column per object type)
+    df = pd.DataFrame({"event_id": event_ids,
+                       "event_activity": events[act_col].values,
+                       "event_timestamp": timestamps.values})
+    for attr in event_attributes:
+        if attr == "start_timestamp":
+            continue
+        df[attr if attr.startswith("event_") else "event_" + attr] = events[attr].values
+    df["event_start_timestamp"] = start_timestamps.values
+    for ot in object_types:
+        ot_relations = relations[relations["ot"] == ot]
+        lists = _group_lists(ot_relations["event_id"].values, ot_relations["oid"].values)
+        df[ot] = [lists.get(eid, []) for eid in event_ids.tolist()]
+
+    # Object-centric event log (raw events and objects)
+    event_objects = _group_lists(relations["event_id"].values, relations["oid"].values)
+    event_vmaps = _value_maps(events, event_attributes)
+    raw_events = {}
+    for eid, act, time, start, vmap in zip(event_ids.tolist(), events[act_col].values,
+                                           pd.DatetimeIndex(timestamps).to_pydatetime(),
+                                           pd.DatetimeIndex(start_timestamps).to_pydatetime(),
+                                           event_vmaps):
+        vmap["start_timestamp"] = start
+        raw_events[eid] = Event(id=eid, act=act, time=time, omap=event_objects.get(eid, []), vmap=vmap)
+    raw_objects = {oid: Obj(id=oid, type=ot, ovmap=ovmap)
+                   for oid, ot, ovmap in zip(objects[oid_col].values, objects[type_col].values,
+                                             _value_maps(objects, object_attributes))}
+    obj_event_mapping = _group_lists(relations["oid"].values, relations["event_id"].values)
+
+    # Meta data (uses the last found value type per attribute, as ocpa does)
+    attr_events = {attr: str(type(events[attr].dropna().iloc[-1]))
+                   for attr in event_attributes if events[attr].notna().any()}
+    attr_events["start_timestamp"] = str(type(start_timestamps.iloc[-1].to_pydatetime())) if len(events) else "None"
+    attr_objects = {attr: str(type(objects[attr].dropna().iloc[-1]))
+                    for attr in object_attributes if objects[attr].notna().any()}
+    act_attr = {act: [attr for attr in event_attributes if group[attr].notna().any()] + ["start_timestamp"]
+                for act, group in events.groupby(act_col, sort=False)}
+    meta = MetaObjectCentricData(attr_names=event_attributes,
+                                 obj_types=object_types,
+                                 attr_types=list(set(attr_events.values()) | set(attr_objects.values())),
+                                 attr_typ={**attr_events, **attr_objects},
+                                 act_attr=act_attr,
+                                 attr_events=list(attr_events.keys()))
+    obj = ObjectCentricEventLog(meta, RawObjectCentricData(raw_events, raw_objects, obj_event_mapping))
+
+    table_parameters = {"obj_names": object_types,
+                        "val_names": [c for c in df.columns if c.startswith("event_")],
+                        "act_name": "event_activity",
+                        "time_name": "event_timestamp",
+                        "sep": ","}
+    table_parameters.update(parameters)
+    log = Table(df, parameters=table_parameters)
+    graph = EventGraph(table_utils.eog_from_log(log))
+    return OcpaEventLogObject(log, obj, graph, table_parameters)
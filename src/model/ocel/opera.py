@@ -0,0 +1,290 @@
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from pm4py.algo.discovery.inductive import algorithm as inductive_miner
+from pm4py.objects.conversion.log import converter as log_converter
+from pm4py.ocel import OCEL as Pm4pyEventLogObject
+
+from model.cancellation import check_cancelled
+from model.constants import OPERA_STARTS_CACHE_SIZE, OPERA_PARTIALS_CACHE_SIZE
+
+logger = logging.getLogger("app_logger")
+
+OPERA_OT_MEASURES = ["lagging_time", "pooling_time"]
+OPERA_OVERALL_MEASURES = ['waiting_time', 'service_time', 'sojourn_time', 'synchronization_time', 'flow_time']
+OPERA_MEASURES = OPERA_OVERALL_MEASURES + OPERA_OT_MEASURES
+OPERA_AGGREGATIONS = ["mean", "min", "max"]
+
+# Intermediate results of recent computations, shared by all filter states (and event logs) of the process.
+# Keys are fingerprints of the input data, such that a filter change only recomputes what it affects:
+#   - token start times of the relations of one object type, keyed by (object type, fingerprint of its relations)
+#   - partial aggregates (count, sum, min, max) of the measures of one activity, keyed by
+#     (activity, fingerprint of its events, keys of the object types related to them)
+_starts_cache: OrderedDict = OrderedDict()
+_partials_cache: OrderedDict = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def compute_opera(ocel: Pm4pyEventLogObject) -> Dict[str, Dict[str, pd.DataFrame]]:
+    """
+    Computes the OPerA performance measures directly from the events and relations tables of a pm4py event log,
+    without discovering and replaying an object-centric petri net.
+    Reference paper: Gyunam Park, Jan Niklas Adams, Wil. M. P. van der Aalst (2022). OPerA: Object-Centric Performance
+    Analysis.
+
+    Mirrors ocpa's token replay (performance_factory with default parameters) on the nets discovered per object type
+    with the inductive miner: Each event of an object consumes tokens from the input places of its activity's
+    transition, produced by the object's preceding event, such that their start time is the timestamp of that event
+    (the own timestamp for the first event). Like ocpa, the start time of an object at an event is the latest start
+    time of all tokens the object consumed from these places, including those consumed by other events of the object.
+    Measures per event, given the start times of its objects:
+        - waiting time: start timestamp of the event - earliest start
+        - service time: timestamp - start timestamp of the event
+        - sojourn time: timestamp - earliest start
+        - synchronization time: latest start - earliest start
+        - flow time: sojourn time + synchronization time
+        - pooling time (per object type): latest start - earliest start among the objects of the type
+        - lagging time (per object type): latest start among the objects of the type - earliest start among the
+          objects of other types
+    Negative durations are discarded.
+
+    The computation is incremental: The start times of an object type only depend on the relations of its objects,
+    and the measures of an activity only depend on its events and the start times of their objects. Both are cached
+    by content, such that after a filter change, only the object types and activities it affects are recomputed.
+    :param ocel: The pm4py event log
+    :return: A dict mapping each measure to a dict mapping aggregations ('mean', 'min', 'max') to a DataFrame
+    (activities x object types) for lagging and pooling time, or a Series (activities) for the other measures.
+    Missing values are NaN.
+    """
+    eid_col, act_col, ts_col = ocel.event_id_column, ocel.event_activity, ocel.event_timestamp
+    oid_col, type_col = ocel.object_id_column, ocel.object_type_column
+
+    events = ocel.events.sort_values(ts_col, kind="stable").reset_index(drop=True)
+    activities = sorted(events[act_col].unique())
+    object_types = list(ocel.objects[type_col].unique())
+    timestamps = pd.to_datetime(events[ts_col]).values
+    hash_columns = [eid_col, act_col, ts_col]
+    if "start_timestamp" in events.columns:
+        start_timestamps = pd.to_datetime(events["start_timestamp"]).fillna(pd.Series(timestamps)).values
+        hash_columns.append("start_timestamp")
+    else:
+        start_timestamps = timestamps
+    seconds, start_seconds = _seconds(timestamps), _seconds(start_timestamps)
+    act_codes = pd.Categorical(events[act_col], categories=activities).codes
+    event_hashes = pd.util.hash_pandas_object(events[hash_columns], index=False).values
+
+    # Relations in the order of the objects' traces (chronological, ties in event order)
+    relations = ocel.relations
+    event_pos = pd.Index(events[eid_col]).get_indexer(relations[eid_col])
+    rel = pd.DataFrame({
+        "event": event_pos,
+        "object": pd.factorize(relations[oid_col])[0],
+        "ot": pd.Categorical(relations[type_col], categories=object_types).codes,
+        "oid": relations[oid_col].values,
+    })
+    rel = rel[(rel["event"] >= 0) & (rel["ot"] >= 0)].drop_duplicates(["event", "object"])
+    rel = rel.sort_values(["object", "event"], kind="stable").reset_index(drop=True)
+    rel["act"] = act_codes[rel["event"].values]
+    rel_hashes = pd.util.hash_pandas_object(pd.DataFrame({"event": event_hashes[rel["event"].values],
+                                                          "object": rel["oid"].values}), index=False).values
+    check_cancelled()
+
+    # Token start times per relation, computed per object type
+    own = seconds[rel["event"].values]
+    first = np.ones(len(rel), dtype=bool)
+    first[1:] = rel["object"].values[1:] != rel["object"].values[:-1]
+    prev = np.where(first, own, np.roll(own, 1))
+    starts = np.full(len(rel), np.nan)
+    ot_keys = {}
+    for ot_code, rows in rel.groupby("ot", sort=False).indices.items():
+        key = (object_types[ot_code], _digest(rel_hashes[rows]))
+        ot_keys[ot_code] = key
+        ot_starts = _cache_get(_starts_cache, key)
+        if ot_starts is None:
+            ot_starts = _object_type_starts(rel.iloc[rows], prev[rows], events[act_col].values, timestamps,
+                                             activities)
+            _cache_set(_starts_cache, key, ot_starts, OPERA_STARTS_CACHE_SIZE)
+        starts[rows] = ot_starts
+        check_cancelled()
+    rel["start"] = starts
+
+    # Partial aggregates per activity, recomputing only activities whose events or object types changed
+    partials, dirty = {}, []
+    act_events = pd.Series(np.arange(len(events))).groupby(act_codes).indices
+    act_ots = rel.groupby("act")["ot"].unique()
+    for a, event_rows in act_events.items():
+        ots = act_ots.get(a, [])
+        key = (activities[a], _digest(event_hashes[event_rows]), tuple(sorted(ot_keys[ot] for ot in ots)))
+        partials[a] = _cache_get(_partials_cache, key)
+        if partials[a] is None:
+            dirty.append((a, key))
+    logger.info(f"OPerA: computing {len(dirty)}/{len(act_events)} activities")
+    if dirty:
+        computed = _activity_partials(rel, [a for a, _ in dirty], act_codes, seconds, start_seconds, object_types)
+        for a, key in dirty:
+            partials[a] = computed[a]
+            _cache_set(_partials_cache, key, computed[a], OPERA_PARTIALS_CACHE_SIZE)
+
+    dfs = {mea: {agg: pd.DataFrame(np.nan, index=activities, columns=object_types) for agg in OPERA_AGGREGATIONS}
+           for mea in OPERA_OT_MEASURES}
+    dfs.update({mea: {agg: pd.Series(np.nan, index=activities) for agg in OPERA_AGGREGATIONS}
+                for mea in OPERA_OVERALL_MEASURES})
+    for a, partial in partials.items():
+        act = activities[a]
+        for mea in OPERA_OVERALL_MEASURES:
+            for agg, value in zip(OPERA_AGGREGATIONS, _finalize(partial[mea])):
+                dfs[mea][agg][act] = value
+        for mea in OPERA_OT_MEASURES:
+            for ot, ot_partial in partial[mea].items():
+                for agg, value in zip(OPERA_AGGREGATIONS, _finalize(ot_partial)):
+                    dfs[mea][agg].loc[act, ot] = value
+    return dfs
+
+
+def _seconds(timestamps: np.ndarray) -> np.ndarray:
+    """ Seconds since the epoch, independent of the events contained in the (filtered) event log """
+    return timestamps.astype("datetime64[ns]").astype(np.int64) / 1e9
+
+
+def _digest(hashes: np.ndarray) -> str:
+    return hashlib.blake2b(np.ascontiguousarray(hashes).tobytes(), digest_size=16).hexdigest()
+
+
+def _cache_get(cache: OrderedDict, key) -> Optional[object]:
+    with _cache_lock:
+        value = cache.get(key)
+        if value is not None:
+            cache.move_to_end(key)
+        return value
+
+
+def _cache_set(cache: OrderedDict, key, value, max_size: int):
+    with _cache_lock:
+        cache[key] = value
+        while len(cache) > max_size:
+            cache.popitem(last=False)
+
+
+def _object_type_starts(ot_rel: pd.DataFrame, prev: np.ndarray, event_activities: np.ndarray,
+                        timestamps: np.ndarray, activities: List[str]) -> np.ndarray:
+    """
+    Computes the token start times of the relations of one object type.
+    :param ot_rel: The relations of the object type, sorted by object and event
+    :param prev: The timestamps (seconds) of the objects' preceding events
+    :return: The start times (seconds) in the order of ot_rel
+    """
+    shared = _shared_input_places(ot_rel, event_activities, timestamps, activities)
+    # Latest start per (object, activity), maximized over the activities sharing an input place
+    objects, rows = np.unique(ot_rel["object"].values, return_inverse=True)
+    acts = ot_rel["act"].values
+    latest = np.full((len(objects), len(activities)), -np.inf)
+    np.maximum.at(latest, (rows, acts), prev)
+    start = np.column_stack([latest[:, shared[a]].max(axis=1, initial=-np.inf) for a in range(len(activities))])
+    return start[rows, acts]
+
+
+def _shared_input_places(ot_rel: pd.DataFrame, event_activities: np.ndarray, timestamps: np.ndarray,
+                         activities: List[str]) -> np.ndarray:
+    """
+    Discovers a petri net from the traces of one object type like ocpa (inductive miner on the flattened log).
+    :return: A boolean matrix (activities x activities), true if the activities' transitions share an input place
+    """
+    df = pd.DataFrame({
+        "case:concept:name": ot_rel["object"].values,
+        "concept:name": event_activities[ot_rel["event"].values],
+        "time:timestamp": timestamps[ot_rel["event"].values],
+    })
+    log = log_converter.apply(df, variant=log_converter.Variants.TO_EVENT_LOG)
+    net, _, _ = inductive_miner.apply(log)
+    index = {act: i for i, act in enumerate(activities)}
+    shared = np.eye(len(activities), dtype=bool)
+    consumers = [[index[arc.target.label] for arc in place.out_arcs if arc.target.label in index]
+                 for place in net.places]
+    for acts in consumers:
+        shared[np.ix_(acts, acts)] = True
+    return shared
+
+
+def _activity_partials(rel: pd.DataFrame, dirty: List[int], act_codes: np.ndarray, seconds: np.ndarray,
+                       start_seconds: np.ndarray, object_types: List[str]) -> Dict[int, Dict]:
+    """
+    Computes the measures of the events of the given activities, with partial aggregates per activity.
+    :return: A dict mapping activity codes to dicts mapping overall measures to arrays (count, sum, min, max),
+    and object type-related measures to dicts mapping object types to such arrays.
+    """
+    event_index = np.flatnonzero(np.isin(act_codes, dirty))
+    rel = rel[np.isin(rel["act"].values, dirty)]
+    local = np.searchsorted(event_index, rel["event"].values)
+    num_events, num_ots = len(event_index), len(object_types)
+
+    # Per event: earliest and latest start, overall and per object type
+    by_event = pd.Series(rel["start"].values).groupby(local).agg(["min", "max"])
+    min_start = np.full(num_events, np.nan)
+    max_start = np.full(num_events, np.nan)
+    min_start[by_event.index] = by_event["min"].values
+    max_start[by_event.index] = by_event["max"].values
+    by_event_ot = pd.Series(rel["start"].values).groupby([local, rel["ot"].values]).agg(["min", "max"])
+    ot_min = np.full((num_events, num_ots), np.nan)
+    ot_max = np.full((num_events, num_ots), np.nan)
+    event_level, ot_level = by_event_ot.index.get_level_values(0), by_event_ot.index.get_level_values(1)
+    ot_min[event_level, ot_level] = by_event_ot["min"].values
+    ot_max[event_level, ot_level] = by_event_ot["max"].values
+    check_cancelled()
+
+    seconds, start_seconds = seconds[event_index], start_seconds[event_index]
+    nonnegative = lambda values: np.where(values >= 0, values, np.nan)
+    sojourn = nonnegative(seconds - min_start)
+    sync = nonnegative(max_start - min_start)
+    overall = {
+        "waiting_time": nonnegative(start_seconds - min_start),
+        "service_time": nonnegative(seconds - start_seconds),
+        "sojourn_time": sojourn,
+        "synchronization_time": sync,
+        "flow_time": sojourn + sync,
+    }
+    pooling = nonnegative(ot_max - ot_min)
+    lagging = np.full_like(ot_min, np.nan)
+    with np.errstate(all="ignore"):
+        for j in range(num_ots):
+            others = np.delete(ot_min, j, axis=1)
+            other_min = np.where(np.isnan(others).all(axis=1), np.nan, np.nanmin(others, axis=1, initial=np.inf)) \
+                if others.shape[1] else np.full(num_events, np.nan)
+            lagging[:, j] = nonnegative(ot_max[:, j] - other_min)
+
+    codes = act_codes[event_index]
+    related = rel.groupby("act")["ot"].unique()
+    partials = {a: {} for a in dirty}
+    for mea, values in overall.items():
+        aggregated = _partial_aggregates(values[:, None], codes)
+        for a in dirty:
+            partials[a][mea] = aggregated[a][0]
+    for mea, values in [("lagging_time", lagging), ("pooling_time", pooling)]:
+        aggregated = _partial_aggregates(values, codes)
+        for a in dirty:
+            partials[a][mea] = {object_types[ot]: aggregated[a][ot] for ot in related.get(a, [])}
+    return partials
+
+
+def _partial_aggregates(values: np.ndarray, codes: np.ndarray) -> Dict[int, np.ndarray]:
+    """
+    :param values: Array (events x columns) of measures
+    :param codes: The events' activity codes
+    :return: A dict mapping activity codes to arrays (columns x 4) containing count, sum, min and max of each column
+    """
+    grouped = pd.DataFrame(values).groupby(codes)
+    counts = grouped.count()
+    stacked = np.stack([counts.values, grouped.sum().values, grouped.min().values, grouped.max().values], axis=-1)
+    return dict(zip(counts.index, stacked))
+
+
+def _finalize(partial: np.ndarray) -> Tuple[float, float, float]:
+    """ :return: mean, min and max from partial aggregates (count, sum, min, max) """
+    count, total, minimum, maximum = partial
+    if count == 0:
+        return np.nan, np.nan, np.nan
+    return total / count, minimum, maximum
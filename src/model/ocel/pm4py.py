@@ -1,16 +1,24 @@
-import time
 from typing import Dict, List, Union, Optional
 
 import pm4py
 import logging
+import threading
 import timeit
 
 from pm4py.ocel import OCEL as Pm4pyEventLogObject
 from pm4py.algo.discovery.ocel.ocpn.variants.wo_annotation import Parameters as OcpnParameters
 from model.ocel.base import OCEL
+from model.ocel.executions import ProcessExecutions, LEAD_TYPE
+from model.ocel.filter_index import OcelFilterIndex
+from model.ocel.jsonocel import read_ocel
+from model.ocel.opera import compute_opera
+from model.cancellation import check_cancelled
+from model.sampling import StratifiedSample, random_group_errors, relative_error
+from model.snapshot import load_snapshot, save_snapshot
 from pathlib import Path
+import numpy as np
 import pandas as pd
-import collections
+from scipy import sparse
 
 logger = logging.getLogger("app_logger")
 
@@ -34,6 +42,7 @@ timeit._template_func = _template_func
 class Pm4pyEventLog(OCEL):
     """
     Event log wrapper using the pm4py module
+    A sampled event log (see model/sampling.py) gets the sample, and the random group for logs of a single group.
     """
 
     def __init__(self, model, **kwargs):
@@ -43,14 +52,25 @@ class Pm4pyEventLog(OCEL):
             self.ocel = kwargs["ocel"]
         elif "dataset" in kwargs:
             filename = str(Path("../data/datasets") / kwargs["dataset"])
-            logger.info(f"Importing dataset {filename}")
-
-            # https://pm4py.fit.fraunhofer.de/documentation#object-centric-event-logs
-            self.ocel = pm4py.read_ocel(filename)
+            # Snapshots are part of the model's disk cache
+            use_snapshot = model is None or model.disk_cache
+            self.ocel = load_snapshot(filename) if use_snapshot else None
+            if self.ocel is None:
+                logger.info(f"Importing dataset {filename}")
+                self.ocel = read_ocel(filename)
+                if use_snapshot:
+                    save_snapshot(self.ocel, filename)
         else:
             raise ValueError("pm4py event log could not be instantiated.")
 
+        # Filters are always applied to the original (imported) event log, which is the only one needing an index
+        self.filter_index = OcelFilterIndex(self.ocel) if "ocel" not in kwargs else None
+        self.sample: Optional[StratifiedSample] = kwargs.get("sample")
+        self.sample_group: Optional[int] = kwargs.get("sample_group")
+
         self.opera_diagnostic = None
+        self._executions: Optional[ProcessExecutions] = None
+        self._executions_lock = threading.Lock()
 
     def _get_object_types(self):
         return pm4py.ocel.ocel_get_object_types(self.ocel)
@@ -71,68 +91,120 @@ class Pm4pyEventLog(OCEL):
         return pm4py.ocel.ocel_object_type_activities(self.ocel)
 
     def _compute_opera(self, agg: Union[List[str], str, None] = None) -> Optional[Dict[str, Dict[str, pd.DataFrame]]]:
-        return None  # Not supported, use ocpa
+        """
+        Performs OPerA computations on the OCEL, vectorized on the events and relations tables.
+        Yields the same KPIs as the ocpa implementation, see compute_opera.
+        :param agg: Ignored, all of 'mean', 'min' and 'max' are computed.
+        :return: A dict containing multiple pandas DataFrames with the requested KPIs.
+        """
+        logger.info("Computing OPERA measures...")
+        dfs = compute_opera(self.ocel)
+        logger.info("Computing OPERA completed ")
+        self.opera_diagnostic = dfs
+        return dfs
+
+    def _process_executions(self) -> ProcessExecutions:
+        """ Extracts the process executions and variants on first use, with the settings of the dataset """
+        with self._executions_lock:
+            if self._executions is None:
+                settings = self.model.dataset if self.model is not None else {}
+                self._executions = ProcessExecutions(self.ocel,
+                                                     execution_extraction=settings.get("execution_extraction",
+                                                                                       LEAD_TYPE),
+                                                     leading_type=settings.get("leading_type"),
+                                                     leading_objects=self.sample.leading_objects(self.sample_group)
+                                                     if self.sample is not None else None,
+                                                     executor=self.model.process_executor
+                                                     if self.model is not None else None)
+            return self._executions
 
     def _get_cases(self):
-        return None  # Not supported, use ocpa
+        return self._process_executions().cases
 
     def _get_variants(self):
-        return None  # Not supported, use ocpa
+        return self._process_executions().variants
 
     def _get_variant_frequencies(self):
-        return None  # Not supported, use ocpa
+        """ The share of process executions per variant, estimated with their weights on a sample """
+        executions = self._process_executions()
+        if self.sample is None:
+            return dict(zip(executions.variants, executions.variant_frequencies))
+        weights = self.sample.execution_weights(executions, self.sample_group)
+        total = weights.sum()
+        return {variant: weights[cases].sum() / total if total > 0 else 0.0
+                for variant, cases in executions.variant_cases.items()}
 
     def _get_variant_graph(self, variant_id):
-        return None  # Not supported, use ocpa
+        """
+        Computes a variant graph (event-object graph) with labels for display.
+        :param variant_id: The variant ID (hash)
+        :return: The graph and the object type counts per edge
+        """
+        return self._process_executions().variant_graph(variant_id)
 
     def _compute_petri_net(self, bgcolor="white"):
         logger.info("Beggining the discovery of a petri net using pm4py")
-
-        t0 = time.time()
-        ocpn = pm4py.discover_oc_petri_net(self.ocel)
-        t1 = time.time()
-        discovery_time = t1 - t0
-        logger.info(f"Discovery time: {discovery_time}")
-        return ocpn
+        # The discovery time is recorded by the model's instrumentation
+        return pm4py.discover_oc_petri_net(self.ocel)
     
     def _compute_heatmap(self):
-        df = self.ocel.relations
-        collect = pd.DataFrame([],index=[],columns=['Events'])
-
-        for x in set(df.loc[:,'ocel:type']):
-            tmp = df.loc[lambda df: df['ocel:type'] == x]
-            tmp_list = list(tmp.loc[:,'ocel:eid'])
-            tmp_df = pd.DataFrame([[tmp_list]], index=[x], columns=['Events'])
-            collect = pd.concat([collect,tmp_df])
-        
-        matrix = pd.DataFrame([],index=[collect.index],columns=[collect.index])
-        event_lists = collect.loc[:,'Events'].tolist()
-
-        for x in range(len(event_lists)):
-            for y in range(x,len(event_lists)):
-                if x == y:
-                    events = [item for item, count in collections.Counter(event_lists[x]).items() if count > 1]
-                    matrix.iloc[x,x]=events
-                else:
-                    events = set([value for value in event_lists[x] if value in event_lists[y]])
-                    matrix.iloc[x,y]=events
-                    matrix.iloc[y,x]=events
-
-        matrix = matrix.sort_index(axis=1)
-        matrix = matrix.sort_index()
-
-        hovertext = list()
-        for x in matrix.index:
-            hovertext.append(list())
-            for y in matrix.columns:
-                activity_list = list(pm4py.filter_ocel_events(self.ocel, matrix[x][y]).events.loc[:,'ocel:activity'])
-                count = collections.Counter(activity_list)
-                s = ", ".join([str(key) + ": " + str(value) for key, value in count.items()])
-                hovertext[-1].append("Shared activities: " + (s if count else "---"))
-        
-        number_matrix = matrix.applymap(len)
+        """
+        Counts the shared events for each pair of object types, using an event x object type incidence matrix.
+        On the diagonal, the events related to more than one object of the respective type are counted.
+        Counts of a sample are extrapolated to the whole event log, summing the weights of the events (see sampling.py).
+        :return: The matrix of shared event counts (object types sorted alphabetically), and the hovertext
+        """
+        relations = self.ocel.relations
+        event_codes, events = pd.factorize(relations[self.ocel.event_id_column])
+        ot_codes, object_types = pd.factorize(relations[self.ocel.object_type_column], sort=True)
+
+        # Number of related objects per (event, object type)
+        incidence = sparse.csr_matrix((np.ones(len(relations), dtype=np.int64), (event_codes, ot_codes)),
+                                      shape=(len(events), len(object_types)))
+        weights = self.sample.event_weights(events, self.sample_group) if self.sample is not None \
+            else np.ones(len(events))
+        shared = (incidence > 0).astype(np.float64)
+        counts = (shared.T @ sparse.diags(weights) @ shared).toarray()
+        np.fill_diagonal(counts, (incidence > 1).T.astype(np.float64) @ weights)
+        counts = np.rint(counts).astype(np.int64)
+
+        ot_index = pd.MultiIndex.from_arrays([object_types])
+        number_matrix = pd.DataFrame(counts, index=ot_index, columns=ot_index)
+        hovertext = self._heatmap_hovertext(incidence, events, len(object_types), weights)
         return number_matrix, hovertext
 
+    def _heatmap_hovertext(self, incidence: sparse.csr_matrix, events: pd.Index, num_object_types: int,
+                           weights: np.ndarray):
+        """
+        Computes the histograms of shared activities for all heatmap cells in one grouped pass
+        over (event, object type a, object type b) triples, and formats them as hovertext.
+        Activities are listed in the order of their first occurrence in the cell's events.
+        :param weights: The weights of the events (see _compute_heatmap)
+        """
+        relations = self.ocel.relations
+        event_activities = np.empty(len(events), dtype=object)
+        event_activities[events.get_indexer(relations[self.ocel.event_id_column])] = relations[self.ocel.event_activity].values
+        event_positions = pd.Index(self.ocel.events[self.ocel.event_id_column]).get_indexer(events)
+
+        entries = incidence.tocoo()
+        event_types = pd.DataFrame({"event": entries.row, "ot": entries.col, "num_objects": entries.data})
+        triples = event_types.merge(event_types[["event", "ot"]], on="event", suffixes=("_a", "_b"))
+        # On the diagonal, only events related to more than one object of the type are shared
+        triples = triples[(triples["ot_a"] != triples["ot_b"]) | (triples["num_objects"] > 1)]
+        triples = triples.assign(activity=event_activities[triples["event"].values],
+                                 position=event_positions[triples["event"].values],
+                                 weight=weights[triples["event"].values])
+        histograms = triples.groupby(["ot_a", "ot_b", "activity"], sort=False) \
+            .agg(count=("weight", "sum"), first=("position", "min")) \
+            .reset_index() \
+            .sort_values(["ot_a", "ot_b", "first"])
+        counts = np.rint(histograms["count"].values).astype(np.int64)
+        histograms["text"] = histograms["activity"].astype(str) + ": " + counts.astype(str)
+        cell_texts = histograms.groupby(["ot_a", "ot_b"], sort=False)["text"].agg(", ".join).to_dict()
+
+        return [["Shared activities: " + cell_texts.get((x, y), "---") for y in range(num_object_types)]
+                for x in range(num_object_types)]
+
     def _compute_heatmap_pooling(self) -> pd.DataFrame:
         dfs = self.model.compute_opera()
         return dfs
@@ -141,6 +213,58 @@ class Pm4pyEventLog(OCEL):
         dfs = self.model.compute_opera()
         return dfs
 
+    def _get_sampling_error(self, method_name: str, args: tuple) -> Dict:
+        """
+        Estimates the error of a result computed on the sample with the random group method: the analysis is repeated
+        on each group of the sample, and the spread of the group results gives the standard errors.
+        Supported are the heatmap, OPerA, variant frequencies and the petri net. For the petri net, the error is the
+        share of (object type, activity) elements not discovered in every group.
+        :param method_name: The name of the sampled method, e.g. '_compute_heatmap'
+        :param args: The args of the sampled method
+        :return: The sample description, the relative error (None if unknown) and the standard errors,
+                 or an empty dict if the event log is not sampled
+        """
+        if self.sample is None or self.sample_group is not None:
+            return {}
+        result = {**self.sample.describe(), "relative_error": None, "standard_errors": None}
+        if self.sample.groups < 2 or method_name not in ("_compute_heatmap", "_compute_opera",
+                                                          "_get_variant_frequencies", "_compute_petri_net"):
+            return result
+
+        estimate = self.model._execute_ocel_method(method_name, *args)
+        replicates = []
+        for group in range(self.sample.groups):
+            check_cancelled()
+            group_log = Pm4pyEventLog(self.model, ocel=self.sample.log(group), sample=self.sample, sample_group=group)
+            replicates.append(getattr(group_log, method_name)(*args))
+
+        if method_name == "_compute_petri_net":
+            elements = [{(ot, act) for ot, acts in net["double_arcs_on_activity"].items() for act in acts}
+                        for net in [estimate] + replicates]
+            union = set.union(*elements)
+            result["relative_error"] = len(union - set.intersection(*elements)) / len(union) if union else None
+            return result
+        if method_name == "_compute_heatmap":
+            estimates = [estimate[0]]
+            errors = [random_group_errors(estimate[0], [r[0] for r in replicates], fill_value=0)]
+        elif method_name == "_get_variant_frequencies":
+            estimates = [pd.DataFrame({"frequency": pd.Series(estimate, dtype=float)})]
+            errors = [random_group_errors(estimates[0], [pd.DataFrame({"frequency": pd.Series(r, dtype=float)})
+                                                         for r in replicates], fill_value=0)]
+        else:
+            # KPIs per aggregation, as DataFrames (activity x object type) or Series (activity)
+            def frame(kpis: Dict, kpi: str, agg: str) -> pd.DataFrame:
+                df = kpis.get(kpi, {}).get(agg, pd.DataFrame())
+                return df.to_frame() if isinstance(df, pd.Series) else df
+
+            keys = [(kpi, agg) for kpi, dfs in estimate.items() for agg in dfs]
+            estimates = [frame(estimate, kpi, agg) for kpi, agg in keys]
+            errors = [random_group_errors(df, [frame(r, kpi, agg) for r in replicates])
+                      for df, (kpi, agg) in zip(estimates, keys)]
+        result["relative_error"] = relative_error(estimates, errors)
+        result["standard_errors"] = errors[0] if len(errors) == 1 else dict(zip(keys, errors))
+        return result
+
     def __hash__(self):
         # TODO test/fix this
         hash_df = lambda df: pd.util.hash_array(pd.util.hash_pandas_object(df).to_numpy())
@@ -0,0 +1,265 @@
+import logging
+import warnings
+from copy import copy
+from typing import Any, Dict, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+from pm4py.ocel import OCEL as Pm4pyEventLogObject
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+from scipy.special import gammaln
+
+from model.cancellation import check_cancelled
+from model.constants import SAMPLE_ERROR_GROUPS, SAMPLE_SEED
+from model.ocel.executions import ProcessExecutions, LEAD_TYPE
+
+logger = logging.getLogger("app_logger")
+
+UNIT_EXECUTIONS = "process executions"
+UNIT_CLUSTERS = "connected object clusters"
+
+
+class StratifiedSample:
+    """
+    Stratified random sample of an event log for interactive previews.
+    The sampled units are whole process executions (with a valid leading type) or connected object clusters
+    (components of the event-object graph), such that the sample contains complete object lifecycles.
+    Units are stratified by object type: clusters by the set of object types they contain, leading objects by the
+    object types of the objects they share events with. Every stratum contributes a share of its units given by the
+    sampling fraction, at least one unit per random group (or all of its units), so rare object type combinations are
+    always represented.
+    If all units share the same object types, there is a single stratum and the sample is a simple random sample.
+    Estimates are Horvitz-Thompson weighted, by the inverse inclusion probabilities: a sampled unit of stratum h
+    stands for N_h / n_h units of the event log. An event is sampled with any of the units containing it, so events
+    shared by several process executions have higher inclusion probabilities than their executions.
+    The sampled units are dealt to a number of disjoint random groups, whose results give the error estimates.
+    Within group g, the n_{h,g} units of stratum h are a random sample of its N_h units themselves, such that each
+    group estimates the whole event log. Strata sampled completely have no sampling error, they are in every group.
+    :param ocel: The (filtered) pm4py event log
+    :param fraction: The fraction of units to sample
+    :param groups: The number of random groups for error estimates
+    :param seed: The seed of the random selection, such that the sample is reproducible
+    """
+
+    def __init__(self, ocel: Pm4pyEventLogObject, fraction: float, execution_extraction: str = LEAD_TYPE,
+                 leading_type: Optional[str] = None, groups: int = SAMPLE_ERROR_GROUPS, seed: int = SAMPLE_SEED):
+        self.fraction = fraction
+        self.source = ocel
+        eid_col, oid_col = ocel.event_id_column, ocel.object_id_column
+        relations = ocel.relations
+        self._event_index = pd.Index(ocel.events[eid_col])
+        self._relation_events = self._event_index.get_indexer(relations[eid_col])
+        valid = self._relation_events >= 0
+        num_events = len(ocel.events)
+
+        object_codes, object_ids = pd.factorize(relations[oid_col].values[valid])
+        ot_codes, object_types = pd.factorize(relations[ocel.object_type_column].values[valid], sort=True)
+        object_type_codes = np.zeros(len(object_ids), dtype=np.int64)
+        object_type_codes[object_codes] = ot_codes
+        incidence = sparse.csr_matrix((np.ones(len(object_codes), dtype=bool),
+                                       (self._relation_events[valid], object_codes)),
+                                      shape=(num_events, len(object_ids)))
+        type_matrix = sparse.csr_matrix((np.ones(len(object_ids), dtype=bool),
+                                         (np.arange(len(object_ids)), object_type_codes)),
+                                        shape=(len(object_ids), len(object_types)))
+        check_cancelled()
+
+        if execution_extraction == LEAD_TYPE and leading_type in set(object_types):
+            self.unit = UNIT_EXECUTIONS
+            units = np.flatnonzero(object_type_codes == list(object_types).index(leading_type))
+            # Object types of the objects sharing events with the leading objects
+            neighbors = (incidence[:, units].T.astype(np.int32) @ incidence.astype(np.int32)).astype(bool)
+            unit_types = (neighbors.astype(np.int32) @ type_matrix.astype(np.int32)).toarray() > 0
+        else:
+            self.unit = UNIT_CLUSTERS
+            graph = sparse.bmat([[None, incidence], [incidence.T, None]], format="csr")
+            _, labels = connected_components(graph, directed=False)
+            event_units, units = pd.factorize(labels[:num_events])
+            object_units = pd.Index(units).get_indexer(labels[num_events:])
+            unit_types = sparse.csr_matrix((np.ones(len(object_ids), dtype=np.int32),
+                                            (object_units, object_type_codes)),
+                                           shape=(len(units), len(object_types))).toarray() > 0
+        check_cancelled()
+
+        # Stratified selection: a random order within each stratum, taking its first n_h units. Each stratum contributes
+        # at least one unit per random group, or all of its units.
+        _, strata = np.unique(np.packbits(unit_types, axis=1), axis=0, return_inverse=True)
+        strata = strata.ravel()
+        rng = np.random.default_rng(seed)
+        order = rng.permutation(len(strata))
+        order = order[np.argsort(strata[order], kind="stable")]
+        stratum_sizes = np.bincount(strata)
+        stratum_samples = np.minimum(stratum_sizes,
+                                     np.maximum(max(groups, 1), np.rint(fraction * stratum_sizes))).astype(int)
+        stratum_starts = np.concatenate([[0], np.cumsum(stratum_sizes)[:-1]])
+        ranks = np.arange(len(order)) - stratum_starts[strata[order]]
+        sampled = order[ranks < stratum_samples[strata[order]]]
+
+        self.population_units = len(strata)
+        self.sampled_units = len(sampled)
+        self.strata = len(stratum_sizes)
+        self.groups = min(groups, self.sampled_units)
+        # Strata sampled completely have no sampling error, their units are in every group. The other units are dealt
+        # round-robin in stratum order. Their strata have at least as many sampled units as there are groups, so each
+        # group is a stratified sample itself, containing every stratum.
+        complete = (stratum_samples == stratum_sizes)[strata[sampled]]
+        certain = np.zeros(self.population_units, dtype=bool)
+        certain[sampled[complete]] = True
+        unit_groups = np.full(self.population_units, -1)
+        unit_groups[sampled[~complete]] = np.arange((~complete).sum()) % max(self.groups, 1)
+        members = {None: np.zeros(self.population_units, dtype=bool)}
+        members[None][sampled] = True
+        for group in range(self.groups):
+            members[group] = (unit_groups == group) | certain
+
+        # Horvitz-Thompson weights of the sampled units, in the whole sample and in each group
+        samples = {key: np.bincount(strata[selected], minlength=self.strata) for key, selected in members.items()}
+        unit_weights = {key: stratum_sizes[strata[selected]] / samples[key][strata[selected]]
+                        for key, selected in members.items()}
+
+        self._leading_objects: Dict[Optional[int], Set[str]] = {}
+        self._leading_weights: Dict[Optional[int], Dict[str, float]] = {}
+        if self.unit == UNIT_EXECUTIONS:
+            for key, selected in members.items():
+                ids = object_ids[units[selected]]
+                self._leading_objects[key] = set(ids)
+                self._leading_weights[key] = dict(zip(ids, unit_weights[key]))
+            unit_events = self._execution_events(execution_extraction, leading_type, object_ids[units])
+        else:
+            unit_events = sparse.csr_matrix((np.ones(num_events, dtype=bool), (event_units, np.arange(num_events))),
+                                            shape=(len(units), num_events))
+        check_cancelled()
+
+        # Events are weighted by their inverse inclusion probability, they are sampled with any unit containing them
+        stratum_events = (sparse.csr_matrix((np.ones(len(strata)), (strata, np.arange(len(strata)))),
+                                            shape=(self.strata, len(strata))) @ unit_events.astype(np.float64)).tocsr()
+        self._event_masks: Dict[Optional[int], np.ndarray] = {}
+        self._event_weights: Dict[Optional[int], np.ndarray] = {}
+        for key, selected in members.items():
+            self._event_masks[key] = np.asarray(unit_events.T.astype(np.int32) @ selected.astype(np.int32)) > 0
+            probabilities = inclusion_probabilities(stratum_events, stratum_sizes, samples[key])
+            self._event_weights[key] = np.divide(1, probabilities, out=np.zeros(num_events),
+                                                 where=self._event_masks[key])
+        self.ocel = self.log()
+        design = f"{self.strata} strata" if self.strata > 1 else "1 stratum (simple random sample)"
+        logger.info(f"Sampled {self.sampled_units} of {self.population_units} {self.unit} "
+                    f"({len(self.ocel.events)} of {num_events} events) from {design}")
+
+    def _execution_events(self, execution_extraction: str, leading_type: str,
+                          unit_ids: np.ndarray) -> sparse.csr_matrix:
+        """ :return: The events of the process executions of all units, as a (units x events) matrix """
+        executions = ProcessExecutions(self.source, execution_extraction=execution_extraction,
+                                       leading_type=leading_type, compute_variants=False)
+        event_positions = self._event_index.get_indexer(executions.event_ids)
+        case_units = pd.Index(unit_ids).get_indexer(executions.leading_objects)
+        rows = np.repeat(case_units, [len(case) for case in executions.cases])
+        columns = event_positions[np.concatenate(executions.cases)] if executions.cases else np.zeros(0, dtype=int)
+        return sparse.csr_matrix((np.ones(len(rows), dtype=bool), (rows, columns)),
+                                 shape=(len(unit_ids), len(self.source.events)))
+
+    def log(self, group: Optional[int] = None) -> Pm4pyEventLogObject:
+        """
+        Builds the sample's event log, keeping the sampled events with all their relations and objects.
+        :param group: The random group, or None for the whole sample
+        """
+        source = self.source
+        event_mask = self._event_masks[group]
+        relation_mask = np.zeros(len(source.relations), dtype=bool)
+        valid = self._relation_events >= 0
+        relation_mask[valid] = event_mask[self._relation_events[valid]]
+        relations = source.relations[relation_mask]
+        object_mask = source.objects[source.object_id_column].isin(relations[source.object_id_column].unique())
+
+        ocel = copy(source)
+        ocel.events = source.events[event_mask]
+        ocel.relations = relations
+        ocel.objects = source.objects[object_mask.values]
+        return ocel
+
+    def event_weights(self, event_ids, group: Optional[int] = None) -> np.ndarray:
+        """
+        :param event_ids: Ids of events of the sample (or one of its groups)
+        :return: The Horvitz-Thompson weights of the events, extrapolating sums over them to the whole event log
+        """
+        return self._event_weights[group][self._event_index.get_indexer(event_ids)]
+
+    def execution_weights(self, executions: ProcessExecutions, group: Optional[int] = None) -> np.ndarray:
+        """
+        :param executions: The process executions of the sample's event log (or one of its groups)
+        :return: The Horvitz-Thompson weights of the process executions
+        """
+        if self.unit == UNIT_EXECUTIONS and executions.leading_objects is not None:
+            weights = self._leading_weights[group]
+            return np.array([weights[oid] for oid in executions.leading_objects], dtype=float)
+        # Object clusters are the connected components of the sample, all their events have the same weight
+        first_events = [executions.event_ids[case[0]] for case in executions.cases]
+        return self.event_weights(first_events, group)
+
+    def leading_objects(self, group: Optional[int] = None) -> Optional[Set[str]]:
+        """ :return: The ids of the sampled leading objects, or None if the units are object clusters """
+        return self._leading_objects.get(group)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "unit": self.unit,
+            "fraction": self.fraction,
+            "sampled_units": self.sampled_units,
+            "population_units": self.population_units,
+            "strata": self.strata,
+            "groups": self.groups,
+        }
+
+
+def inclusion_probabilities(stratum_events: sparse.csr_matrix, stratum_sizes: np.ndarray,
+                            stratum_samples: np.ndarray) -> np.ndarray:
+    """
+    The probabilities of events to be contained in a stratified sample of units: An event is missed if none of the
+    k_h units of each stratum h containing it is among the n_h of N_h units sampled, with probability
+    C(N_h - k_h, n_h) / C(N_h, n_h).
+    :param stratum_events: The number of units containing each event k_h, as a (strata x events) matrix
+    :param stratum_sizes: The number of units per stratum N_h
+    :param stratum_samples: The number of sampled units per stratum n_h
+    """
+    def log_binomial(n, k):
+        with np.errstate(invalid="ignore"):
+            return np.where(n >= k, gammaln(n + 1) - gammaln(k + 1) - gammaln(np.maximum(n - k, 0) + 1), -np.inf)
+
+    log_missed = np.zeros(stratum_events.shape[1])
+    for h in range(stratum_events.shape[0]):
+        start, end = stratum_events.indptr[h], stratum_events.indptr[h + 1]
+        containing = stratum_events.data[start:end]
+        log_missed[stratum_events.indices[start:end]] += \
+            log_binomial(stratum_sizes[h] - containing, stratum_samples[h]) - \
+            log_binomial(stratum_sizes[h], stratum_samples[h])
+    return -np.expm1(log_missed)
+
+
+def random_group_errors(estimate: pd.DataFrame, replicates: List[pd.DataFrame],
+                        fill_value: float = np.nan) -> pd.DataFrame:
+    """
+    Estimates standard errors with the random group method: The variance of the estimate is the variance of the
+    estimates of the G groups divided by G. Entries missing in fewer than two groups have no error estimate.
+    :param estimate: The estimate from the whole sample
+    :param replicates: The estimates from the groups, aligned to the estimate by index and columns
+    :param fill_value: The value of entries missing in a group's estimate (e.g. 0 for counts)
+    """
+    stacked = np.stack([r.reindex(index=estimate.index, columns=estimate.columns, fill_value=fill_value)
+                        .to_numpy(dtype=float) for r in replicates])
+    counts = (~np.isnan(stacked)).sum(axis=0)
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        errors = np.nanstd(stacked, axis=0, ddof=1) / np.sqrt(counts)
+    errors[counts < 2] = np.nan
+    return pd.DataFrame(errors, index=estimate.index, columns=estimate.columns)
+
+
+def relative_error(estimates: List[pd.DataFrame], errors: List[pd.DataFrame]) -> Optional[float]:
+    """ :return: The sum of the standard errors relative to the sum of the absolute estimates, or None """
+    total_error, total = 0.0, 0.0
+    for estimate, error in zip(estimates, errors):
+        values, deviations = np.abs(estimate.to_numpy(dtype=float)), error.to_numpy(dtype=float)
+        known = np.isfinite(values) & np.isfinite(deviations)
+        total_error += deviations[known].sum()
+        total += values[known].sum()
+    return total_error / total if total > 0 else None
@@ -0,0 +1,212 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Optional
+
+import pandas as pd
+from pm4py.ocel import OCEL as Pm4pyEventLogObject
+
+from model.cache import TMP_DIR_PREFIX, file_content_hash
+from model.constants import SNAPSHOT_DIR, FILTERED_SNAPSHOT_DIR, FILTERED_SNAPSHOT_COUNT
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+logger = logging.getLogger("app_logger")
+
+SNAPSHOT_TABLES = ["events", "objects", "relations"]
+SNAPSHOT_META_FILE = "meta.json"
+SNAPSHOT_FILE_EXT = ".arrow"
+
+
+def snapshots_available() -> bool:
+    return pa is not None
+
+
+def _snapshot_dir(source_path: Path, directory) -> Path:
+    return Path(directory) / hashlib.sha256(str(source_path).encode("utf-8")).hexdigest()[:32]
+
+
+def _source_fingerprint(source_path: Path) -> dict:
+    stat = source_path.stat()
+    return {
+        "size": stat.st_size,
+        "mtime": stat.st_mtime_ns,
+        "hash": file_content_hash(source_path),
+    }
+
+
+def _to_arrow(df: pd.DataFrame) -> "pa.Table":
+    """ Converts a DataFrame to an arrow table, dictionary-encoding string columns """
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    for i, field in enumerate(table.schema):
+        if pa.types.is_string(field.type) or pa.types.is_large_string(field.type):
+            table = table.set_column(i, field.name, table.column(i).dictionary_encode())
+    return table
+
+
+def _from_arrow(table: "pa.Table") -> pd.DataFrame:
+    df = table.to_pandas()
+    # pm4py expects plain string columns, categories are only used for storage
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype):
+            df[column] = df[column].astype(object)
+    return df
+
+
+def _write_tables(ocel: Pm4pyEventLogObject, directory: Path, meta: dict):
+    for name in SNAPSHOT_TABLES:
+        table = _to_arrow(getattr(ocel, name))
+        # Uncompressed, such that the files can be memory-mapped
+        with pa.OSFile(str(directory / f"{name}{SNAPSHOT_FILE_EXT}"), "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+    meta = {**meta, "globals": ocel.globals, "parameters": ocel.parameters}
+    with open(directory / SNAPSHOT_META_FILE, "w") as f:
+        json.dump(meta, f)
+
+
+def _read_tables(directory: Path, meta: dict) -> Pm4pyEventLogObject:
+    tables = {}
+    for name in SNAPSHOT_TABLES:
+        with pa.memory_map(str(directory / f"{name}{SNAPSHOT_FILE_EXT}"), "r") as source:
+            tables[name] = _from_arrow(pa.ipc.open_file(source).read_all())
+    return Pm4pyEventLogObject(tables["events"], tables["objects"], tables["relations"],
+                               meta["globals"], meta["parameters"])
+
+
+def load_snapshot(source_path, directory=SNAPSHOT_DIR) -> Optional[Pm4pyEventLogObject]:
+    """
+    Loads the snapshot of an event log file, if there is a valid one.
+    A snapshot is invalid if the size, modification time or content hash of the source file has changed.
+    :param source_path: The original event log file
+    :param directory: Directory where snapshots are saved
+    :return: The pm4py event log, or None if there is no valid snapshot
+    """
+    if pa is None:
+        return None
+    source_path = Path(source_path).resolve()
+    snapshot_dir = _snapshot_dir(source_path, directory)
+    meta_path = snapshot_dir / SNAPSHOT_META_FILE
+    if not meta_path.exists():
+        return None
+
+    try:
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+        if meta["source"] != _source_fingerprint(source_path):
+            logger.info(f"Snapshot of {source_path.name} is outdated, deleting it")
+            shutil.rmtree(snapshot_dir, ignore_errors=True)
+            return None
+        ocel = _read_tables(snapshot_dir, meta)
+    except Exception as e:
+        logger.warning(f"Could not load snapshot of {source_path.name} ({type(e).__name__}: {e}), deleting it")
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+        return None
+
+    logger.info(f"Loaded snapshot of {source_path.name}")
+    return ocel
+
+
+def save_snapshot(ocel: Pm4pyEventLogObject, source_path, directory=SNAPSHOT_DIR) -> bool:
+    """
+    Saves a columnar snapshot (Arrow IPC files) of an imported event log next to the result cache.
+    :param ocel: The imported pm4py event log
+    :param source_path: The original event log file
+    :param directory: Directory where snapshots are saved
+    :return: Whether the snapshot has been saved
+    """
+    if pa is None:
+        return False
+    source_path = Path(source_path).resolve()
+    snapshot_dir = _snapshot_dir(source_path, directory)
+    tmp_dir = snapshot_dir.with_suffix(f".{os.getpid()}.tmp")
+    try:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        _write_tables(ocel, tmp_dir, {"source_path": str(source_path), "source": _source_fingerprint(source_path)})
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+        os.replace(tmp_dir, snapshot_dir)
+    except Exception as e:
+        logger.warning(f"Could not save snapshot of {source_path.name} ({type(e).__name__}: {e})")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        return False
+    logger.info(f"Saved snapshot of {source_path.name}")
+    return True
+
+
+def load_filtered_snapshot(path) -> Optional[Pm4pyEventLogObject]:
+    """
+    Loads a filtered event log saved by save_filtered_snapshot, e.g. in a worker process.
+    :param path: The snapshot directory returned by save_filtered_snapshot
+    :return: The pm4py event log, or None if there is no such snapshot (anymore)
+    """
+    if pa is None:
+        return None
+    snapshot_dir = Path(path)
+    meta_path = snapshot_dir / SNAPSHOT_META_FILE
+    try:
+        with open(meta_path, "r") as f:
+            meta = json.load(f)
+        ocel = _read_tables(snapshot_dir, meta)
+        # Mark the snapshot as recently used
+        os.utime(meta_path)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        logger.warning(f"Could not load filtered snapshot {snapshot_dir.name} ({type(e).__name__}: {e})")
+        return None
+    return ocel
+
+
+def save_filtered_snapshot(ocel: Pm4pyEventLogObject, key: str, directory=FILTERED_SNAPSHOT_DIR) -> Optional[str]:
+    """
+    Saves a filtered event log, such that worker processes load it instead of filtering the whole event log.
+    Only the most recently used FILTERED_SNAPSHOT_COUNT filtered snapshots are kept.
+    :param ocel: The filtered pm4py event log
+    :param key: The key of the filtered event log (source file and filters)
+    :param directory: Directory where filtered snapshots are saved
+    :return: The snapshot directory, or None if the snapshot could not be saved
+    """
+    if pa is None:
+        return None
+    directory = Path(directory)
+    snapshot_dir = directory / key
+    if (snapshot_dir / SNAPSHOT_META_FILE).exists():
+        os.utime(snapshot_dir / SNAPSHOT_META_FILE)
+        return str(snapshot_dir)
+    tmp_dir = None
+    try:
+        os.makedirs(directory, exist_ok=True)
+        tmp_dir = Path(tempfile.mkdtemp(prefix=TMP_DIR_PREFIX, dir=directory))
+        _write_tables(ocel, tmp_dir, {"key": key})
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+        os.replace(tmp_dir, snapshot_dir)
+    except Exception as e:
+        logger.warning(f"Could not save filtered snapshot {key} ({type(e).__name__}: {e})")
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return None
+    _evict_filtered_snapshots(directory)
+    return str(snapshot_dir)
+
+
+def _evict_filtered_snapshots(directory: Path):
+    """ Deletes the least recently used filtered snapshots exceeding FILTERED_SNAPSHOT_COUNT """
+    snapshots = []
+    for snapshot_dir in directory.iterdir():
+        if snapshot_dir.name.startswith(TMP_DIR_PREFIX):
+            continue
+        try:
+            snapshots.append((os.stat(snapshot_dir / SNAPSHOT_META_FILE).st_mtime, snapshot_dir))
+        except OSError:
+            continue
+    for _, snapshot_dir in sorted(snapshots, reverse=True)[FILTERED_SNAPSHOT_COUNT:]:
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
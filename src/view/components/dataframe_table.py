@@ -0,0 +1,206 @@
+import logging
+import math
+import tkinter.font as tkfont
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+import ttkbootstrap as ttk
+from ttkbootstrap.constants import *
+
+logger = logging.getLogger("app_logger")
+
+SORT_ARROWS = {True: " ▲", False: " ▼"}
+MIN_COLUMN_WIDTH = 60
+MAX_COLUMN_WIDTH = 400
+
+
+def _is_missing(value) -> bool:
+    # pd.isna is not applicable to cells containing lists, e.g. the object columns of the extended table
+    return value is None or value is pd.NaT or value is pd.NA or (isinstance(value, float) and math.isnan(value))
+
+
+class DataFrameView:
+    """
+    Search, sort and paging state over a DataFrame, without any copies of the data.
+    The current view is an array of row positions; only the rows of the requested page are ever materialized.
+    """
+
+    def __init__(self, df: Optional[pd.DataFrame] = None, pagesize: int = 30):
+        self.pagesize = pagesize
+        self.df = None
+        self.positions = None
+        self.search_text = ""
+        self.sort_column = None
+        self.sort_ascending = True
+        self.page = 0
+        self.set_data(df if df is not None else pd.DataFrame())
+
+    def set_data(self, df: pd.DataFrame):
+        self.df = df
+        self.search_text = ""
+        self.sort_column = None
+        self.sort_ascending = True
+        self.page = 0
+        self.positions = np.arange(len(df))
+
+    @property
+    def num_rows(self) -> int:
+        return len(self.positions)
+
+    @property
+    def num_pages(self) -> int:
+        return max(1, math.ceil(self.num_rows / self.pagesize))
+
+    def search(self, text: str):
+        """ Keeps the rows where any column contains the text (case-insensitive) """
+        self.search_text = text
+        self.page = 0
+        if not text:
+            positions = np.arange(len(self.df))
+        else:
+            mask = np.zeros(len(self.df), dtype=bool)
+            for column in self.df.columns:
+                mask |= self.df[column].astype(str).str.contains(text, case=False, regex=False).to_numpy()
+            positions = np.flatnonzero(mask)
+        self.positions = positions
+        if self.sort_column is not None:
+            self._apply_sort()
+
+    def sort(self, column: str, ascending: Optional[bool] = None):
+        """ Sorts by a column. If ascending is not given, the order of an already sorted column is toggled. """
+        if ascending is None:
+            ascending = not self.sort_ascending if column == self.sort_column else True
+        self.sort_column = column
+        self.sort_ascending = ascending
+        self.page = 0
+        self._apply_sort()
+
+    def _apply_sort(self):
+        values = self.df[self.sort_column].iloc[self.positions].reset_index(drop=True)
+        try:
+            order = values.sort_values(ascending=self.sort_ascending, kind="stable", na_position="last").index
+        except TypeError:
+            # Mixed types in an object column
+            order = values.astype(str).sort_values(ascending=self.sort_ascending, kind="stable").index
+        self.positions = self.positions[order.to_numpy()]
+
+    def goto_page(self, page: int):
+        self.page = min(max(0, page), self.num_pages - 1)
+
+    def page_rows(self) -> pd.DataFrame:
+        start = self.page * self.pagesize
+        return self.df.iloc[self.positions[start:start + self.pagesize]]
+
+
+class DataFrameTableview(ttk.Frame):
+    """
+    Paginated and searchable table that displays a DataFrame, similar to ttkbootstrap's Tableview.
+    Instead of building a row object per record, it keeps the DataFrame as the source of truth
+    and inserts only the rows of the current page into the Treeview.
+    """
+
+    def __init__(self, master, bootstyle=PRIMARY, pagesize: int = 30, **kwargs):
+        super().__init__(master, **kwargs)
+        self.data = DataFrameView(pagesize=pagesize)
+
+        self._search_var = ttk.StringVar()
+        self._page_var = ttk.StringVar(value="1")
+        self._page_limit_var = ttk.StringVar(value="1")
+        self._records_var = ttk.StringVar()
+
+        self._build_search_frame()
+        self.tree = ttk.Treeview(self, show=HEADINGS, height=pagesize, bootstyle=bootstyle)
+        self.tree.pack(fill=BOTH, expand=YES, side=TOP)
+        xscroll = ttk.Scrollbar(self, orient=HORIZONTAL, command=self.tree.xview)
+        xscroll.pack(fill=X, side=TOP)
+        self.tree.configure(xscrollcommand=xscroll.set)
+        self._build_pagination_frame()
+
+    def _build_search_frame(self):
+        frame = ttk.Frame(self, padding=5)
+        frame.pack(fill=X, side=TOP)
+        ttk.Label(frame, text="Search").pack(side=LEFT, padx=5)
+        entry = ttk.Entry(frame, textvariable=self._search_var)
+        entry.pack(fill=X, side=LEFT, expand=YES)
+        entry.bind("<Return>", lambda e: self.search(self._search_var.get()))
+        entry.bind("<KP_Enter>", lambda e: self.search(self._search_var.get()))
+
+    def _build_pagination_frame(self):
+        frame = ttk.Frame(self)
+        frame.pack(fill=X, anchor=N)
+        ttk.Label(frame, textvariable=self._records_var).pack(side=LEFT, padx=5)
+        ttk.Button(frame, text="⎌", command=self.reset, bootstyle=LINK).pack(side=RIGHT)
+        ttk.Separator(frame, orient=VERTICAL).pack(side=RIGHT, padx=10)
+        for text, command in [("»", lambda: self.goto_page(self.data.num_pages - 1)),
+                              ("›", lambda: self.goto_page(self.data.page + 1)),
+                              ("‹", lambda: self.goto_page(self.data.page - 1)),
+                              ("«", lambda: self.goto_page(0))]:
+            ttk.Button(frame, text=text, command=command, bootstyle=LINK).pack(side=RIGHT, fill=Y)
+        ttk.Separator(frame, orient=VERTICAL).pack(side=RIGHT, padx=10)
+        ttk.Label(frame, textvariable=self._page_limit_var).pack(side=RIGHT, padx=(0, 5))
+        ttk.Label(frame, text="of").pack(side=RIGHT, padx=(5, 0))
+        entry = ttk.Entry(frame, textvariable=self._page_var, width=6)
+        entry.pack(side=RIGHT)
+        entry.bind("<Return>", self._on_page_entry)
+        entry.bind("<KP_Enter>", self._on_page_entry)
+        ttk.Label(frame, text="Page").pack(side=RIGHT, padx=5)
+
+    def set_data(self, df: pd.DataFrame):
+        """ Shows a new DataFrame, resetting search, sorting and the page """
+        self._search_var.set("")
+        self.data.set_data(df)
+        columns = [str(column) for column in df.columns]
+        self.tree.configure(columns=columns)
+        for column in columns:
+            self.tree.heading(column, text=column, anchor=W,
+                              command=lambda c=column: self.sort(c))
+        self.load_page()
+        self.autofit_columns()
+
+    def reset(self):
+        self.set_data(self.data.df)
+
+    def search(self, text: str):
+        self.data.search(text)
+        self.load_page()
+
+    def sort(self, column: str):
+        self.data.sort(self.data.df.columns[self.tree["columns"].index(column)])
+        for c in self.tree["columns"]:
+            arrow = SORT_ARROWS[self.data.sort_ascending] if c == column else ""
+            self.tree.heading(c, text=f"{c}{arrow}")
+        self.load_page()
+
+    def goto_page(self, page: int):
+        self.data.goto_page(page)
+        self.load_page()
+
+    def _on_page_entry(self, event=None):
+        try:
+            self.goto_page(int(self._page_var.get()) - 1)
+        except ValueError:
+            self._page_var.set(str(self.data.page + 1))
+
+    def load_page(self):
+        """ Replaces the Treeview items by the rows of the current page """
+        self.tree.delete(*self.tree.get_children())
+        for row in self._format_rows(self.data.page_rows()):
+            self.tree.insert("", END, values=row)
+        self._page_var.set(str(self.data.page + 1))
+        self._page_limit_var.set(str(self.data.num_pages))
+        self._records_var.set(f"{self.data.num_rows} of {len(self.data.df)} records")
+
+    @staticmethod
+    def _format_rows(rows: pd.DataFrame) -> List[tuple]:
+        return [tuple("" if _is_missing(value) else value for value in row)
+                for row in rows.astype(object).itertuples(index=False, name=None)]
+
+    def autofit_columns(self):
+        """ Fits the column widths to the headings and the rows of the current page """
+        font = tkfont.nametofont("TkDefaultFont")
+        rows = self._format_rows(self.data.page_rows())
+        for i, column in enumerate(self.tree["columns"]):
+            texts = [column] + [str(row[i]) for row in rows]
+            width = max(font.measure(text) for text in texts) + 20
+            self.tree.column(column, width=min(max(width, MIN_COLUMN_WIDTH), MAX_COLUMN_WIDTH), stretch=False)
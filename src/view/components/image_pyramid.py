@@ -0,0 +1,119 @@
+import logging
+import math
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Dict, Tuple
+
+from PIL import Image
+
+from model import instrumentation
+from view.constants import ZOOM_TILE_SIZE, ZOOM_TILE_CACHE_SIZE
+
+logger = logging.getLogger("app_logger")
+
+
+class ImagePyramid:
+    """
+    Multi-resolution tile pyramid of an image for zooming and panning.
+    Level 0 is the full image, every further level halves its size, down to a single tile.
+    Each level is cut into square tiles that are kept compressed in memory (rendered graphs mostly consist of plain
+    background and compress well). Decoded tiles are kept in an LRU cache, so a redraw only decodes the tiles that
+    became visible, and only composites the visible tiles of the level closest to the display resolution.
+    """
+
+    def __init__(self, image: Image.Image, tile_size: int = ZOOM_TILE_SIZE, cache_size: int = ZOOM_TILE_CACHE_SIZE):
+        if image.mode not in ("RGB", "RGBA", "L", "LA"):
+            image = image.convert("RGBA")
+        self.mode = image.mode
+        self.width, self.height = image.size
+        self.tile_size = tile_size
+        self.cache_size = cache_size
+        self._tiles: Dict[Tuple[int, int, int], Tuple[Tuple[int, int], bytes]] = {}
+        self._level_sizes = []
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+        with instrumentation.span("zoom_build_pyramid", "render"):
+            level_image = image
+            while True:
+                level = len(self._level_sizes)
+                self._level_sizes.append(level_image.size)
+                self._cut_tiles(level, level_image)
+                w, h = level_image.size
+                if max(w, h) <= tile_size or min(w, h) < 2:
+                    break
+                level_image = level_image.reduce(2)
+        logger.debug(f"Built image pyramid of {self.width}x{self.height} pixels with {len(self._level_sizes)} levels "
+                     f"and {len(self._tiles)} tiles")
+
+    @property
+    def levels(self) -> int:
+        return len(self._level_sizes)
+
+    def level_size(self, level: int) -> Tuple[int, int]:
+        return self._level_sizes[level]
+
+    def _cut_tiles(self, level: int, image: Image.Image):
+        w, h = image.size
+        for ty in range(math.ceil(h / self.tile_size)):
+            for tx in range(math.ceil(w / self.tile_size)):
+                x0, y0 = tx * self.tile_size, ty * self.tile_size
+                tile = image.crop((x0, y0, min(x0 + self.tile_size, w), min(y0 + self.tile_size, h)))
+                self._tiles[(level, tx, ty)] = (tile.size, zlib.compress(tile.tobytes(), 1))
+
+    def tile(self, level: int, tx: int, ty: int) -> Image.Image:
+        """ :return: The decoded tile, from the LRU cache if possible """
+        key = (level, tx, ty)
+        with self._lock:
+            tile = self._cache.get(key)
+            if tile is not None:
+                self._cache.move_to_end(key)
+                return tile
+        size, data = self._tiles[key]
+        tile = Image.frombytes(self.mode, size, zlib.decompress(data))
+        instrumentation.count("render", "zoom_tile_decode")
+        with self._lock:
+            self._cache[key] = tile
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return tile
+
+    def level_for_scale(self, scale: float) -> int:
+        """
+        :param scale: Display pixels per image pixel
+        :return: The smallest level whose resolution is at least the display resolution
+        """
+        if scale >= 1:
+            return 0
+        return min(int(math.floor(math.log2(1 / scale))), self.levels - 1)
+
+    def render(self, box: Tuple[float, float, float, float], size: Tuple[int, int],
+               resample=Image.BICUBIC) -> Image.Image:
+        """
+        Renders a region of the image by compositing the visible tiles of the nearest pyramid level.
+        :param box: The region (x0, y0, x1, y1) in full resolution image coordinates
+        :param size: The size of the rendered image in display pixels
+        :param resample: The PIL resampling filter used for scaling the composited tiles to the display size
+        """
+        x0, y0, x1, y1 = box
+        width, height = size
+        level = self.level_for_scale(min(width / max(x1 - x0, 1e-9), height / max(y1 - y0, 1e-9)))
+        level_w, level_h = self._level_sizes[level]
+        fx, fy = level_w / self.width, level_h / self.height
+        # Region in level coordinates, and the tiles covering it
+        lx0, ly0 = max(0.0, x0 * fx), max(0.0, y0 * fy)
+        lx1, ly1 = min(float(level_w), x1 * fx), min(float(level_h), y1 * fy)
+        if lx1 <= lx0 or ly1 <= ly0:
+            return Image.new(self.mode, size)
+        tx0, ty0 = int(lx0 // self.tile_size), int(ly0 // self.tile_size)
+        tx1, ty1 = int(math.ceil(lx1 / self.tile_size)), int(math.ceil(ly1 / self.tile_size))
+        mosaic_x0, mosaic_y0 = tx0 * self.tile_size, ty0 * self.tile_size
+        mosaic = Image.new(self.mode, (min(tx1 * self.tile_size, level_w) - mosaic_x0,
+                                       min(ty1 * self.tile_size, level_h) - mosaic_y0))
+        for ty in range(ty0, ty1):
+            for tx in range(tx0, tx1):
+                mosaic.paste(self.tile(level, tx, ty),
+                             (tx * self.tile_size - mosaic_x0, ty * self.tile_size - mosaic_y0))
+        return mosaic.resize(size, resample,
+                             box=(lx0 - mosaic_x0, ly0 - mosaic_y0, lx1 - mosaic_x0, ly1 - mosaic_y0))
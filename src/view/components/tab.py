@@ -7,8 +7,9 @@ from tkfontawesome import icon_to_image as fontawesome
 
 
 class Tabs(ttk.Frame):
-    def __init__(self, master, **kwargs):
+    def __init__(self, master, on_change=None, **kwargs):
         super().__init__(master=master, **kwargs)
+        self.on_change = on_change
         self.tabs = []
         # self.callbacks = []
         self.active_tab = None
@@ -39,9 +40,13 @@ class Tabs(ttk.Frame):
         if self.active_tab is not None:
             self.active_tab.on_close()
         self.active_tab = new_tab
+        if self.on_change is not None:
+            self.on_change(new_tab)
 
 
 class Tab(ttk.Frame):
+    precomputations = []  # Background computations needed by the tab (see controller/scheduler.py)
+
     def __init__(self, master: Tabs, view, title: str, icon=None, **kwargs):
         super().__init__(master=master.notebook, **kwargs)
         self.view = view
@@ -54,6 +59,17 @@ class Tab(ttk.Frame):
     def on_close(self):
         pass
 
+    def on_theme_change(self):
+        """ Called after the theme has changed, e.g. to re-render images with the new colors """
+        pass
+
+    def sampled_result(self):
+        """
+        The OCEL method (name, args) whose result is displayed, for showing its error estimate in sampling mode
+        (see Model.sampling_error), or None if the tab does not display a sampled result.
+        """
+        return None
+
 
 class SidebarTab(Tab):
     def __init__(self, master, view, title, sidebar_width_ratio, sidebar_min_width, **kwargs):
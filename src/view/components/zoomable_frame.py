@@ -6,12 +6,20 @@
 # It zooms only a tile, but not the whole image. So the zoomed tile occupies
 # constant memory and not crams it with a huge resized image for the large zooms.
 import random
+import time
 import tkinter as tk
 from tkinter import ttk
 from PIL import Image, ImageTk, ImageFile
 
+from model import instrumentation
+from view.components.image_pyramid import ImagePyramid
+from view.constants import ZOOM_FRAME_INTERVAL, ZOOM_SETTLE_DELAY
+
 ImageFile.LOAD_TRUNCATED_IMAGES = True
 
+MOTION_RESAMPLE = Image.NEAREST  # fast resampling while panning and zooming
+SETTLED_RESAMPLE = Image.LANCZOS  # high quality resampling once the interaction has settled
+
 
 class AutoScrollbar(ttk.Scrollbar):
     ''' A scrollbar that hides itself if it's not needed.
@@ -73,14 +81,22 @@ class AdvancedZoom(ttk.Frame):
         self.rowconfigure(0, weight=1)
         self.columnconfigure(0, weight=1)
         # Bind events to the Canvas
-        self.canvas.bind('<Configure>', self.show_image)  # canvas is resized
+        self.canvas.bind('<Configure>', self.request_redraw)  # canvas is resized
         self.canvas.bind('<ButtonPress-1>', self.move_from)
         self.canvas.bind('<B1-Motion>', self.move_to)
         self.canvas.bind('<MouseWheel>', self.wheel)  # with Windows and MacOS, but not Linux
         self.canvas.bind('<Button-5>', self.wheel)  # only with Linux, wheel scroll down
         self.canvas.bind('<Button-4>', self.wheel)  # only with Linux, wheel scroll up
-        self.image = Image.open(path)  # open image
-        self.width, self.height = self.image.size
+        with Image.open(path) as image:  # open image and cut it into a tile pyramid, then release the full image
+            self.pyramid = ImagePyramid(image)
+        self.width, self.height = self.pyramid.width, self.pyramid.height
+        self.imageid = None  # canvas image item, reused on every redraw
+        # Redraws requested by input events are coalesced to at most one per frame
+        self.redraw_id = None  # scheduled redraw
+        self.settle_id = None  # scheduled high quality redraw after the last input event
+        self.last_redraw = 0.0  # time of the last redraw
+        self.pending_since = None  # time of the earliest input event not yet painted
+        self.pending_events = 0  # number of input events coalesced into the next redraw
         self.imscale = 1.0  # scale for the canvas image
         self.delta = 1.3  # zoom magnitude
         # Put image into container rectangle and use it to set proper coordinates to the image
@@ -94,17 +110,61 @@ class AdvancedZoom(ttk.Frame):
         #     y1 = y0 + random.randint(minsize, maxsize)
         #     color = ('red', 'orange', 'yellow', 'green', 'blue')[random.randint(0, 4)]
         #     self.canvas.create_rectangle(x0, y0, x1, y1, fill=color, activefill='black')
-        self.show_image()
+        self.show_image(resample=SETTLED_RESAMPLE)
+
+    def destroy(self):
+        for after_id in (self.redraw_id, self.settle_id):
+            if after_id is not None:
+                self.after_cancel(after_id)
+        self.redraw_id = self.settle_id = None
+        super().destroy()
+
+    def request_redraw(self, event=None):
+        '''
+        Schedules a redraw of the image. All requests within one frame are coalesced into a single fast redraw,
+        and a high quality redraw follows once no further request came in for a while.
+        '''
+        now = time.perf_counter()
+        if self.pending_since is None:
+            self.pending_since = now
+        self.pending_events += 1
+        if self.redraw_id is None:
+            delay = max(0, int((self.last_redraw - now) * 1000) + ZOOM_FRAME_INTERVAL)
+            self.redraw_id = self.after(delay, self.redraw, MOTION_RESAMPLE)
+        if self.settle_id is not None:
+            self.after_cancel(self.settle_id)
+        self.settle_id = self.after(ZOOM_SETTLE_DELAY, self.settle)
+
+    def settle(self):
+        ''' Redraw the image in high quality after the interaction has settled '''
+        self.settle_id = None
+        if self.redraw_id is not None:
+            self.after_cancel(self.redraw_id)
+            self.redraw_id = None
+        self.redraw(SETTLED_RESAMPLE)
+
+    def redraw(self, resample):
+        ''' Scheduled redraw, recording the latency from the earliest coalesced input event to the paint '''
+        self.redraw_id = None
+        self.last_redraw = time.perf_counter()
+        pending_since, pending_events = self.pending_since, self.pending_events
+        self.pending_since, self.pending_events = None, 0
+        self.show_image(resample=resample)
+        if pending_since is not None and instrumentation.enabled():
+            self.canvas.update_idletasks()  # paint now to include it in the latency
+            quality = "fast" if resample == MOTION_RESAMPLE else "high"
+            instrumentation.record("zoom_event_to_paint", "render", pending_since, events=pending_events,
+                                   quality=quality)
 
     def scroll_y(self, *args, **kwargs):
         ''' Scroll canvas vertically and redraw the image '''
         self.canvas.yview(*args, **kwargs)  # scroll vertically
-        self.show_image()  # redraw the image
+        self.request_redraw()  # redraw the image
 
     def scroll_x(self, *args, **kwargs):
         ''' Scroll canvas horizontally and redraw the image '''
         self.canvas.xview(*args, **kwargs)  # scroll horizontally
-        self.show_image()  # redraw the image
+        self.request_redraw()  # redraw the image
 
     def move_from(self, event):
         ''' Remember previous coordinates for scrolling with the mouse '''
@@ -113,7 +173,7 @@ class AdvancedZoom(ttk.Frame):
     def move_to(self, event):
         ''' Drag (move) canvas to the new position '''
         self.canvas.scan_dragto(event.x, event.y, gain=1)
-        self.show_image()  # redraw the image
+        self.request_redraw()  # redraw the image
 
     def wheel(self, event):
         ''' Zoom with mouse wheel '''
@@ -139,9 +199,9 @@ class AdvancedZoom(ttk.Frame):
             self.imscale *= self.delta
             scale *= self.delta
         self.canvas.scale('all', x, y, scale, scale)  # rescale all canvas objects
-        self.show_image()
+        self.request_redraw()
 
-    def show_image(self, event=None):
+    def show_image(self, event=None, resample=SETTLED_RESAMPLE):
         ''' Show image on the Canvas '''
         bbox1 = BoundingBox(*self.canvas.bbox(self.container))  # get image area
         # Remove 1 pixel shift at the sides of the bbox1
@@ -170,13 +230,19 @@ class AdvancedZoom(ttk.Frame):
         x2 = min(bbox2.x1, bbox1.x1) - bbox1.x0
         y2 = min(bbox2.y1, bbox1.y1) - bbox1.y0
         if int(x2 - x1) > 0 and int(y2 - y1) > 0:  # show image if it is in the visible area
-            x = min(int(x2 / self.imscale), self.width)  # sometimes it is larger on 1 pixel...
-            y = min(int(y2 / self.imscale), self.height)  # ...and sometimes not
-            image = self.image.crop((int(x1 / self.imscale), int(y1 / self.imscale), x, y))
-            imagetk = ImageTk.PhotoImage(image.resize((int(x2 - x1), int(y2 - y1))))
-            imageid = self.canvas.create_image(max(bbox2.x0, bbox1.x0), max(bbox2.y0, bbox1.y0),
-                                               anchor='nw', image=imagetk)
-            self.canvas.lower(imageid)  # set image into background
+            x = min(x2 / self.imscale, self.width)  # sometimes it is larger on 1 pixel...
+            y = min(y2 / self.imscale, self.height)  # ...and sometimes not
+            # Composite the visible tiles of the nearest pyramid level
+            image = self.pyramid.render((x1 / self.imscale, y1 / self.imscale, x, y), (int(x2 - x1), int(y2 - y1)),
+                                        resample=resample)
+            imagetk = ImageTk.PhotoImage(image)
+            position = (max(bbox2.x0, bbox1.x0), max(bbox2.y0, bbox1.y0))
+            if self.imageid is None:
+                self.imageid = self.canvas.create_image(*position, anchor='nw', image=imagetk)
+            else:
+                self.canvas.coords(self.imageid, *position)
+                self.canvas.itemconfigure(self.imageid, image=imagetk)
+            self.canvas.lower(self.imageid)  # set image into background
             self.canvas.imagetk = imagetk  # keep an extra reference to prevent garbage-collection
 
 
@@ -8,6 +8,23 @@ SIDEBAR_MIN_WIDTH = 150
 
 GRAPH_FONT = "Arial"
 GRAPHVIZ_RENDER_DPI = 150
+RENDER_CACHE_DIR = "../cache/renders"  # Rendered graph images, named by a hash of their content and render settings
+RENDER_CACHE_MAX_SIZE = 512 * 1024 ** 2  # [bytes]
+LAYOUT_CACHE_DIR = "../cache/layouts"  # Graph layouts, named by a hash of the graph source
+LAYOUT_CACHE_MAX_SIZE = 64 * 1024 ** 2  # [bytes]
+VARIANT_PRERENDER_COUNT = 10  # Number of most frequent variants rendered in the background when listing variants
+VARIANT_PRERENDER_WORKERS = 2  # Parallel graphviz processes used for prerendering
+ZOOM_TILE_SIZE = 256  # [px] Edge length of the tiles of the image pyramid used by the zoomable image view
+ZOOM_TILE_CACHE_SIZE = 128  # Number of decoded tiles kept in memory per zoomable image view
+ZOOM_FRAME_INTERVAL = 16  # [ms] Minimum time between redraws of the zoomable image view while panning and zooming
+ZOOM_SETTLE_DELAY = 150  # [ms] Idle time after the last pan/zoom event until the image is redrawn in high quality
+
+HEATMAP_RENDERER = "native"  # "native" (Tk canvas) or "browser" (plotly in an embedded Chromium, requires cefpython3)
+HEATMAP_TOOLTIP_WIDTH = 300  # [px] Maximum width of heatmap hover tooltips
+# plotly's default colorscale of heatmaps (Plasma), used by the native heatmap
+HEATMAP_COLORSCALE = [(0.0, "#0d0887"), (0.1111, "#46039f"), (0.2222, "#7201a8"), (0.3333, "#9c179e"),
+                      (0.4444, "#bd3786"), (0.5556, "#d8576b"), (0.6667, "#ed7953"), (0.7778, "#fb9f3a"),
+                      (0.8889, "#fdca26"), (1.0, "#f0f921")]
 
 PREFERENCES_FILE = "preferences.json"
 DEFAULT_PREFERENCES = {
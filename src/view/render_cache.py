@@ -0,0 +1,86 @@
+import json
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from model.cache import LruFileStore, make_key
+from model import instrumentation
+from view.constants import RENDER_CACHE_DIR, RENDER_CACHE_MAX_SIZE, LAYOUT_CACHE_DIR, LAYOUT_CACHE_MAX_SIZE
+
+logger = logging.getLogger("app_logger")
+
+
+class RenderCache:
+    """
+    Disk cache of rendered images, named by a hash of the rendered content and the render settings (colors, DPI).
+    Rendering the same graph again, e.g. when re-selecting a variant or reopening the file, returns the cached image.
+    The least recently used images are deleted when the total size exceeds the limit.
+    """
+    make_key = staticmethod(make_key)
+
+    def __init__(self, directory=RENDER_CACHE_DIR, max_size: int = RENDER_CACHE_MAX_SIZE):
+        self.store = LruFileStore(directory, ".png", max_size, name="Render cache")
+
+    def get_path(self, key: str) -> Optional[str]:
+        """ :return: The path of the cached image, or None if it has not been rendered yet """
+        path = self.store.path(key)
+        if not path.exists():
+            return None
+        self.store.touch(path)
+        return str(path).replace('\\', '/')
+
+    def render(self, key: str, render_func: Callable[[str], str]) -> str:
+        """
+        Returns the cached image, or renders it. Concurrent renders of the same key are safe: the image is rendered
+        to a temporary file first, then moved into the cache.
+        :param key: The cache key (see make_key)
+        :param render_func: Function rendering the image to the given path
+        :return: The path of the image
+        """
+        path = self.get_path(key)
+        if path is not None:
+            instrumentation.count("render", "render_cache_hit")
+            return path
+        instrumentation.count("render", "render_cache_miss")
+        return str(self.store.write(key, render_func)).replace('\\', '/')
+
+    def clear(self):
+        self.store.clear()
+
+
+class LayoutCache:
+    """
+    Disk cache of graph layouts (graphviz json0 output with node and edge positions), named by a hash of the graph
+    source. Rendering a cached layout with other colors or labels skips the layout computation.
+    """
+    make_key = staticmethod(make_key)
+
+    def __init__(self, directory=LAYOUT_CACHE_DIR, max_size: int = LAYOUT_CACHE_MAX_SIZE):
+        self.store = LruFileStore(directory, ".json", max_size, name="Layout cache")
+
+    def layout(self, key: str, layout_func: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Returns the cached layout, or computes and caches it.
+        :param key: The cache key (see make_key)
+        :param layout_func: Function computing the layout
+        """
+        def write_layout(path: str):
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(layout_func(), f)
+
+        path = self.store.path(key)
+        if path.exists():
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    layout = json.load(f)
+                self.store.touch(path)
+                instrumentation.count("render", "layout_cache_hit")
+                return layout
+            except (OSError, json.JSONDecodeError):
+                logger.warning(f"Corrupt layout cache entry {path.name}, recomputing it")
+        instrumentation.count("render", "layout_cache_miss")
+        path = self.store.write(key, write_layout)
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def clear(self):
+        self.store.clear()
@@ -0,0 +1,317 @@
+import json
+import logging
+from typing import Optional, Dict, Any, Tuple
+
+import networkx as nx
+import pandas as pd
+from pm4py.visualization.ocel.ocpn.variants.wo_decoration import *
+
+from view.constants import GRAPH_FONT, GRAPHVIZ_RENDER_DPI
+from view import utils
+from view.utils import ot_to_color
+from model import instrumentation
+
+logger = logging.getLogger("app_logger")
+
+# Graph rendering without any dependency on Tk, shared by the app and the command line interface.
+# Graphs are laid out once (graph_layout), then rendered from the layout with the current colors and labels
+# (render_layout), such that theme changes and label toggles do not recompute the layout.
+
+LAYOUT_STRUCTURE_KEYS = {"name", "directed", "strict", "_subgraph_cnt", "_gvid", "objects", "edges"}
+
+
+def petri_net_layout(ocpn: Dict[str, Any],
+                     lagging_times: Dict[str, pd.DataFrame],
+                     pooling_times: Dict[str, pd.DataFrame],
+                     layout_cache=None) -> Dict[str, Any]:
+    """
+    Computes the graphviz layout of an object-centric petri net, independent of colors and of the displayed KPI
+    aggregation. Edge labels are laid out with the longest KPI label of all aggregations.
+    :param ocpn: An object-centric petri net, as discovered by pm4py's discovery algorithm
+    :param layout_cache: Optional LayoutCache (see view/render_cache.py) returning layouts computed before
+    :return: The layout (see graph_layout) and the KPI labels of the edges per aggregation
+    """
+    with instrumentation.span("petri_net_visualization", category="render"):
+        A, maps = advanced_visualizer(ocpn, lagging_times, pooling_times, agg=None)
+    A.name = "ocpn"
+    A.graph_attr["fontname"] = GRAPH_FONT
+    A.node_attr["fontname"] = GRAPH_FONT
+    A.edge_attr["fontname"] = GRAPH_FONT
+    return {"graph": graph_layout(A, layout_cache), "kpi_labels": maps["kpi_labels"]}
+
+
+def render_petri_net_layout(layout: Dict[str, Any],
+                            filename: str = "tmp/ocpn.png",
+                            bgcolor: str = "white",
+                            fgcolor: str = "black",
+                            agg: str = "mean",
+                            dpi: int = GRAPHVIZ_RENDER_DPI) -> str:
+    """
+    Renders a petri net layout (see petri_net_layout) to an image file, without recomputing the layout.
+    :param filename: The output path
+    :param bgcolor: The background color
+    :param fgcolor: The color of texts and node borders
+    :param agg: The aggregation of the KPIs shown as edge labels ('min', 'mean' or 'max')
+    :param dpi: The resolution
+    :return: The path of the rendered image
+    """
+    edge_labels = {edge_id: labels.get(agg, "") for edge_id, labels in layout["kpi_labels"].items()}
+    with instrumentation.span("petri_net_graphviz", category="render"):
+        path = render_layout(layout["graph"], filename,
+                             graph_attr={"bgcolor": bgcolor, "dpi": str(dpi)},
+                             node_attr={"color": fgcolor, "fontcolor": fgcolor},
+                             edge_attr={"fontcolor": fgcolor},
+                             edge_labels=edge_labels)
+    logger.info(f"Petri net saved to {path}")
+    return path
+
+
+def render_petri_net(ocpn: Dict[str, Any],
+                     lagging_times: Dict[str, pd.DataFrame],
+                     pooling_times: Dict[str, pd.DataFrame],
+                     filename: str = "tmp/ocpn.png",
+                     bgcolor: str = "white",
+                     fgcolor: str = "black",
+                     agg: str = "mean",
+                     layout_cache=None) -> str:
+    """
+    Renders an object-centric petri net (ocpn) to an image file.
+    Based on pm4py's visualization method (https://github.com/pm4py/pm4py-core/blob/release/pm4py/visualization/ocel/ocpn/variants/wo_decoration.py)
+    Reference paper: van der Aalst, Wil and Berti, Alessandro. "Discovering object-centric Petri nets." Fundamenta informaticae 175.1-4 (2020): 1-40.
+    :param ocpn: An object-centric petri net, as discovered by pm4py's discovery algorithm
+    :param filename: The output path
+    :param bgcolor: The background color
+    :param fgcolor: The color of texts and node borders
+    :param agg: The aggregation of the KPIs shown as edge labels ('min', 'mean' or 'max')
+    :param layout_cache: Optional LayoutCache returning layouts computed before
+    :return: The path of the rendered image
+    """
+    layout = petri_net_layout(ocpn, lagging_times, pooling_times, layout_cache=layout_cache)
+    return render_petri_net_layout(layout, filename, bgcolor=bgcolor, fgcolor=fgcolor, agg=agg)
+
+
+def graph_layout(A: Digraph, layout_cache=None) -> Dict[str, Any]:
+    """
+    Runs the graphviz layout (dot) of a graph and returns the positioned graph (graphviz' json0 format).
+    The layout only depends on the graph source, so it is cached under a hash of the source. Node ids must therefore
+    be deterministic.
+    :param A: The graph, without any colors (they do not affect the layout)
+    :param layout_cache: Optional LayoutCache
+    """
+    def compute_layout():
+        with instrumentation.span(f"{A.name}_layout", category="render"):
+            return json.loads(A.pipe(format="json0", engine="dot", encoding="utf-8"))
+
+    if layout_cache is None:
+        return compute_layout()
+    key = layout_cache.make_key("graph_layout", A.source)
+    return layout_cache.layout(key, compute_layout)
+
+
+def render_layout(layout: Dict[str, Any],
+                  filename: str,
+                  graph_attr: Dict[str, str],
+                  node_attr: Dict[str, str],
+                  edge_attr: Dict[str, str],
+                  edge_labels: Optional[Dict[str, str]] = None) -> str:
+    """
+    Renders a graph layout (see graph_layout) to a png file, keeping all node and edge positions (neato -n2).
+    Only styling attributes and edge labels may be changed, attributes affecting the layout are ignored.
+    :param graph_attr: Graph attributes, e.g. the background color and dpi
+    :param node_attr: Default node attributes, e.g. colors
+    :param edge_attr: Default edge attributes, e.g. colors
+    :param edge_labels: New labels of edges, by the edges' id attribute
+    :return: The path of the rendered image
+    """
+    edge_labels = edge_labels or {}
+    A = Digraph(layout.get("name", "G"), engine="neato", format="png")
+    A.graph_attr.update({k: v for k, v in layout.items() if k not in LAYOUT_STRUCTURE_KEYS})
+    A.graph_attr.update(graph_attr)
+    A.node_attr.update(node_attr)
+    A.edge_attr.update(edge_attr)
+    names = {}
+    for node in layout.get("objects", []):
+        names[node["_gvid"]] = node["name"]
+        A.node(node["name"], **{k: v for k, v in node.items() if k not in ("_gvid", "name")})
+    for edge in layout.get("edges", []):
+        attrs = {k: v for k, v in edge.items() if k not in ("_gvid", "tail", "head")}
+        if attrs.get("id") in edge_labels:
+            attrs["label"] = edge_labels[attrs["id"]]
+        A.edge(names[edge["tail"]], names[edge["head"]], **attrs)
+    # graphviz saves the DOT source next to the image, it is deleted after rendering
+    return A.render(outfile=filename, neato_no_op=2, view=False, cleanup=True).replace('\\', '/')
+
+
+def _kpi_label(lagging_time, pooling_time) -> str:
+    """ Edge label of the KPIs, omitting missing (None or NaN) and zero times """
+    return "\n".join(f"{kpi}: {utils.time_formatter(t)}"
+                     for kpi, t in [("Lagging", lagging_time), ("Pooling", pooling_time)] if pd.notna(t) and t > 0)
+
+
+def advanced_visualizer(ocpn: Dict[str, Any],
+                        lagging_times: Dict[str, pd.DataFrame],
+                        pooling_times: Dict[str, pd.DataFrame],
+                        agg: Optional[str],
+                        parameters: Optional[Dict[Any, Any]] = None) -> Tuple[Digraph, Dict[str, Any]]:
+    """
+    Obtains a visualization of the provided object-centric Petri net (without decoration).
+    Node ids are derived from the (sorted) activities, object types and place/transition names, such that the same
+    net always results in the same graph source.
+    Reference paper: van der Aalst, Wil MP, and Alessandro Berti. "Discovering object-centric Petri nets." Fundamenta informaticae 175.1-4 (2020): 1-40.
+
+    Parameters
+    ----------------
+    ocpn
+        Object-centric Petri net
+    lagging_times
+    pooling_times
+        Dicts of DataFrames containing performance metrics computed with the OPerA framework, by aggregation
+    agg
+        One of 'min', 'mean' and 'max'. Aggregation used for performance metrics.
+        If None, edges are labeled with the longest label of all aggregations (used for layouts).
+    parameters
+        Variant-specific parameters:
+        - Parameters.FORMAT => the format of the visualization ("png", "svg", ...)
+        - Parameters.BGCOLOR => the background color
+        - Parameters.RANKDIR => the rank direction (LR = left-right, TB = top-bottom)
+
+    Returns
+    ---------------
+    viz
+        Graphviz digraph
+    maps
+        Dict containing information on the petri net elements, and the edge labels of all aggregations by edge id
+    """
+    if parameters is None:
+        parameters = {}
+
+    image_format = exec_utils.get_param_value(Parameters.FORMAT, parameters, "png")
+    bgcolor = exec_utils.get_param_value(Parameters.BGCOLOR, parameters, constants.DEFAULT_BGCOLOR)
+    rankdir = exec_utils.get_param_value(Parameters.RANKDIR, parameters, "LR")
+
+    filename = tempfile.NamedTemporaryFile(suffix='.gv')
+    viz = Digraph("ocdfg", filename=filename.name, engine='dot', graph_attr={'bgcolor': bgcolor})
+    viz.attr('node', shape='ellipse', fixedsize='false')
+
+    activities_map = {}
+    source_places = {}
+    target_places = {}
+    transition_map = {}
+    places = {}
+    kpi_labels = {}
+    aggs = list(lagging_times.keys())
+
+    for i, act in enumerate(sorted(ocpn["activities"])):
+        activities_map[act] = f"act{i}"
+        viz.node(activities_map[act], label=act, shape="box")
+
+    object_types = sorted(ocpn["object_types"])
+    for i, ot in enumerate(object_types):
+        otc = ot_to_color(ot)
+        source_places[ot] = f"ot{i}_source"
+        target_places[ot] = f"ot{i}_sink"
+        viz.node(source_places[ot], label=ot, shape="ellipse", style="filled", fillcolor=otc)
+        viz.node(target_places[ot], label=ot, shape="underline", fontcolor=otc)
+
+    for ot in sorted(ocpn["petri_nets"]):
+        i = object_types.index(ot)
+        otc = ot_to_color(ot)
+        net, im, fm = ocpn["petri_nets"][ot]
+        for j, place in enumerate(sorted(net.places, key=lambda p: p.name)):
+            if place in im:
+                places[place] = source_places[ot]
+            elif place in fm:
+                places[place] = target_places[ot]
+            else:
+                places[place] = f"ot{i}_p{j}"
+                viz.node(places[place], label=" ", shape="circle", style="filled", fillcolor=otc)
+        for j, trans in enumerate(sorted(net.transitions, key=lambda t: t.name)):
+            if trans.label is not None:
+                transition_map[trans] = activities_map[trans.label]
+            else:
+                transition_map[trans] = f"ot{i}_t{j}"
+                viz.node(transition_map[trans], label=" ", shape="box", style="filled", fillcolor=otc)
+
+        arcs = sorted(net.arcs, key=lambda a: ((places if type(a.source) is PetriNet.Place else transition_map)[a.source],
+                                               (places if type(a.target) is PetriNet.Place else transition_map)[a.target]))
+        for arc in arcs:
+            if type(arc.source) is PetriNet.Place:
+                is_double = arc.target.label in ocpn["double_arcs_on_activity"][ot] and ocpn["double_arcs_on_activity"][ot][arc.target.label]
+                penwidth = "4.0" if is_double else "1.0"
+                label = None
+                viz.edge(places[arc.source], transition_map[arc.target], color=otc, penwidth=penwidth, label=label)
+            elif type(arc.source) is PetriNet.Transition:
+                is_double = arc.source.label in ocpn["double_arcs_on_activity"][ot] and ocpn["double_arcs_on_activity"][ot][arc.source.label]
+                penwidth = "4.0" if is_double else "1.0"
+
+                act = arc.source.label
+                labels = {a: _kpi_label(lagging_times[a][ot].get(act, None), pooling_times[a][ot].get(act, None))
+                          for a in aggs}
+                edge_id = f"kpi{len(kpi_labels)}"
+                kpi_labels[edge_id] = labels
+                label = labels.get(agg, "") if agg is not None else max(labels.values(), key=len, default="")
+
+                viz.edge(transition_map[arc.source], places[arc.target], color=otc, penwidth=penwidth, label=label,
+                         id=edge_id)
+
+    viz.attr(rankdir=rankdir)
+    viz.format = image_format
+
+    maps = {
+        "activities": activities_map,
+        "source_places": source_places,
+        "target_places": target_places,
+        "transitions": transition_map,
+        "places": places,
+        "kpi_labels": kpi_labels,
+    }
+    return viz, maps
+
+
+def variant_graph_content(G: nx.DiGraph) -> Tuple:
+    """
+    A canonical representation of the rendered content of a variant graph (labels and structure).
+    Nodes are numbered in their sorted order, such that the event ids do not matter.
+    """
+    nodes = sorted(G.nodes)
+    index = {v: i for i, v in enumerate(nodes)}
+    return (tuple(str(G.nodes[v].get("label", "")) for v in nodes),
+            tuple(sorted((index[u], index[v], str(edge.get("label", ""))) for (u, v), edge in G.edges.items())))
+
+
+def render_variant_graph(G: nx.DiGraph,
+                         filename: str,
+                         bgcolor: str = "white",
+                         fgcolor: str = "black",
+                         dpi: int = GRAPHVIZ_RENDER_DPI,
+                         layout_cache=None) -> str:
+    """
+    Renders a variant graph (event-object graph) to an image file.
+    :param G: The variant graph, with node and edge labels
+    :param filename: The output path
+    :param bgcolor: The background color
+    :param fgcolor: The color of texts, nodes and edges
+    :param dpi: The resolution
+    :param layout_cache: Optional LayoutCache returning layouts computed before
+    :return: The path of the rendered image
+    """
+    # Nodes are numbered in their sorted order (like variant_graph_content), such that equal graphs share a layout
+    index = {v: i for i, v in enumerate(sorted(G.nodes))}
+    A = Digraph("variant_graph")
+    for v in sorted(G.nodes):
+        A.node(f"n{index[v]}", label=G.nodes[v].get("label", ""))
+    for (u, v), edge in sorted(G.edges.items(), key=lambda item: (index[item[0][0]], index[item[0][1]])):
+        A.edge(f"n{index[u]}", f"n{index[v]}", label=edge.get("label", ""))
+
+    A.graph_attr["fontname"] = GRAPH_FONT
+    A.node_attr["fontname"] = GRAPH_FONT
+    A.edge_attr["fontname"] = GRAPH_FONT
+    A.graph_attr["rankdir"] = "TB"  # would prefer LR, but edge labels might be long
+    A.node_attr["shape"] = "box"
+    layout = graph_layout(A, layout_cache)
+
+    with instrumentation.span("variant_graph_graphviz", category="render"):
+        return render_layout(layout, filename,
+                             graph_attr={"bgcolor": bgcolor, "dpi": str(dpi)},
+                             node_attr={"fontcolor": fgcolor, "color": fgcolor, "fillcolor": bgcolor},
+                             edge_attr={"fontcolor": fgcolor, "color": fgcolor})
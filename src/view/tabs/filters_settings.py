@@ -9,6 +9,7 @@ from controller.tasks import *
 from controller.export import Export
 from view.components.accordion import Accordion
 from view.widgets.table_view import TableViewWidget
+from model.constants import SAMPLE_FRACTION
 import functools
 
 
@@ -41,6 +42,15 @@ class FilterTab(SidebarTab):
                                                     bootstyle="round-toggle")
         self.checkbox_demo_popups.pack(side=BOTTOM, fill=X, padx=10, pady=10)
 
+        # Checkbox for running the analyses on a sample of the event log
+        self.sample_var = tk.IntVar(value=0)
+        self.checkbox_sample = ttk.Checkbutton(master=self.sidebar,
+                                               text=f"Preview on a {SAMPLE_FRACTION:.0%} sample",
+                                               command=self.update_sample_checkbox,
+                                               variable=self.sample_var,
+                                               bootstyle="round-toggle")
+        self.checkbox_sample.pack(side=BOTTOM, fill=X, padx=10, pady=10)
+
         # Theme selection
         theme_menubutton = ttk.Menubutton(master=self.sidebar, text="Change theme", bootstyle=SECONDARY)
         theme_menubutton.pack(side=BOTTOM, padx=10, pady=10, fill=X)
@@ -60,6 +70,9 @@ class FilterTab(SidebarTab):
         state = bool(self.checkbox_demo_popups_var.get())
         self.view.app.set_preference("show_demo_popups", state)
 
+    def update_sample_checkbox(self):
+        self.view.controller.set_sample_fraction(SAMPLE_FRACTION if self.sample_var.get() else None)
+
     def on_open(self):
         if self.table_widget is not None:
             self.table_widget.update_table()
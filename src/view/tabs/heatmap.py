@@ -1,6 +1,5 @@
 import tkinter as tk
 
-import plotly.graph_objects as go
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 
@@ -9,7 +8,7 @@ from controller.tasks import *
 from view import utils
 from view.components.tab import SidebarTab
 from view.constants import *
-from view.widgets.heatmap import HeatmapFrame, HeatmapType, HEATMAP_HTML_FILE
+from view.widgets.heatmap import HeatmapFrame, HeatmapType, HeatmapData
 
 HEATMAP_TYPES = {
     "object_interactions": HeatmapType(title="Object Interactions",
@@ -25,6 +24,8 @@ HEATMAP_TYPES = {
 
 
 class HeatMapTab(SidebarTab):
+    precomputations = ["heatmap", "opera"]
+
     def __init__(self, master, view):
         super().__init__(master=master,
                          view=view,
@@ -80,7 +81,7 @@ class HeatMapTab(SidebarTab):
         self.btn_export = ttk.Button(master=self, text="Export heatmap", command=self.view.trigger_export)
 
     def select_min_measure(self):
-        self.measurement = "mean"
+        self.measurement = "min"
         key, heatmap_type = self.get_selected_heatmap_type()
         if key == "lagging_metrics":
             self.display_heatmap_lagging(self.kpi_matrix)
@@ -119,6 +120,11 @@ class HeatMapTab(SidebarTab):
         self.view.show_toast(title="Insights into object and activity relation", message=TAB_EXPLANATION_HEATMAP,
                              bootstyle="dark")
 
+    def sampled_result(self):
+        key, heatmap_type = self.get_selected_heatmap_type()
+        # The performance heatmaps show OPerA KPIs (see Pm4pyEventLog._compute_heatmap_pooling)
+        return ("_compute_heatmap", ()) if key == "object_interactions" else ("_compute_opera", (None,))
+
     def get_selected_heatmap_type(self):
         return list(HEATMAP_TYPES.items())[self.heatmap_selection_var.get()]
 
@@ -128,37 +134,25 @@ class HeatMapTab(SidebarTab):
         heatmap_type.generate()
         # The above call schedules a task, with a callback that then displays the heatmap.
         self.frame.update_description(heatmap_type)
+        self.view.sampling_bar.update_estimate(self)
 
     def display_heatmap_ot(self, args):
         number_matrix, activities = args
+        object_types = list(number_matrix.columns.levels[0])
+        self.show_heatmap(HeatmapData(z=number_matrix, x=object_types, y=object_types, hovertext=activities),
+                          export_name="heatmap_object_types")
 
-        self.btn_export.forget()
-        fig = go.Figure()
-        fig.add_trace(go.Heatmap(z=number_matrix,
-                                 x=list(number_matrix.columns.levels[0]),
-                                 y=list(number_matrix.columns.levels[0]),
-                                 hoverinfo='text',
-                                 text=activities))
-        fig.update_layout(margin_b=200, margin_r=120)
-        fig.write_html(HEATMAP_HTML_FILE)
-        # refresh browser
-        self.refresh_heatmap_display()
-        self.view.controller.init_export(Export("heatmap_object_types", "html",
-                                                copy_from_path=HEATMAP_HTML_FILE, use_dialog=True))
-
-    def refresh_heatmap_display(self):
+    def show_heatmap(self, data: HeatmapData, export_name: str):
+        self.frame.show(data)
         self.btn_export.place(relx=.9925, rely=.985, anchor=SE)
-        browser = self.frame.get_browser()
-        if browser is not None:
-            browser.Reload()
-        else:
-            print("Could not reload to show heatmap, browser is None")
+        # The interactive plotly figure is only written when exporting
+        self.view.controller.init_export(Export(export_name, "html", write_to_path=data.write_html, use_dialog=True))
 
     def display_heatmap_pooling(self, number_matrix):
         self.kpi_matrix = number_matrix
         number_matrix = number_matrix['pooling_time'][self.measurement]
         tmin, tmax = max(0, number_matrix.min().min()), number_matrix.max().max()
-        number_matrix.fillna(max(0 - .2 * (tmax - tmin), -1), inplace=True)
+        number_matrix = number_matrix.fillna(max(0 - .2 * (tmax - tmin), -1))
 
         matrix = number_matrix
         hovertext = list()
@@ -172,26 +166,14 @@ class HeatMapTab(SidebarTab):
                     s = f"No two objects of '{y}'<br>are related to '{x}' at once."
                 hovertext[-1].append(s)
 
-        fig = go.Figure()
-        heatmap = go.Heatmap(z=number_matrix,
-                             x=list(number_matrix.columns),
-                             y=list(number_matrix._stat_axis),
-                             hoverinfo='text',
-                             text=hovertext)
-        self.format_heatmap_time_intervals(heatmap, tmin, tmax)
-        fig.add_trace(heatmap)
-        fig.update_layout(margin_b=200, margin_r=120)
-        fig.write_html(HEATMAP_HTML_FILE)
-        # refresh browser
-        self.refresh_heatmap_display()
-        self.view.controller.init_export(Export("heatmap_pooling", "html",
-                                                copy_from_path=HEATMAP_HTML_FILE, use_dialog=True))
+        self.show_heatmap(self.time_interval_heatmap(number_matrix, hovertext, tmin, tmax),
+                          export_name="heatmap_pooling")
 
     def display_heatmap_lagging(self, number_matrix):
         self.kpi_matrix = number_matrix
         number_matrix = number_matrix['lagging_time'][self.measurement]
         tmin, tmax = max(0, number_matrix.min().min()), number_matrix.max().max()
-        number_matrix.fillna(min(0 - .2 * (tmax - tmin), -1), inplace=True)
+        number_matrix = number_matrix.fillna(min(0 - .2 * (tmax - tmin), -1))
 
         matrix = number_matrix
         hovertext = list()
@@ -205,23 +187,15 @@ class HeatMapTab(SidebarTab):
                     s = f"The object type '{y}'<br>is not related to '{x}'"
                 hovertext[-1].append(s)
 
-        fig = go.Figure()
-        heatmap = go.Heatmap(z=number_matrix,
-                             x=list(number_matrix.columns),
-                             y=list(number_matrix._stat_axis),
-                             hoverinfo='text',
-                             text=hovertext)
-        self.format_heatmap_time_intervals(heatmap, tmin, tmax)
-        fig.add_trace(heatmap)
-        fig.update_layout(margin_b=200, margin_r=120)
-        fig.write_html(HEATMAP_HTML_FILE)
-        # refresh browser
-        self.refresh_heatmap_display()
-        self.view.controller.init_export(Export("heatmap_lagging", "html",
-                                                copy_from_path=HEATMAP_HTML_FILE, use_dialog=True))
+        self.show_heatmap(self.time_interval_heatmap(number_matrix, hovertext, tmin, tmax),
+                          export_name="heatmap_lagging")
 
     @staticmethod
-    def format_heatmap_time_intervals(heatmap, tmin, tmax):
+    def time_interval_heatmap(number_matrix, hovertext, tmin, tmax) -> HeatmapData:
         # Set the custom tick values and labels for the colorbar
-        heatmap.colorbar.tickvals = [tmin, tmax]
-        heatmap.colorbar.ticktext = [utils.time_formatter(t) for t in (tmin, tmax)]
+        return HeatmapData(z=number_matrix,
+                           x=list(number_matrix.columns),
+                           y=list(number_matrix._stat_axis),
+                           hovertext=hovertext,
+                           tickvals=[tmin, tmax],
+                           ticktext=[utils.time_formatter(t) for t in (tmin, tmax)])
@@ -1,5 +1,6 @@
 
 import logging
+import tkinter as tk
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 from view.constants import *
@@ -7,24 +8,41 @@ from view.components.tab import Tabs, Tab, SidebarTab
 from controller.tasks import *
 from controller.export import Export
 from view.components.zoomable_frame import AdvancedZoom
-from view import utils
-import time
-from pm4py.visualization.ocel.ocpn.variants.wo_decoration import *
-from typing import Optional, Dict, Any, Tuple
+from view.render_cache import RenderCache, LayoutCache
+from view import rendering
 import pandas as pd
+from typing import Any, Dict, Optional
+
+KPI_AGGREGATIONS = ["min", "mean", "max"]  # Aggregations of the KPI edge labels that can be selected
 
 
 class PetriNetTab(Tab):
+    precomputations = ["petri_net", "opera"]
+
     def __init__(self, master, view):
         super().__init__(master=master, view=view, title="Petri Net")
         self.display_label = ttk.Label(self)
         self.imgview = None
         self.btn_export = None
+        self.layout: Optional[Dict[str, Any]] = None  # layout of the displayed net, re-rendered on style changes
+        self.layout_cache = LayoutCache()
+        self.render_cache = RenderCache()
+        self.agg_var = tk.StringVar(value="mean")
+        self.agg_selection = ttk.Frame(master=self)
+        for agg in KPI_AGGREGATIONS:
+            ttk.Radiobutton(master=self.agg_selection, value=agg, variable=self.agg_var, text=agg.capitalize(),
+                            command=self.restyle_petri_net).pack(side=LEFT, padx=5)
 
     def on_open(self):
         self.view.controller.run_task(key=TASK_DISCOVER_PETRI_NET, callback=self.display_petri_net, renderer=self.render_petri_net)
         self.view.show_toast(title="Process model discovery", message=TAB_EXPLANATION_PETRI_NET, bootstyle='dark')
 
+    def on_theme_change(self):
+        self.restyle_petri_net()
+
+    def sampled_result(self):
+        return "_compute_petri_net", ()
+
     def display_petri_net(self, path):
         if self.imgview is not None:
             self.imgview.canvas.forget()
@@ -35,146 +53,30 @@ class PetriNetTab(Tab):
         self.view.controller.init_export(Export("petrinet", "png", copy_from_path=path, use_dialog=True))
         self.btn_export = ttk.Button(master=self, text="Export image", command=self.view.trigger_export)
         self.btn_export.place(relx=.9925, rely=.985, anchor=SE)
+        self.agg_selection.place(relx=.0075, rely=.985, anchor=SW)
+        self.agg_selection.lift()
 
-    def render_petri_net(self, ocpn, lagging_times: pd.DataFrame, pooling_times: pd.DataFrame):
+    def restyle_petri_net(self):
+        """ Re-renders the displayed petri net from its layout with the current colors and KPI aggregation """
+        if self.layout is None or self.imgview is None:
+            return
+        self.display_petri_net(self.render_layout(self.layout))
+
+    def render_petri_net(self, ocpn, lagging_times: Dict[str, pd.DataFrame], pooling_times: Dict[str, pd.DataFrame]):
         """
-        Renders an object-centric petri net (ocpn) to an image file.
-        Based on pm4py's visualization method (https://github.com/pm4py/pm4py-core/blob/release/pm4py/visualization/ocel/ocpn/variants/wo_decoration.py)
-        Reference paper: van der Aalst, Wil and Berti, Alessandro. "Discovering object-centric Petri nets." Fundamenta informaticae 175.1-4 (2020): 1-40.
+        Renders an object-centric petri net (ocpn) to an image file, using the colors of the current theme.
+        The layout is cached, such that the net can be re-rendered with other colors or KPI labels.
         :param ocpn: An object-centric petri net, as discovered by pm4py's discovery algorithm
         :return: The path of the rendered image
         """
-
-        t0 = time.time()
-        A, maps = self.advanced_visualizer(ocpn, lagging_times, pooling_times, agg='mean')
-        t1 = time.time()
-        visualization_time = t1 - t0
-
-        A.graph_attr["fontname"] = GRAPH_FONT
-        A.node_attr["fontname"] = GRAPH_FONT
-        A.edge_attr["fontname"] = GRAPH_FONT
-        A.graph_attr["bgcolor"] = ttk.Style.instance.colors.bg
-        A.node_attr["color"] = ttk.Style.instance.colors.fg
-        A.node_attr["fontcolor"] = ttk.Style.instance.colors.fg
-        A.edge_attr["fontcolor"] = ttk.Style.instance.colors.fg
-        A.graph_attr['dpi'] = str(GRAPHVIZ_RENDER_DPI)
-
-        filename = 'tmp/ocpn.png'
-        A.name = "ocpn"
-        A.format = "png"
-        t0 = time.time()
-        path = A.render(format="png", outfile=filename).replace('\\', '/')
-        t1 = time.time()
-        render_time = t1 - t0
-        logger.info(f"Petri net saved to {path}")
-        logger.info(f"Visualization time: {visualization_time}")
-        logger.info(f"Render time: {render_time}")
-        return path
-
-    def advanced_visualizer(self, ocpn: Dict[str, Any],
-                            lagging_times: pd.DataFrame,
-                            pooling_times: pd.DataFrame,
-                            agg: str,
-                            parameters: Optional[Dict[Any, Any]] = None) -> Tuple[Digraph, Dict[str, Any]]:
-        """
-        Obtains a visualization of the provided object-centric Petri net (without decoration).
-        Reference paper: van der Aalst, Wil MP, and Alessandro Berti. "Discovering object-centric Petri nets." Fundamenta informaticae 175.1-4 (2020): 1-40.
-
-        Parameters
-        ----------------
-        ocpn
-            Object-centric Petri net
-        lagging_times
-        pooling_times
-            DataFrame containing performance metrics computed with the OPerA framework
-        agg
-            One of 'min', 'mean' and 'max'. Aggregation used for performance metrics.
-        parameters
-            Variant-specific parameters:
-            - Parameters.FORMAT => the format of the visualization ("png", "svg", ...)
-            - Parameters.BGCOLOR => the background color
-            - Parameters.RANKDIR => the rank direction (LR = left-right, TB = top-bottom)
-
-        Returns
-        ---------------
-        viz
-            Graphviz digraph
-        maps
-            Dict containing information on the petri net elements
-        """
-        if parameters is None:
-            parameters = {}
-
-        image_format = exec_utils.get_param_value(Parameters.FORMAT, parameters, "png")
-        bgcolor = exec_utils.get_param_value(Parameters.BGCOLOR, parameters, constants.DEFAULT_BGCOLOR)
-        rankdir = exec_utils.get_param_value(Parameters.RANKDIR, parameters, "LR")
-
-        filename = tempfile.NamedTemporaryFile(suffix='.gv')
-        viz = Digraph("ocdfg", filename=filename.name, engine='dot', graph_attr={'bgcolor': bgcolor})
-        viz.attr('node', shape='ellipse', fixedsize='false')
-
-        activities_map = {}
-        source_places = {}
-        target_places = {}
-        transition_map = {}
-        places = {}
-
-        for act in ocpn["activities"]:
-            activities_map[act] = str(uuid.uuid4())
-            viz.node(activities_map[act], label=act, shape="box")
-
-        for ot in ocpn["object_types"]:
-            otc = ot_to_color(ot)
-            source_places[ot] = str(uuid.uuid4())
-            target_places[ot] = str(uuid.uuid4())
-            viz.node(source_places[ot], label=ot, shape="ellipse", style="filled", fillcolor=otc)
-            viz.node(target_places[ot], label=ot, shape="underline", fontcolor=otc)
-
-        for ot in ocpn["petri_nets"]:
-            otc = ot_to_color(ot)
-            net, im, fm = ocpn["petri_nets"][ot]
-            for place in net.places:
-                if place in im:
-                    places[place] = source_places[ot]
-                elif place in fm:
-                    places[place] = target_places[ot]
-                else:
-                    places[place] = str(uuid.uuid4())
-                    viz.node(places[place], label=" ", shape="circle", style="filled", fillcolor=otc)
-            for trans in net.transitions:
-                if trans.label is not None:
-                    transition_map[trans] = activities_map[trans.label]
-                else:
-                    transition_map[trans] = str(uuid.uuid4())
-                    viz.node(transition_map[trans], label=" ", shape="box", style="filled", fillcolor=otc)
-
-            for arc in net.arcs:
-                if type(arc.source) is PetriNet.Place:
-                    is_double = arc.target.label in ocpn["double_arcs_on_activity"][ot] and ocpn["double_arcs_on_activity"][ot][arc.target.label]
-                    penwidth = "4.0" if is_double else "1.0"
-                    label = None
-                    viz.edge(places[arc.source], transition_map[arc.target], color=otc, penwidth=penwidth, label=label)
-                elif type(arc.source) is PetriNet.Transition:
-                    is_double = arc.source.label in ocpn["double_arcs_on_activity"][ot] and ocpn["double_arcs_on_activity"][ot][arc.source.label]
-                    penwidth = "4.0" if is_double else "1.0"
-
-
-                    act = arc.source.label
-                    lagging_time = lagging_times[agg][ot].get(act, None)
-                    pooling_time = pooling_times[agg][ot].get(act, None)
-                    label = "\n".join([f"Lagging: {utils.time_formatter(lagging_time)}"] if lagging_time else [] +
-                                      [f"Pooling: {utils.time_formatter(pooling_time)}"] if pooling_time else [])
-
-                    viz.edge(transition_map[arc.source], places[arc.target], color=otc, penwidth=penwidth, label=label)
-
-        viz.attr(rankdir=rankdir)
-        viz.format = image_format
-
-        maps = {
-            "activities": activities_map,
-            "source_places": source_places,
-            "target_places": target_places,
-            "transitions": transition_map,
-            "places": places,
-        }
-        return viz, maps
+        self.layout = rendering.petri_net_layout(ocpn, lagging_times, pooling_times, layout_cache=self.layout_cache)
+        return self.render_layout(self.layout)
+
+    def render_layout(self, layout: Dict[str, Any]) -> str:
+        """ Renders a petri net layout, or returns the cached image rendered before with the same style """
+        bg, fg, agg = ttk.Style.instance.colors.bg, ttk.Style.instance.colors.fg, self.agg_var.get()
+        key = self.render_cache.make_key("petri_net", self.render_cache.make_key(layout["graph"], layout["kpi_labels"]),
+                                         bg, fg, agg, GRAPHVIZ_RENDER_DPI)
+        return self.render_cache.render(key, lambda filename: rendering.render_petri_net_layout(layout, filename,
+                                                                                                bgcolor=bg, fgcolor=fg,
+                                                                                                agg=agg))
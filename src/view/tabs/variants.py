@@ -8,11 +8,17 @@ from view.components.tab import Tabs, Tab, SidebarTab
 from controller.tasks import *
 from controller.export import Export
 from view.components.zoomable_frame import AdvancedZoom
-import networkx as nx
-import graphviz
+from view.render_cache import RenderCache, LayoutCache
+from view import rendering
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger("app_logger")
 
 
 class VariantsTab(SidebarTab):
+    precomputations = ["variant_frequencies"]
+
     def __init__(self, master, view):
         super().__init__(master=master,
                          view=view,
@@ -26,8 +32,15 @@ class VariantsTab(SidebarTab):
         self.label_to_variant = {}
         self.value_to_variant = {}
         self.variant_selection_var = tk.IntVar()
+        self.render_cache = RenderCache()
+        self.layout_cache = LayoutCache()
+        # Renders the most frequent variants in the background. Scheduled renders of an outdated variant list
+        # (older generation) are skipped.
+        self.prerender_pool = ThreadPoolExecutor(max_workers=VARIANT_PRERENDER_WORKERS, thread_name_prefix="prerender")
+        self.prerender_generation = 0
 
     def on_open(self):
+        self.prerender_generation += 1
         for w in [self.stats_label, self.variant_selection, self.imgview]:
             if w is not None:
                 w.forget()
@@ -44,12 +57,18 @@ class VariantsTab(SidebarTab):
         self.label_to_variant = dict(zip(labels, variant_frequencies.keys()))
         self.value_to_variant = dict(enumerate(variant_frequencies.keys()))
 
-        num_proc, num_var = len(self.view.controller.model.cases), len(variant_frequencies)
+        model = self.view.controller.model
+        num_proc, num_var = len(model.cases), len(variant_frequencies)
+        if model.sample_fraction is None:
+            stats = f"There are {num_proc} process executions of {num_var} variants."
+        else:
+            stats = f"The {model.sample_fraction:.0%} sample contains {num_proc} process executions of {num_var} " \
+                    f"variants. The frequencies are estimated for the whole event log."
 
         self.stats_label = ttk.Label(self.sidebar,
                                      anchor=W,
                                      wraplength=self.sidebar.winfo_width() - 20,
-                                     text=f"There are {num_proc} process executions of {num_var} variants. In the list below, these variants are listed by their frequency (descending).")
+                                     text=f"{stats} In the list below, these variants are listed by their frequency (descending).")
         self.stats_label.pack(fill=X)
         self.stats_label.bind('<Configure>',
                               lambda e: self.stats_label.config(wraplength=self.sidebar.winfo_width() - 20))
@@ -75,42 +94,42 @@ class VariantsTab(SidebarTab):
             progressbar.pack(side=RIGHT, padx=15)
 
         self.display_selected_variant()
+        self.prerender_variants(list(variant_frequencies.keys())[:VARIANT_PRERENDER_COUNT])
 
-    def nx_to_graphviz(self, G: nx.DiGraph) -> graphviz.Digraph:
-        gv = graphviz.Digraph(format="png")
-
-        # Add nodes and edges to the Graphviz graph
-        for v, node in G.nodes.items():
-            gv.node(str(v), label=node.get("label", ""))  # Convert node label to string
+    def render_colors(self) -> Tuple[str, str]:
+        """ The theme's background and foreground color. Must be called from the main thread. """
+        return ttk.Style.instance.colors.bg, ttk.Style.instance.colors.fg
 
-        for (u, v), edge in G.edges.items():
-            gv.edge(str(u), str(v), label=edge.get("label", ""))  # Convert node labels to strings
-
-        return gv
-
-    def render_variant_graph(self, variant_id) -> str:
-        """ Renders a variant graph, saving it to an image file. """
+    def render_variant_graph(self, variant_id, colors: Optional[Tuple[str, str]] = None) -> str:
+        """ Renders a variant graph, or returns the cached image of a graph rendered before with the same colors. """
         G, ot_counts = self.view.controller.model.variant_graph(variant_id)
+        bg, fg = colors if colors is not None else self.render_colors()
+        key = self.render_cache.make_key("variant_graph", rendering.variant_graph_content(G), bg, fg,
+                                         GRAPHVIZ_RENDER_DPI, GRAPH_FONT)
+        return self.render_cache.render(key, lambda filename: rendering.render_variant_graph(
+            G, filename, bgcolor=bg, fgcolor=fg, layout_cache=self.layout_cache))
+
+    def prerender_variants(self, variant_ids: List[str]):
+        """ Renders the given variants into the render cache using the worker pool """
+        self.prerender_generation += 1
+        generation, colors = self.prerender_generation, self.render_colors()
+        for variant_id in variant_ids:
+            self.prerender_pool.submit(self._prerender, variant_id, generation, colors)
+
+    def _prerender(self, variant_id, generation: int, colors: Tuple[str, str]):
+        if generation != self.prerender_generation:
+            return
+        try:
+            self.render_variant_graph(variant_id, colors=colors)
+        except Exception as e:
+            logger.warning(f"Prerendering variant {variant_id} failed ({type(e).__name__}: {e})")
+
+    def on_theme_change(self):
+        if self.imgview is not None:
+            self.display_selected_variant()
 
-        bg = ttk.Style.instance.colors.bg
-        fg = ttk.Style.instance.colors.fg
-
-        A = self.nx_to_graphviz(G)
-        A.graph_attr["fontname"] = GRAPH_FONT
-        A.node_attr["fontname"] = GRAPH_FONT
-        A.edge_attr["fontname"] = GRAPH_FONT
-        A.graph_attr["bgcolor"] = bg
-        A.node_attr["fontcolor"] = fg
-        A.node_attr["color"] = fg
-        A.node_attr["fillcolor"] = bg
-        A.edge_attr["fontcolor"] = fg
-        A.edge_attr["color"] = fg
-        A.graph_attr["rankdir"] = "TB"  # would prefer LR, but edge labels might be long
-        A.node_attr["shape"] = "box"
-        A.graph_attr['dpi'] = str(GRAPHVIZ_RENDER_DPI)
-        filename = f"tmp/variant_graph_{variant_id}.png"
-        A.render(outfile=filename, view=False)
-        return filename
+    def sampled_result(self):
+        return "_get_variant_frequencies", ()
 
     def display_selected_variant(self):
         variant_id = self.value_to_variant[self.variant_selection_var.get()]
@@ -1,6 +1,16 @@
+import hashlib
+
 import pandas as pd
 
 
+def ot_to_color(ot: str) -> str:
+    """
+    Color of an object type. Like pm4py's ot_to_color, but derived from a stable hash instead of Python's hash(),
+    which differs between processes. Rendered graphs are therefore identical across runs and can be cached.
+    """
+    return "#" + hashlib.md5(str(ot).encode("utf-8")).hexdigest()[:6].upper()
+
+
 def time_formatter(t) -> str:
     if pd.isna(t) or t < 0:
         return None
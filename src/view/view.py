@@ -9,6 +9,8 @@ from view.widgets.object_types import ObjectTypeWidget
 from view.widgets.activities import ActivityWidget
 from view.components.tab import Tabs
 from view.widgets.popups import Toast
+from view.widgets.diagnostics import DiagnosticsWindow
+from view.widgets.sampling import SamplingBar
 
 from view.tabs.filters_settings import FilterTab
 from view.tabs.variants import VariantsTab
@@ -55,7 +57,7 @@ class View:
         self.style.theme_use(self.app.get_preference("theme"))
 
         # Init tabs
-        self.tab_widget = Tabs(master=self.window)
+        self.tab_widget = Tabs(master=self.window, on_change=self.controller.on_tab_change)
         self.tab_widget.pack(side=TOP, fill=BOTH, expand=True)
         self.tab1 = FilterTab(self.tab_widget, self)
         self.tab_widget.add_tab(self.tab1)
@@ -65,13 +67,19 @@ class View:
         self.tab_widget.add_tab(self.tab2)
         self.tab3 = HeatMapTab(self.tab_widget, self)
         self.tab_widget.add_tab(self.tab3)
+        # Shown at the bottom while the analyses run on a sample
+        self.sampling_bar = SamplingBar(self.window, self)
 
         # Init key events
         self.window.bind("<Control-s>", lambda *args: self.trigger_export())
+        self.window.bind("<Control-d>", lambda *args: self.show_diagnostics())
 
     def trigger_export(self, name=None):
         self.controller.trigger_export(name)
 
+    def show_diagnostics(self):
+        DiagnosticsWindow.show(self)
+
     def show_toast(self, title, message, bootstyle=None):
         if not self.app.get_preference("show_demo_popups"):
             return
@@ -97,6 +105,8 @@ class View:
         logger.info(f"Change to theme '{theme}'")
         self.style.theme_use(theme)
         self.app.set_preference("theme", theme)
+        for tab in self.tab_widget.tabs:
+            tab.on_theme_change()
 
     @property
     def style(self) -> ttk.Style:
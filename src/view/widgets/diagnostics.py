@@ -0,0 +1,72 @@
+import logging
+import tkinter as tk
+import ttkbootstrap as ttk
+from ttkbootstrap.constants import *
+
+from controller.export import Export
+from model import instrumentation
+from view.components.dataframe_table import DataFrameTableview
+
+logger = logging.getLogger("app_logger")
+
+
+class DiagnosticsWindow(ttk.Toplevel):
+    """
+    Developer panel showing the recorded timings of tasks, precomputations and model methods (also those executed in
+    worker processes), with the cache hits and misses per model method. Recording is toggled here and costs nothing
+    while disabled.
+    """
+    instance = None
+
+    def __init__(self, view):
+        super().__init__(title="Diagnostics", size=(900, 450))
+        DiagnosticsWindow.instance = self
+        self.view = view
+
+        controls = ttk.Frame(self, padding=5)
+        controls.pack(side=TOP, fill=X)
+        self.record_var = tk.IntVar(value=int(instrumentation.enabled()))
+        self.memory_var = tk.IntVar(value=0)
+        ttk.Checkbutton(controls, text="Record", variable=self.record_var, command=self.update_recording,
+                        bootstyle="round-toggle").pack(side=LEFT, padx=5)
+        ttk.Checkbutton(controls, text="Trace memory (slow)", variable=self.memory_var, command=self.update_recording,
+                        bootstyle="round-toggle").pack(side=LEFT, padx=5)
+        ttk.Button(controls, text="Export trace (.json)", command=self.export_trace).pack(side=RIGHT, padx=5)
+        ttk.Button(controls, text="Clear", command=self.clear, bootstyle=SECONDARY).pack(side=RIGHT, padx=5)
+        ttk.Button(controls, text="Refresh", command=self.refresh, bootstyle=SECONDARY).pack(side=RIGHT, padx=5)
+
+        self.table = DataFrameTableview(self, bootstyle=PRIMARY, pagesize=15)
+        self.table.pack(fill=BOTH, expand=YES, padx=10, pady=10)
+        self.protocol("WM_DELETE_WINDOW", self.close)
+        self.refresh()
+
+    @classmethod
+    def show(cls, view):
+        """ Opens the panel, or brings the open one to the front """
+        if cls.instance is not None:
+            cls.instance.lift()
+            cls.instance.refresh()
+        else:
+            cls(view)
+
+    def update_recording(self):
+        if self.record_var.get():
+            instrumentation.enable(trace_memory=bool(self.memory_var.get()))
+        else:
+            instrumentation.disable()
+
+    def refresh(self):
+        self.table.set_data(instrumentation.summary())
+
+    def clear(self):
+        instrumentation.recorder.clear()
+        self.refresh()
+
+    def export_trace(self):
+        self.view.controller.init_export(Export("trace", "json", write_to_path=instrumentation.export_trace,
+                                                use_dialog=True))
+        self.view.trigger_export("trace")
+
+    def close(self):
+        DiagnosticsWindow.instance = None
+        self.destroy()
@@ -4,11 +4,19 @@ import tkinter as tk
 import ttkbootstrap as ttk
 from ttkbootstrap.constants import *
 
-from cefpython3 import cefpython as cef
 import ctypes
+import numpy as np
+import plotly.graph_objects as go
 
 import logging
 from controller.tasks import *
+from view.constants import HEATMAP_RENDERER
+from view.widgets.heatmap_canvas import HeatmapCanvas
+
+try:
+    from cefpython3 import cefpython as cef
+except ImportError:
+    cef = None
 
 logger = logging.getLogger("app_logger")
 
@@ -33,6 +41,56 @@ class HeatmapType:
             self.controller.run_task(key=self.task, callback=self.callback, *self.task_kwargs)
 
 
+class HeatmapData:
+    """
+    The content of a heatmap, displayed by the native HeatmapCanvas or as a plotly figure.
+    :param z: The matrix of values (rows correspond to y, columns to x)
+    :param x: The column labels
+    :param y: The row labels
+    :param hovertext: Matrix of hover texts (plotly format, lines separated by <br>)
+    :param tickvals: Values of the colorbar ticks (default: minimum and maximum)
+    :param ticktext: Labels of the colorbar ticks
+    """
+
+    def __init__(self, z, x, y, hovertext, tickvals=None, ticktext=None):
+        self.z = z
+        self.x = list(x)
+        self.y = list(y)
+        self.hovertext = hovertext
+        self.tickvals = tickvals
+        self.ticktext = ticktext
+
+    def zrange(self):
+        z = np.asarray(self.z, dtype=float)
+        if z.size == 0 or np.isnan(z).all():
+            return 0.0, 0.0
+        return float(np.nanmin(z)), float(np.nanmax(z))
+
+    def colorbar_ticks(self):
+        if self.tickvals is not None:
+            return self.tickvals, self.ticktext
+        zmin, zmax = self.zrange()
+        return [zmin, zmax], [f"{zmin:g}", f"{zmax:g}"]
+
+    def cell_text(self, row: int, col: int) -> str:
+        return str(self.hovertext[row][col]).replace("<br>", "\n")
+
+    def figure(self) -> go.Figure:
+        """ The heatmap as a plotly figure (used by the browser renderer and for HTML exports) """
+        fig = go.Figure()
+        heatmap = go.Heatmap(z=self.z, x=self.x, y=self.y, hoverinfo='text', text=self.hovertext)
+        if self.tickvals is not None:
+            # Set the custom tick values and labels for the colorbar
+            heatmap.colorbar.tickvals = self.tickvals
+            heatmap.colorbar.ticktext = self.ticktext
+        fig.add_trace(heatmap)
+        fig.update_layout(margin_b=200, margin_r=120)
+        return fig
+
+    def write_html(self, path: str):
+        self.figure().write_html(path)
+
+
 class HeatmapFrame(tk.Frame):
     def __init__(self, master, key: str, heatmap_type: HeatmapType):
         tk.Frame.__init__(self, master)
@@ -51,13 +109,33 @@ class HeatmapFrame(tk.Frame):
         self.description.bind('<Configure>', lambda e: self.description.config(wraplength=self.winfo_width() - 20))
         self.description.pack(side=TOP, padx=padx, fill=X)
 
-        # BrowserFrame
-        self.browser_frame = BrowserFrame(self, navigation_bar=None)
-        self.browser_frame.pack(side=TOP, fill=BOTH, expand=YES, padx=10, pady=10)
+        # Native heatmap, or the plotly figure in an embedded browser (optional, requires cefpython3)
+        self.browser_frame = None
+        self.heatmap_canvas = None
+        if HEATMAP_RENDERER == "browser" and cef is None:
+            logger.warning("cefpython3 is not installed, using the native heatmap renderer")
+        if HEATMAP_RENDERER == "browser" and cef is not None:
+            self.browser_frame = BrowserFrame(self, navigation_bar=None)
+            self.browser_frame.pack(side=TOP, fill=BOTH, expand=YES, padx=10, pady=10)
+        else:
+            self.heatmap_canvas = HeatmapCanvas(self)
+            self.heatmap_canvas.pack(side=TOP, fill=BOTH, expand=YES, padx=10, pady=10)
 
     def update_description(self, heatmap_type):
         self.description.config(text=heatmap_type.description)
 
+    def show(self, data: HeatmapData):
+        """ Displays a heatmap """
+        if self.heatmap_canvas is not None:
+            self.heatmap_canvas.show(data)
+            return
+        data.write_html(HEATMAP_HTML_FILE)
+        browser = self.get_browser()
+        if browser is not None:
+            browser.Reload()
+        else:
+            logger.warning("Could not reload to show heatmap, browser is None")
+
 
     def on_root_configure(self, _):
         if self.browser_frame:
@@ -0,0 +1,174 @@
+import logging
+import tkinter as tk
+import tkinter.font as tkfont
+from typing import Optional
+
+import numpy as np
+import ttkbootstrap as ttk
+from ttkbootstrap.constants import *
+
+from model import instrumentation
+from view.constants import HEATMAP_COLORSCALE, HEATMAP_TOOLTIP_WIDTH
+
+logger = logging.getLogger("app_logger")
+
+PADDING = 10  # [px]
+COLORBAR_WIDTH = 20  # [px]
+COLORBAR_STEPS = 64  # Number of rectangles drawn for the colorbar gradient
+
+
+def colorscale_hex(values: np.ndarray, colorscale=HEATMAP_COLORSCALE) -> np.ndarray:
+    """
+    Maps values in [0, 1] to colors by linear interpolation of a plotly-style colorscale.
+    :param values: Array of normalized values (NaN is mapped to 0)
+    :param colorscale: List of (position, hex color) pairs
+    :return: Array of hex color strings of the same shape
+    """
+    positions = np.array([p for p, _ in colorscale])
+    rgb = np.array([[int(c[i:i + 2], 16) for i in (1, 3, 5)] for _, c in colorscale])
+    values = np.asarray(values, dtype=float)
+    flat = np.nan_to_num(np.clip(values, 0, 1)).ravel()
+    channels = np.stack([np.interp(flat, positions, rgb[:, i]) for i in range(3)], axis=1).round().astype(int)
+    colors = np.array([f"#{r:02x}{g:02x}{b:02x}" for r, g, b in channels], dtype=object)
+    return colors.reshape(values.shape)
+
+
+class HeatmapCanvas(tk.Frame):
+    """
+    Heatmap drawn natively on a Tk canvas, with a colorbar and hover tooltips.
+    Draws the same content as the plotly figure of a HeatmapData (see view/widgets/heatmap.py): Rows are drawn from
+    bottom to top, like plotly does, and colors use plotly's default colorscale.
+    Redrawing only creates canvas items, so switching heatmaps or aggregations takes milliseconds.
+    """
+
+    def __init__(self, master, **kwargs):
+        tk.Frame.__init__(self, master, **kwargs)
+        self.canvas = tk.Canvas(self, highlightthickness=0)
+        self.canvas.pack(fill=BOTH, expand=YES)
+        self.data = None
+        self.grid_box = None  # (x0, y0, cell width, cell height) of the cell grid
+        self.hover_cell = None
+        self.redraw_id = None
+        self.canvas.bind("<Configure>", self.schedule_redraw)
+        self.canvas.bind("<Motion>", self.on_motion)
+        self.canvas.bind("<Leave>", lambda e: self.hide_tooltip())
+
+    def show(self, data):
+        """ Displays a heatmap (HeatmapData) """
+        self.data = data
+        self.redraw()
+
+    def schedule_redraw(self, event=None):
+        if self.redraw_id is None:
+            self.redraw_id = self.after_idle(self.redraw)
+
+    def redraw(self):
+        self.redraw_id = None
+        self.canvas.delete("all")
+        self.hover_cell = None
+        if self.data is None:
+            return
+        with instrumentation.span("heatmap_canvas", category="render"):
+            self._draw()
+
+    def _draw(self):
+        colors = ttk.Style.instance.colors
+        self.canvas.configure(background=colors.bg)
+        font = tkfont.nametofont("TkDefaultFont")
+        line_height = font.metrics("linespace")
+        z = np.asarray(self.data.z, dtype=float)
+        x_labels, y_labels = [str(x) for x in self.data.x], [str(y) for y in self.data.y]
+        num_rows, num_cols = z.shape
+        tickvals, ticktext = self.data.colorbar_ticks()
+
+        # Margins for the (rotated) axis labels and the colorbar
+        left = PADDING + max((font.measure(y) for y in y_labels), default=0) + PADDING
+        bottom = PADDING + max((font.measure(x) for x in x_labels), default=0) + PADDING
+        right = PADDING + COLORBAR_WIDTH + PADDING + max((font.measure(t) for t in ticktext), default=0) + PADDING
+        width, height = self.canvas.winfo_width(), self.canvas.winfo_height()
+        grid_width, grid_height = width - left - right, height - PADDING - bottom
+        if num_rows == 0 or num_cols == 0 or grid_width <= 0 or grid_height <= 0:
+            return
+        cell_w, cell_h = grid_width / num_cols, grid_height / num_rows
+        self.grid_box = (left, PADDING, cell_w, cell_h)
+
+        zmin, zmax = self.data.zrange()
+        normalized = (z - zmin) / (zmax - zmin) if zmax > zmin else np.zeros_like(z)
+        cell_colors = colorscale_hex(normalized)
+        for row in range(num_rows):
+            y1 = PADDING + grid_height - row * cell_h  # first row at the bottom
+            for col in range(num_cols):
+                x0 = left + col * cell_w
+                color = cell_colors[row, col]
+                self.canvas.create_rectangle(x0, y1 - cell_h, x0 + cell_w, y1, fill=color, outline=color)
+
+        # Axis labels, skipped if the cells are smaller than the text
+        row_step = max(1, int(np.ceil(line_height / cell_h)))
+        for row in range(0, num_rows, row_step):
+            y = PADDING + grid_height - (row + .5) * cell_h
+            self.canvas.create_text(left - PADDING, y, text=y_labels[row], anchor=E, fill=colors.fg, font=font)
+        col_step = max(1, int(np.ceil(line_height / cell_w)))
+        for col in range(0, num_cols, col_step):
+            x = left + (col + .5) * cell_w
+            self.canvas.create_text(x, PADDING + grid_height + PADDING, text=x_labels[col], anchor=E, angle=90,
+                                    fill=colors.fg, font=font)
+
+        # Colorbar
+        bar_x0 = left + grid_width + PADDING
+        step_h = grid_height / COLORBAR_STEPS
+        for i, color in enumerate(colorscale_hex(np.linspace(0, 1, COLORBAR_STEPS))):
+            y1 = PADDING + grid_height - i * step_h
+            self.canvas.create_rectangle(bar_x0, y1 - step_h, bar_x0 + COLORBAR_WIDTH, y1, fill=color, outline=color)
+        for value, text in zip(tickvals, ticktext):
+            position = (value - zmin) / (zmax - zmin) if zmax > zmin else 0
+            y = PADDING + grid_height * (1 - min(max(position, 0), 1))
+            self.canvas.create_text(bar_x0 + COLORBAR_WIDTH + PADDING, y, text=text, anchor=W, fill=colors.fg,
+                                    font=font)
+
+    def cell_at(self, x: float, y: float) -> Optional[tuple]:
+        """ :return: The (row, column) of the cell at the canvas coordinates, or None """
+        if self.data is None or self.grid_box is None:
+            return None
+        x0, y0, cell_w, cell_h = self.grid_box
+        num_rows, num_cols = np.shape(self.data.z)
+        col = int((x - x0) // cell_w)
+        row = num_rows - 1 - int((y - y0) // cell_h)
+        if 0 <= row < num_rows and 0 <= col < num_cols and x >= x0 and y >= y0:
+            return row, col
+        return None
+
+    def on_motion(self, event):
+        cell = self.cell_at(event.x, event.y)
+        if cell is None:
+            self.hide_tooltip()
+            return
+        if cell != self.hover_cell:
+            self.hover_cell = cell
+            self.show_tooltip(event.x, event.y, self.data.cell_text(*cell))
+        else:
+            self.move_tooltip(event.x, event.y)
+
+    def show_tooltip(self, x: int, y: int, text: str):
+        colors = ttk.Style.instance.colors
+        self.canvas.delete("tooltip")
+        self.canvas.create_text(0, 0, text=text, anchor=NW, width=HEATMAP_TOOLTIP_WIDTH, fill=colors.selectfg,
+                                tags=("tooltip", "tooltip_text"))
+        x0, y0, x1, y1 = self.canvas.bbox("tooltip_text")
+        self.canvas.create_rectangle(x0 - 4, y0 - 4, x1 + 4, y1 + 4, fill=colors.selectbg, outline=colors.border,
+                                     tags=("tooltip", "tooltip_box"))
+        self.canvas.tag_raise("tooltip_text")
+        self.move_tooltip(x, y)
+
+    def move_tooltip(self, x: int, y: int):
+        bbox = self.canvas.bbox("tooltip")
+        if bbox is None:
+            return
+        x0, y0, x1, y1 = bbox
+        # Next to the mouse pointer, but inside the canvas
+        target_x = x + 15 if x + 15 + (x1 - x0) <= self.canvas.winfo_width() else max(0, x - 15 - (x1 - x0))
+        target_y = min(y + 15, max(0, self.canvas.winfo_height() - (y1 - y0)))
+        self.canvas.move("tooltip", target_x - x0, target_y - y0)
+
+    def hide_tooltip(self):
+        self.hover_cell = None
+        self.canvas.delete("tooltip")
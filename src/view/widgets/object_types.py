@@ -5,7 +5,7 @@ from ttkbootstrap.constants import *
 import random
 
 from view.components.dnd_list import DndList, DndListItem
-from pm4py.visualization.ocel.ocpn.variants.wo_decoration import ot_to_color
+from view.utils import ot_to_color
 
 logger = logging.getLogger("app_logger")
 
@@ -0,0 +1,90 @@
+import logging
+import threading
+from typing import Optional, Tuple
+
+import ttkbootstrap as ttk
+from ttkbootstrap.constants import *
+
+from controller.tasks import CALLBACK_WATCH_DELAY
+from model.cancellation import CancellationToken, TaskCancelled, cancellation_scope
+from model.constants import EXECUTION_PROCESS
+from model.execution import execution_scope
+
+logger = logging.getLogger("app_logger")
+
+
+class SamplingBar(ttk.Frame):
+    """
+    Status bar shown while the analyses run on a sample of the event log.
+    Shows the sample size and the estimated error of the result displayed in the current tab, which is computed in
+    the background (see Model.sampling_error), and a button for switching to the exact results.
+    Estimates requested for a previous tab or sample are cancelled and their results discarded.
+    """
+
+    def __init__(self, master, view, **kwargs):
+        super().__init__(master=master, padding=5, bootstyle=WARNING, **kwargs)
+        self.view = view
+        self.label = ttk.Label(self, bootstyle=(INVERSE, WARNING))
+        self.label.pack(side=LEFT, padx=5)
+        self.btn_exact = ttk.Button(self, text="Compute exact", bootstyle=(LIGHT, OUTLINE),
+                                    command=self.view.controller.compute_exact)
+        self.btn_exact.pack(side=RIGHT, padx=5)
+        self.generation = 0
+        self.token: Optional[CancellationToken] = None
+
+    def update_estimate(self, tab):
+        """ Shows the bar with the error estimate of the tab's sampled result, or hides it if sampling is off """
+        self.generation += 1
+        if self.token is not None:
+            self.token.cancel()
+            self.token = None
+        model = self.view.controller.model
+        if model.sample_fraction is None:
+            self.pack_forget()
+            return
+        self.pack(side=BOTTOM, fill=X, before=self.view.tab_widget)
+
+        sampled = tab.sampled_result() if tab is not None else None
+        self.label.configure(text=f"Preview on a {model.sample_fraction:.0%} sample" +
+                                  (" – estimating error ..." if sampled is not None else ""))
+        if sampled is None:
+            return
+        self.token = token = CancellationToken()
+        response = {}
+        thread = threading.Thread(target=self._estimate, args=(model, sampled, token, response), daemon=True,
+                                  name="sampling_error")
+        thread.start()
+        self.after(CALLBACK_WATCH_DELAY, self._watch, self.generation, thread, response)
+
+    @staticmethod
+    def _estimate(model, sampled: Tuple[str, tuple], token: CancellationToken, response: dict):
+        method_name, args = sampled
+        try:
+            with cancellation_scope(token), execution_scope(EXECUTION_PROCESS):
+                response["estimate"] = model.sampling_error(method_name, *args)
+        except TaskCancelled:
+            pass
+        except Exception as e:
+            logger.warning(f"Sampling error of '{method_name}' could not be estimated: {e}")
+
+    def _watch(self, generation: int, thread: threading.Thread, response: dict):
+        """ Waits for the estimate, then shows it from the main thread (unless a newer estimate was requested) """
+        if generation != self.generation:
+            return
+        if thread.is_alive():
+            self.after(CALLBACK_WATCH_DELAY, self._watch, generation, thread, response)
+            return
+        self.token = None
+        self.show_estimate(response.get("estimate"))
+
+    def show_estimate(self, estimate: Optional[dict]):
+        if not estimate:
+            self.label.configure(text=f"Preview on a {self.view.controller.model.sample_fraction:.0%} sample")
+            return
+        # With a single stratum (all units have the same object types), the sample is a simple random sample
+        design = f"{estimate['strata']} strata" if estimate["strata"] > 1 else "simple random sample"
+        text = f"Sample of {estimate['sampled_units']} of {estimate['population_units']} {estimate['unit']} " \
+               f"({estimate['fraction']:.0%}, {design})"
+        if estimate["relative_error"] is not None:
+            text += f" – estimated error ±{estimate['relative_error']:.1%}"
+        self.label.configure(text=text)
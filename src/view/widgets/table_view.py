@@ -1,8 +1,7 @@
-import ttkbootstrap as ttk
 import logging
-from ttkbootstrap.tableview import Tableview
 from ttkbootstrap.constants import *
 from controller.export import Export
+from view.components.dataframe_table import DataFrameTableview
 
 
 logger = logging.getLogger("app_logger")
@@ -15,14 +14,11 @@ class TableViewWidget:
         self.controller = controller
         self.model = model
         self.master = master
-        self.ocel_df = model.extended_table
+        self.ocel_df = None
 
-        self.dv = Tableview(
+        self.dv = DataFrameTableview(
             master=self.master,
-            paginated=True,
-            searchable=True,
             bootstyle=PRIMARY,
-            autofit=True,
             pagesize=30,
         )
         self.dv.pack(fill=BOTH, expand=YES, padx=10, pady=10) # Tableview is placed
@@ -30,28 +26,17 @@ class TableViewWidget:
 
         self.update_table()
 
-    def get_columns(self):
-        logger.info("Getting columns to present in the table...")
-        column_names = self.ocel_df.columns
-        columns = [{"text": column_name} for column_name in column_names]
-        return columns
-
-    def get_rows(self):
-        rows = [tuple(row) for row in self.ocel_df.values]
-        return rows
-
     def update_table(self):
         logger.info("Updating table according to update ocel...")
-        self.ocel_df = self.model.extended_table
-
         self.controller.init_export(Export("event_log_jsonocel", "jsonocel",
                                            write_to_path=self.controller.model.export_json_ocel, use_dialog=True))
         self.controller.init_export(Export("event_log_csv", "csv",
                                            write_to_path=self.controller.model.export_csv, use_dialog=True))
-        columns = self.get_columns()
-        row_data = self.get_rows()
 
-        self.dv.build_table_data(columns, row_data)
-        self.dv.autofit_columns()
-        self.dv.load_table_data()
+        ocel_df = self.model.extended_table
+        if ocel_df is self.ocel_df:
+            # The cached table of the current filter is unchanged, keep search, sorting and page
+            return
+        self.ocel_df = ocel_df
+        self.dv.set_data(self.ocel_df)
         logger.info("Table Update complete")
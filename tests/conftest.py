@@ -0,0 +1,37 @@
+import shutil
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_DIR / "src"))
+sys.path.insert(0, str(ROOT_DIR / "benchmarks"))
+
+from ocel_generator import generate_ocel, write_ocel
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    """ The app resolves its cache directories relative to the src folder, so each test runs in a fresh one """
+    src = tmp_path / "src"
+    src.mkdir()
+    monkeypatch.chdir(src)
+    return src
+
+
+@pytest.fixture(scope="session")
+def small_log(tmp_path_factory) -> Path:
+    """ A small synthetic event log (.jsonocel) with three object types and five activities """
+    path = tmp_path_factory.mktemp("datasets") / "small.jsonocel"
+    write_ocel(generate_ocel(events=400, objects=120, object_types=3, activities=5, seed=0), str(path))
+    return path
+
+
+@pytest.fixture
+def dataset(small_log, workdir) -> Path:
+    """ A copy of the small event log in the datasets folder of the test's working directory """
+    datasets = workdir.parent / "data" / "datasets"
+    datasets.mkdir(parents=True)
+    shutil.copy(small_log, datasets / small_log.name)
+    return datasets / small_log.name
@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+from model.cache import LruFileStore, PersistentResultCache
+from view.render_cache import LayoutCache, RenderCache
+
+
+def write_bytes(size):
+    def write(path):
+        with open(path, "wb") as f:
+            f.write(b"x" * size)
+    return write
+
+
+def test_store_evicts_least_recently_used(tmp_path):
+    directory = tmp_path / "store"
+    store = LruFileStore(directory, ".bin", max_size=250)
+    for i, key in enumerate(["a", "b"]):
+        os.utime(store.write(key, write_bytes(100)), (i, i))
+    # Reading "a" makes "b" the least recently used file
+    store.touch(store.path("a"))
+    store.write("c", write_bytes(100))
+    assert sorted(path.name for path in directory.iterdir()) == ["a.bin", "c.bin"]
+    store.clear()
+    assert not any(directory.iterdir())
+
+
+def test_store_keeps_no_partial_files(tmp_path):
+    directory = tmp_path / "store"
+    store = LruFileStore(directory, ".bin", max_size=1000)
+
+    def fail(path):
+        write_bytes(10)(path)
+        raise RuntimeError("render failed")
+
+    with pytest.raises(RuntimeError):
+        store.write("a", fail)
+    assert not any(directory.iterdir())
+
+
+def test_result_cache(tmp_path):
+    directory = tmp_path / "results"
+    cache = PersistentResultCache(directory=directory)
+    key = cache.make_key("method", ("arg", 1), None)
+    assert cache.get(key) == (False, None)
+    assert cache.set(key, {"value": [1, 2]})
+    assert cache.get(key) == (True, {"value": [1, 2]})
+    # Values that cannot be pickled are skipped
+    assert not cache.set(cache.make_key("lambda"), lambda: None)
+    assert [path.name for path in directory.iterdir()] == [f"{key}.pkl"]
+
+
+def test_render_and_layout_cache(tmp_path):
+    renders = RenderCache(directory=tmp_path / "renders")
+    calls = []
+
+    def render(path):
+        calls.append(path)
+        write_bytes(10)(path)
+
+    key = renders.make_key("graph", "white")
+    path = renders.render(key, render)
+    assert renders.render(key, render) == path == renders.get_path(key)
+    assert len(calls) == 1 and path.endswith(".png")
+
+    layouts = LayoutCache(directory=tmp_path / "layouts")
+    layout = {"name": "G", "objects": [{"_gvid": 0, "name": "a", "pos": "27,18"}]}
+    assert layouts.layout(key, lambda: layout) == layout
+    assert layouts.layout(key, lambda: pytest.fail("layout recomputed")) == layout
+
+
+def test_store_deletes_files_next_to_the_written_file(tmp_path):
+    directory = tmp_path / "store"
+    store = LruFileStore(directory, ".png", max_size=1000)
+
+    def render(path):
+        # Like graphviz, which saves the DOT source next to the image
+        write_bytes(10)(path + ".gv")
+        write_bytes(10)(path)
+
+    store.write("a", render)
+    assert [path.name for path in directory.iterdir()] == ["a.png"]
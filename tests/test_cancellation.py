@@ -0,0 +1,127 @@
+import threading
+import time
+
+import pytest
+
+from controller.tasks import Task
+from model.cancellation import CancellationToken, TaskCancelled, cancellation_scope, check_cancelled
+from model.constants import BACKEND_PM4PY
+from model.model import Model
+from model.ocel.pm4py import Pm4pyEventLog
+
+TIMEOUT = 10  # [s]
+
+
+@pytest.fixture
+def model(dataset):
+    model = Model({"dataset": dataset.name, "execution_extraction": "connected_components"},
+                  use_persistent_cache=False)
+    model.init_ocel(model.dataset, backend=BACKEND_PM4PY)
+    return model
+
+
+@pytest.fixture
+def blocking_variants(monkeypatch):
+    """ Makes the first computation of the variants block until it is released or cancelled """
+    state = {"calls": 0, "started": threading.Event(), "release": threading.Event()}
+
+    def get_variants(self):
+        state["calls"] += 1
+        if state["calls"] == 1:
+            state["started"].set()
+            while not state["release"].wait(0.01):
+                check_cancelled()
+        return [f"variant {state['calls']}"]
+
+    monkeypatch.setattr(Pm4pyEventLog, "_get_variants", get_variants)
+    return state
+
+
+def request(model, token: CancellationToken, results: dict, name: str) -> threading.Thread:
+    def run():
+        try:
+            with cancellation_scope(token):
+                results[name] = model.variants
+        except TaskCancelled:
+            results[name] = "cancelled"
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread
+
+
+def wait_for_follower(model):
+    """ Waits until a second request is waiting for the single-flight future """
+    key = (model._active_filter_signature, "_get_variants", ())
+    assert key in model._in_flight
+    time.sleep(0.2)
+
+
+def test_cancel_waiting_request(model, blocking_variants):
+    results, leader_token, follower_token = {}, CancellationToken(), CancellationToken()
+    leader = request(model, leader_token, results, "leader")
+    assert blocking_variants["started"].wait(TIMEOUT)
+    follower = request(model, follower_token, results, "follower")
+    wait_for_follower(model)
+
+    follower_token.cancel()
+    follower.join(TIMEOUT)
+    assert results == {"follower": "cancelled"}
+
+    blocking_variants["release"].set()
+    leader.join(TIMEOUT)
+    assert results["leader"] == ["variant 1"]
+    assert model.result_cache["_get_variants"] == ["variant 1"]
+    assert model._in_flight == {}
+
+
+def test_cancel_computing_request(model, blocking_variants):
+    results, leader_token, follower_token = {}, CancellationToken(), CancellationToken()
+    leader = request(model, leader_token, results, "leader")
+    assert blocking_variants["started"].wait(TIMEOUT)
+    follower = request(model, follower_token, results, "follower")
+    wait_for_follower(model)
+
+    leader_token.cancel()
+    leader.join(TIMEOUT)
+    follower.join(TIMEOUT)
+    # The waiting request computes the result itself, the cancelled computation is not cached
+    assert results == {"leader": "cancelled", "follower": ["variant 2"]}
+    assert blocking_variants["calls"] == 2
+    assert model.result_cache["_get_variants"] == ["variant 2"]
+    assert model._in_flight == {}
+
+
+class _Window:
+    """ Runs the watch loop of a task synchronously instead of in the Tk main loop """
+
+    def after(self, delay, func, *args):
+        time.sleep(delay / 1000)
+        func(*args)
+
+
+class _Spinner:
+    def stop(self):
+        pass
+
+    def place_forget(self):
+        pass
+
+
+@pytest.mark.parametrize("fails", [False, True])
+def test_failed_task_skips_callback(monkeypatch, caplog, fails):
+    def compute():
+        if fails:
+            raise ValueError("broken")
+        return 42
+
+    monkeypatch.setattr(Task, "show_spinner", lambda task: setattr(task, "spinner", _Spinner()))
+    results = []
+    task = Task(_Window(), "compute", compute, callback=results.append)
+    task.start()
+    task.join()
+    task.watch()
+    assert task.failed == fails
+    assert results == ([] if fails else [42])
+    if fails:
+        assert "ValueError: broken" in caplog.text
@@ -0,0 +1,26 @@
+import pytest
+
+import cli
+from model.constants import BACKEND_OCPA
+
+
+def test_ocpa_backend_defaults_to_supported_artifacts():
+    args = cli.parse_args(["log.jsonocel", "--backend", BACKEND_OCPA])
+    assert args.artifacts == cli.OCPA_ARTIFACTS
+    assert cli.parse_args(["log.jsonocel"]).artifacts == cli.ARTIFACTS
+
+
+@pytest.mark.parametrize("argv", [["-a", "heatmap"], ["--sample", "0.5"], ["--object-types", "order"]])
+def test_ocpa_backend_rejects_unsupported_options(argv):
+    with pytest.raises(SystemExit):
+        cli.parse_args(["log.jsonocel", "--backend", BACKEND_OCPA] + argv)
+
+
+@pytest.mark.parametrize("no_cache", [False, True])
+def test_no_cache_writes_nothing_to_disk(small_log, workdir, monkeypatch, no_cache):
+    # The CLI resolves the cache directories relative to its own folder
+    monkeypatch.setattr(cli, "__file__", str(workdir / "cli.py"))
+    argv = [str(small_log), "-o", str(workdir.parent / "export"), "-a", "heatmap", "--object-types", "type_0",
+            "type_1", "--sample", "0.5"] + (["--no-cache"] if no_cache else [])
+    assert cli.run(cli.parse_args(argv)) == 0
+    assert (workdir.parent / "cache").exists() != no_cache
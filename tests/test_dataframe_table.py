@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from view.components.dataframe_table import DataFrameTableview, DataFrameView
+
+
+@pytest.fixture
+def df():
+    # 25 rows in 3 groups, the ids give the original order within each group
+    return pd.DataFrame({"id": range(25),
+                         "group": [["b", "a", "c"][i % 3] for i in range(25)],
+                         "value": [float(i) if i % 5 else np.nan for i in range(25)]})
+
+
+def test_pages(df):
+    view = DataFrameView(df, pagesize=10)
+    assert view.num_pages == 3
+    view.goto_page(2)
+    # The last page is partial
+    assert list(view.page_rows()["id"]) == list(range(20, 25))
+    # Pages out of range are clamped
+    view.goto_page(5)
+    assert view.page == 2
+    view.goto_page(-1)
+    assert view.page == 0 and len(view.page_rows()) == 10
+
+
+def test_empty_search_result(df):
+    view = DataFrameView(df, pagesize=10)
+    view.search("no such value")
+    assert view.num_rows == 0 and view.num_pages == 1
+    view.goto_page(1)
+    assert view.page == 0 and view.page_rows().empty
+    # Sorting an empty view
+    view.sort("value")
+    assert view.page_rows().empty
+    assert DataFrameView(pagesize=10).page_rows().empty
+
+
+def test_search_is_case_insensitive(df):
+    view = DataFrameView(df, pagesize=10)
+    view.goto_page(1)
+    view.search("B")
+    assert view.page == 0 and view.num_rows == 9
+    assert list(view.page_rows()["id"]) == list(range(0, 25, 3))
+    view.search("")
+    assert view.num_rows == len(df)
+
+
+def test_sort_is_stable_across_pages(df):
+    view = DataFrameView(df, pagesize=4)
+    view.sort("group")
+    pages = []
+    for page in range(view.num_pages):
+        view.goto_page(page)
+        pages.append(view.page_rows())
+    rows = pd.concat(pages)
+    assert list(rows["group"]) == sorted(df["group"])
+    # Rows of the same group keep their original order, also across page boundaries
+    for _, ids in rows.groupby("group", sort=False)["id"]:
+        assert list(ids) == sorted(ids)
+
+    # Toggling the order, missing values stay last
+    view.sort("value")
+    view.sort("value")
+    assert not view.sort_ascending and view.page == 0
+    view.goto_page(view.num_pages - 1)
+    assert view.page_rows()["value"].isna().all()
+
+
+def test_search_keeps_sort(df):
+    view = DataFrameView(df, pagesize=10)
+    view.sort("id", ascending=False)
+    view.search("c")
+    assert list(view.page_rows()["id"]) == list(range(23, -1, -3))[:10]
+
+
+def test_format_rows():
+    rows = pd.DataFrame({"a": [1, None], "b": [["o1", "o2"], pd.NaT]})
+    assert DataFrameTableview._format_rows(rows) == [(1, ["o1", "o2"]), ("", "")]
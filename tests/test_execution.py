@@ -0,0 +1,97 @@
+import logging
+import os
+import time
+
+import pandas as pd
+import pytest
+
+from controller.scheduler import PRECOMPUTATIONS, PrecomputationScheduler
+from model.constants import BACKEND_OCPA, BACKEND_PM4PY, EXECUTION_PROCESS
+from model import instrumentation
+from model.execution import execution_scope
+from model.model import Model
+
+
+@pytest.fixture(params=[BACKEND_PM4PY, BACKEND_OCPA])
+def model(request, dataset):
+    model = Model({"dataset": dataset.name, "execution_extraction": "connected_components"},
+                  use_persistent_cache=False)
+    model.init_ocel(model.dataset, backend=request.param)
+    yield model
+    model.shutdown()
+
+
+def test_process_execution_matches_thread(model, caplog):
+    expected_frequencies, expected_opera = model.variant_frequencies, model.compute_opera()
+    model.reset_cache()
+    with caplog.at_level(logging.INFO, logger="app_logger"), execution_scope(EXECUTION_PROCESS):
+        assert model.variant_frequencies == expected_frequencies
+        opera = model.compute_opera()
+        model.process_executor.shutdown()
+    for kpi, aggregations in expected_opera.items():
+        for agg, expected in aggregations.items():
+            # ocpa orders the activities by iterating over a set, which differs between processes
+            pd.testing.assert_frame_equal(pd.DataFrame(opera[kpi][agg]).sort_index(),
+                                          pd.DataFrame(expected).sort_index())
+    # The worker opens the event log with the model's backend and passes its log records to the parent
+    assert any(record.getMessage().startswith("Worker") and model.backend in record.getMessage()
+               for record in caplog.records)
+
+
+
+@pytest.mark.parametrize("model", [BACKEND_PM4PY], indirect=True)
+@pytest.mark.parametrize("sample_fraction", [None, 0.5])
+def test_worker_loads_filtered_log(model, caplog, sample_fraction):
+    model.update_active_ot_in_model(model.active_ot[:2])
+    model.update_sample_fraction(sample_fraction)
+    expected = model.variant_frequencies
+    model.reset_cache()
+    with caplog.at_level(logging.INFO, logger="app_logger"), execution_scope(EXECUTION_PROCESS):
+        assert model.variant_frequencies == pytest.approx(expected)
+        model.process_executor.shutdown()
+    # The worker does not load the whole event log
+    messages = [record.getMessage() for record in caplog.records if record.getMessage().startswith("Worker")]
+    assert messages and all("loading filtered" in message for message in messages)
+
+
+@pytest.fixture
+def recording():
+    instrumentation.recorder.clear()
+    instrumentation.enable()
+    yield instrumentation.recorder
+    instrumentation.disable()
+    instrumentation.recorder.clear()
+
+
+@pytest.mark.parametrize("model", [BACKEND_PM4PY], indirect=True)
+def test_worker_spans_are_merged(model, recording):
+    with execution_scope(EXECUTION_PROCESS):
+        model.variant_frequencies
+    events, counters = recording.snapshot()
+    worker_spans = [e for e in events if e["cat"] == "model (worker)" and e["name"] == "_get_variant_frequencies"]
+    assert len(worker_spans) == 1 and worker_spans[0]["pid"] != os.getpid()
+    parent_span = next(e for e in events if e["cat"] == "process" and e["name"] == "_get_variant_frequencies")
+    # The worker's span lies within the parent's span waiting for it
+    assert parent_span["start"] <= worker_spans[0]["start"]
+    assert worker_spans[0]["start"] + worker_spans[0]["dur"] <= parent_span["start"] + parent_span["dur"]
+    # Cache lookups of the parent and the worker
+    assert counters[("cache_miss", "_get_variant_frequencies")] == 2
+    assert "model (worker)" in set(instrumentation.summary()["category"])
+    trace = instrumentation.trace_events()["traceEvents"]
+    assert any(e["pid"] == worker_spans[0]["pid"] and e["ph"] == "M" for e in trace)
+
+
+@pytest.mark.parametrize("model", [BACKEND_PM4PY], indirect=True)
+def test_dependent_precomputations_share_worker(model, recording):
+    nodes = {node: PRECOMPUTATIONS[node] for node in ["heatmap", "cases", "variants", "variant_frequencies"]}
+    scheduler = PrecomputationScheduler(model, nodes=nodes, max_workers=2)
+    scheduler.start()
+    deadline = time.time() + 120
+    while len(scheduler._done) < len(nodes) and time.time() < deadline:
+        time.sleep(0.1)
+    model.process_executor.shutdown()
+    assert scheduler._done == set(nodes)
+    events, _ = recording.snapshot()
+    pids = {e["name"]: e["pid"] for e in events if e["cat"] == "model (worker)"}
+    # The variants are computed by the worker which extracted the process executions
+    assert pids["_get_cases"] == pids["_get_variants"] == pids["_get_variant_frequencies"]
@@ -0,0 +1,66 @@
+from itertools import groupby
+
+import pm4py
+import pytest
+
+from model.execution import ProcessExecutor
+from model.ocel import executions
+from model.ocel.executions import ProcessExecutions, hash_graphs_in_chunks
+from model.ocel.ocpa import OcpaEventLog
+
+
+@pytest.fixture(scope="module")
+def ocel(small_log):
+    return pm4py.read_ocel(str(small_log))
+
+
+def first_events(process_executions):
+    """ The first event of each process execution's leading object """
+    object_index = {oid: i for i, (_, oid) in enumerate(process_executions.objects)}
+    by_object = process_executions.incidence.tocsc()
+    return [by_object[:, object_index[oid]].indices.min() for oid in process_executions.leading_objects]
+
+
+@pytest.mark.parametrize("leading_type", ["type_0", "type_1", "type_2"])
+def test_leading_type_executions_match_ocpa(ocel, leading_type):
+    native = ProcessExecutions(ocel, "leading_type", leading_type)
+    ocpa_log = OcpaEventLog(None, ocel=ocel, execution_extraction="leading_type", leading_type=leading_type).ocel
+    expected = [sorted(case) for case in ocpa_log.process_executions]
+    assert len(native.cases) == len(expected)
+    # ocpa orders leading objects first appearing in the same event by set iteration, compare these as sets
+    start = 0
+    for _, group in groupby(first_events(native)):
+        end = start + len(list(group))
+        assert sorted(native.cases[start:end]) == sorted(expected[start:end])
+        start = end
+    assert dict(zip(native.variants, native.variant_frequencies)) == \
+           dict(zip(ocpa_log.variants, ocpa_log.variant_frequencies))
+
+
+def test_chunks_in_threads_match_single_chunk(ocel, monkeypatch):
+    expected = ProcessExecutions(ocel, "leading_type", "type_1")
+    monkeypatch.setattr(executions, "PROCESS_EXECUTION_CHUNK_SIZE", 7)
+    monkeypatch.setattr(executions, "PROCESS_EXECUTION_THREADS", 3)
+    chunked = ProcessExecutions(ocel, "leading_type", "type_1")
+    assert chunked.cases == expected.cases
+    assert chunked.leading_objects == expected.leading_objects
+    assert [list(objects) for objects in chunked.case_objects] == [list(objects) for objects in expected.case_objects]
+    assert chunked.variants == expected.variants
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_hashing_in_executor_matches_inline(ocel, monkeypatch, max_workers):
+    process_executions = ProcessExecutions(ocel, "connected_components", compute_variants=False)
+    object_types = process_executions.object_types
+    signatures = []
+    for case in range(len(process_executions.cases)):
+        _, labels, edges = process_executions._case_graph(case)
+        signatures.append((tuple(labels), tuple((i, j, ": ".join(object_types[o] for o in shared))
+                                                for i, j, shared in edges)))
+    monkeypatch.setattr(executions, "PROCESS_EXECUTION_CHUNK_SIZE", 5)
+    monkeypatch.setattr(executions, "VARIANT_HASH_PARALLEL_MIN_GRAPHS", 0)
+    executor = ProcessExecutor(max_workers=max_workers)
+    try:
+        assert hash_graphs_in_chunks(signatures, executor) == hash_graphs_in_chunks(signatures)
+    finally:
+        executor.shutdown()
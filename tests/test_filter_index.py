@@ -0,0 +1,82 @@
+import random
+from copy import copy, deepcopy
+
+import pandas as pd
+import pm4py
+import pytest
+
+from model.ocel.filter_index import OcelFilterIndex
+
+COMBINATIONS = 20
+
+
+@pytest.fixture(scope="module")
+def ocel(small_log):
+    return pm4py.read_ocel(str(small_log))
+
+
+def pm4py_filter(ocel, object_types, activities, timestamp):
+    """ The filters of the model, applied with pm4py's filtering functions """
+    ocel = deepcopy(ocel)  # pm4py adds a temporary column to the relations
+    if timestamp is not None:
+        start, end = timestamp
+        ocel = pm4py.filter_ocel_events_timestamp(ocel,
+                                                  start if start is not None else ocel.events["ocel:timestamp"].min(),
+                                                  end if end is not None else ocel.events["ocel:timestamp"].max())
+    if object_types and activities:
+        ot_activities = pm4py.ocel.ocel_object_type_activities(ocel)
+        allowed = {ot: [act for act in activities if act in ot_activities.get(ot, [])] for ot in object_types}
+        ocel = pm4py.filter_ocel_object_types_allowed_activities(ocel, allowed)
+    return ocel
+
+
+def assert_same_log(expected, actual):
+    for table in ["events", "objects", "relations"]:
+        expected_df = getattr(expected, table).drop(columns=["@@temp_column"], errors="ignore")
+        actual_df = getattr(actual, table).drop(columns=["@@temp_column"], errors="ignore")
+        pd.testing.assert_frame_equal(expected_df, actual_df, obj=table)
+
+
+def timestamp_windows(ocel):
+    # Timestamps of events at the quartiles, in the format parsed by pm4py
+    timestamps = ocel.events["ocel:timestamp"].sort_values().reset_index(drop=True)
+    q1, q2, q3 = (timestamps[len(timestamps) * q // 4].strftime("%Y-%m-%d %H:%M:%S") for q in (1, 2, 3))
+    return [None, (q1, q3), (None, q2), (q2, None)]
+
+
+@pytest.mark.parametrize("seed", range(COMBINATIONS))
+def test_filter_index_matches_pm4py(ocel, seed):
+    rng = random.Random(seed)
+    object_types = sorted(ocel.objects["ocel:type"].unique())
+    activities = sorted(ocel.events["ocel:activity"].unique())
+    active_ots = rng.sample(object_types, rng.randint(0, len(object_types)))
+    active_acts = rng.sample(activities, rng.randint(0, len(activities)))
+    timestamp = rng.choice(timestamp_windows(ocel))
+
+    filtered = OcelFilterIndex(ocel).apply(object_types=active_ots, activities=active_acts, timestamp=timestamp)
+    assert_same_log(pm4py_filter(ocel, active_ots, active_acts, timestamp), filtered)
+
+
+@pytest.mark.parametrize("window", range(1, 4))
+def test_timestamp_filter_matches_pm4py(ocel, window):
+    timestamp = timestamp_windows(ocel)[window]
+    filtered = OcelFilterIndex(ocel).apply(timestamp=timestamp)
+    assert 0 < len(filtered.events) < len(ocel.events)
+    assert_same_log(pm4py_filter(ocel, None, None, timestamp), filtered)
+
+
+def test_objects_without_events_are_kept(ocel):
+    isolated = pd.DataFrame({"ocel:oid": ["isolated"], "ocel:type": [ocel.objects["ocel:type"].iloc[0]]})
+    ocel = copy(ocel)
+    ocel.objects = pd.concat([ocel.objects, isolated], ignore_index=True)
+    index = OcelFilterIndex(ocel)
+    object_types = sorted(ocel.objects["ocel:type"].unique())
+    activities = sorted(ocel.events["ocel:activity"].unique())
+    # No filter, or all object types and activities active
+    for filtered in [index.apply(), index.apply(object_types=object_types, activities=activities)]:
+        assert_same_log(ocel, filtered)
+    window = timestamp_windows(ocel)[1]
+    assert "isolated" in set(index.apply(timestamp=window).objects["ocel:oid"])
+    # Filtering out the object type removes the object
+    others = [ot for ot in object_types if ot != isolated["ocel:type"][0]]
+    assert "isolated" not in set(index.apply(object_types=others, activities=activities).objects["ocel:oid"])
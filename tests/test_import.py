@@ -0,0 +1,59 @@
+import os
+
+import pandas as pd
+import pm4py
+import pytest
+
+from model.ocel.jsonocel import read_jsonocel_streaming
+from model.ocel.pm4py import Pm4pyEventLog
+from model.snapshot import load_snapshot, save_snapshot
+
+
+@pytest.fixture(scope="module")
+def reference(small_log):
+    return pm4py.read_ocel(str(small_log))
+
+
+def assert_same_log(expected, actual):
+    for table in ["events", "objects", "relations"]:
+        pd.testing.assert_frame_equal(getattr(expected, table), getattr(actual, table), obj=table)
+    assert expected.globals == actual.globals
+
+
+@pytest.mark.parametrize("chunk_size", [7, 1000])
+def test_streaming_import_matches_pm4py(small_log, reference, chunk_size):
+    pytest.importorskip("ijson")
+    assert_same_log(reference, read_jsonocel_streaming(str(small_log), chunk_size=chunk_size))
+
+
+def test_snapshot_round_trip(dataset, reference, tmp_path):
+    pytest.importorskip("pyarrow")
+    assert save_snapshot(reference, dataset, directory=tmp_path / "snapshots")
+    snapshot = load_snapshot(dataset, directory=tmp_path / "snapshots")
+    assert snapshot is not None
+    assert_same_log(reference, snapshot)
+    assert snapshot.parameters == reference.parameters
+
+
+@pytest.mark.parametrize("change", ["touch", "append"])
+def test_snapshot_invalidated_when_source_changes(dataset, reference, tmp_path, change):
+    pytest.importorskip("pyarrow")
+    directory = tmp_path / "snapshots"
+    assert save_snapshot(reference, dataset, directory=directory)
+    if change == "touch":
+        stat = dataset.stat()
+        os.utime(dataset, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    else:
+        with open(dataset, "a") as f:
+            f.write("\n")
+    assert load_snapshot(dataset, directory=directory) is None
+    # The outdated snapshot is deleted
+    assert not any(directory.iterdir())
+
+
+def test_dataset_import_uses_snapshot(dataset, reference):
+    pytest.importorskip("pyarrow")
+    imported = Pm4pyEventLog(None, dataset=dataset.name)
+    assert load_snapshot(dataset) is not None
+    assert_same_log(reference, imported.ocel)
+    assert_same_log(reference, Pm4pyEventLog(None, dataset=dataset.name).ocel)
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pm4py
+import pytest
+
+from model.ocel import opera
+from model.ocel.filter_index import OcelFilterIndex
+from model.ocel.ocpa import OcpaEventLog
+
+
+@pytest.fixture(scope="module")
+def ocel(small_log):
+    return pm4py.read_ocel(str(small_log))
+
+
+@pytest.fixture(autouse=True)
+def clear_opera_caches():
+    opera._starts_cache.clear()
+    opera._partials_cache.clear()
+    yield
+    opera._starts_cache.clear()
+    opera._partials_cache.clear()
+
+
+def assert_same_kpis(expected, actual):
+    assert set(expected) == set(actual)
+    for kpi in expected:
+        assert set(expected[kpi]) == set(actual[kpi])
+        for agg, df in expected[kpi].items():
+            # ocpa's frames hold objects (None for missing values), the native ones floats (NaN)
+            df = df.astype(float)
+            result = actual[kpi][agg].astype(float)
+            if isinstance(df, pd.DataFrame):
+                result = result.reindex(index=df.index, columns=df.columns)
+            else:
+                result = result.reindex(df.index)
+            assert np.allclose(df.to_numpy(), result.to_numpy(), equal_nan=True, atol=1e-6), (kpi, agg)
+
+
+def test_native_opera_matches_ocpa(ocel):
+    ocpa_kpis = OcpaEventLog(None, ocel=ocel, execution_extraction="connected_components")._compute_opera()
+    # Every measure has values on the log
+    assert all(df.notna().to_numpy().any() for aggs in ocpa_kpis.values() for df in aggs.values())
+    assert_same_kpis(ocpa_kpis, opera.compute_opera(ocel))
+
+
+def test_incremental_opera_matches_full_recomputation(ocel):
+    object_types = sorted(ocel.objects["ocel:type"].unique())
+    activities = sorted(ocel.events["ocel:activity"].unique())
+    steps = [(object_types, activities[1:]), (object_types, activities), (object_types[1:], activities),
+             (object_types, activities[:-1]), (object_types[:-1], activities[1:])]
+    index = OcelFilterIndex(ocel)
+    opera.compute_opera(ocel)
+    for active_ots, active_acts in steps:
+        filtered = index.apply(object_types=active_ots, activities=active_acts)
+        # Reuses the cached start times and partial aggregates of the object types and activities not affected
+        incremental = opera.compute_opera(filtered)
+        assert opera._starts_cache and opera._partials_cache
+        opera._starts_cache.clear()
+        opera._partials_cache.clear()
+        assert_same_kpis(opera.compute_opera(filtered), incremental)
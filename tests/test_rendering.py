@@ -0,0 +1,118 @@
+import shutil
+
+import networkx as nx
+import numpy as np
+import pm4py
+import pytest
+from graphviz import Digraph
+from PIL import Image, ImageChops
+
+from model.ocel.opera import compute_opera
+from view.constants import GRAPH_FONT
+from view import rendering
+from view.render_cache import LayoutCache, RenderCache
+from view.rendering import _kpi_label, advanced_visualizer, graph_layout, render_variant_graph
+
+
+@pytest.mark.parametrize("lagging, pooling, label", [
+    (90000, 3600, "Lagging: 1.0d\nPooling: 1:00h"),
+    (np.nan, 3600, "Pooling: 1:00h"),
+    (90000, None, "Lagging: 1.0d"),
+    (0, np.nan, ""),
+    (None, np.nan, ""),
+])
+def test_kpi_label(lagging, pooling, label):
+    assert _kpi_label(lagging, pooling) == label
+
+
+def test_edge_labels_of_missing_kpis(small_log):
+    ocel = pm4py.read_ocel(str(small_log))
+    ocpn = pm4py.discover_oc_petri_net(ocel)
+    opera = compute_opera(ocel)
+    lagging, pooling = opera["lagging_time"], opera["pooling_time"]
+    # No KPIs of the first object type's activities
+    ot = sorted(ocpn["object_types"])[0]
+    for agg in lagging:
+        lagging[agg][ot] = np.nan
+        pooling[agg][ot] = np.nan
+
+    _, maps = advanced_visualizer(ocpn, lagging, pooling, agg=None)
+    labels = [label for edge in maps["kpi_labels"].values() for label in edge.values()]
+    assert labels and not any("None" in label or "nan" in label for label in labels)
+    # The edges leaving the transitions of the object type have empty labels
+    _, maps = advanced_visualizer({**ocpn, "petri_nets": {ot: ocpn["petri_nets"][ot]}}, lagging, pooling, agg=None)
+    assert maps["kpi_labels"] and all(label == "" for edge in maps["kpi_labels"].values() for label in edge.values())
+
+
+requires_dot = pytest.mark.skipif(shutil.which("dot") is None, reason="graphviz (dot) is not installed")
+
+
+def variant_graph():
+    G = nx.DiGraph()
+    for v, label in enumerate(["create: order", "pack: order: item", "ship: item: delivery", "bill: order"]):
+        G.add_node(v, label=label)
+    G.add_edge(0, 1, label="order")
+    G.add_edge(1, 2, label="item")
+    G.add_edge(1, 3, label="order")
+    return G
+
+
+def direct_render(G, filename, bgcolor, fgcolor, dpi):
+    """ Renders a variant graph with dot in one step, as before layouts were cached """
+    A = Digraph(format="png")
+    for v in sorted(G.nodes):
+        A.node(f"n{v}", label=G.nodes[v]["label"])
+    for (u, v), edge in sorted(G.edges.items()):
+        A.edge(f"n{u}", f"n{v}", label=edge["label"])
+    A.graph_attr.update({"fontname": GRAPH_FONT, "bgcolor": bgcolor, "rankdir": "TB", "dpi": str(dpi)})
+    A.node_attr.update({"fontname": GRAPH_FONT, "fontcolor": fgcolor, "color": fgcolor, "fillcolor": bgcolor,
+                        "shape": "box"})
+    A.edge_attr.update({"fontname": GRAPH_FONT, "fontcolor": fgcolor, "color": fgcolor})
+    return A.render(outfile=filename, view=False)
+
+
+@requires_dot
+def test_graph_layout(tmp_path):
+    A = Digraph("G")
+    A.node("a", label="A")
+    A.node("b", label="B")
+    A.edge("a", "b", id="e0", label="a to b")
+    layout = graph_layout(A)
+    names = {node["_gvid"]: node["name"] for node in layout["objects"]}
+    assert sorted(names.values()) == ["a", "b"]
+    assert all("pos" in node for node in layout["objects"])
+    [edge] = layout["edges"]
+    assert (names[edge["tail"]], names[edge["head"]]) == ("a", "b")
+    assert edge["id"] == "e0" and "pos" in edge and "lp" in edge
+    # The layout is cached by the graph source
+    cache = LayoutCache(directory=tmp_path / "layouts")
+    assert graph_layout(A, cache) == layout
+    assert graph_layout(A, cache) == layout and len(list((tmp_path / "layouts").iterdir())) == 1
+
+
+@requires_dot
+@pytest.mark.parametrize("bgcolor, fgcolor", [("white", "black"), ("#222222", "#eeeeee")])
+def test_render_layout_matches_direct_render(tmp_path, bgcolor, fgcolor):
+    G = variant_graph()
+    expected = direct_render(G, str(tmp_path / "direct.png"), bgcolor, fgcolor, dpi=72)
+    actual = render_variant_graph(G, str(tmp_path / "layout.png"), bgcolor=bgcolor, fgcolor=fgcolor, dpi=72,
+                                  layout_cache=LayoutCache(directory=tmp_path / "layouts"))
+    expected, actual = Image.open(expected).convert("RGB"), Image.open(actual).convert("RGB")
+    assert expected.size == actual.size
+    # json0 rounds the positions to hundredths of points, allow anti-aliasing differences
+    difference = np.asarray(ImageChops.difference(expected, actual), dtype=float)
+    assert difference.mean() < 1
+
+
+@requires_dot
+def test_render_cache_keeps_only_images(tmp_path):
+    G = variant_graph()
+    renders = RenderCache(directory=tmp_path / "renders")
+    layouts = LayoutCache(directory=tmp_path / "layouts")
+    for bgcolor in ["white", "black"]:
+        key = renders.make_key("variant_graph", rendering.variant_graph_content(G), bgcolor)
+        renders.render(key, lambda filename: render_variant_graph(G, filename, bgcolor=bgcolor, dpi=72,
+                                                                  layout_cache=layouts))
+    # No DOT sources or temporary files are left next to the images
+    assert sorted(path.suffix for path in (tmp_path / "renders").iterdir()) == [".png", ".png"]
+    assert [path.suffix for path in (tmp_path / "layouts").iterdir()] == [".json"]
@@ -0,0 +1,96 @@
+from itertools import combinations
+
+import numpy as np
+import pandas as pd
+import pytest
+from pm4py.objects.ocel.obj import OCEL
+from scipy import sparse
+
+from model.constants import BACKEND_PM4PY
+from model.model import Model
+from model.ocel.executions import ProcessExecutions
+from model.ocel.pm4py import Pm4pyEventLog
+from model.sampling import StratifiedSample, inclusion_probabilities
+
+
+@pytest.fixture(params=[("leading_type", "type_0"), ("connected_components", None)])
+def model(request, dataset):
+    execution_extraction, leading_type = request.param
+    settings = {"dataset": dataset.name, "execution_extraction": execution_extraction}
+    if leading_type is not None:
+        settings["leading_type"] = leading_type
+    model = Model(settings, use_persistent_cache=False)
+    model.init_ocel(model.dataset, backend=BACKEND_PM4PY)
+    yield model
+    model.shutdown()
+
+
+def test_inclusion_probabilities():
+    # Two strata of 4 and 3 units, sampling 2 and 1 of them. Units 0-3 and 4-6 contain the events:
+    units = [[0, 1], [1], [2], [], [1, 2], [], []]
+    strata, sizes, samples = np.array([0, 0, 0, 0, 1, 1, 1]), np.array([4, 3]), np.array([2, 1])
+    counts = np.zeros((2, 3))
+    for unit, events in enumerate(units):
+        counts[strata[unit], events] += 1
+    probabilities = inclusion_probabilities(sparse.csr_matrix(counts), sizes, samples)
+
+    # All equally likely samples
+    samples_0, samples_1 = list(combinations(range(4), 2)), list(combinations(range(4, 7), 1))
+    expected = np.zeros(3)
+    for sample in ([*a, *b] for a in samples_0 for b in samples_1):
+        expected[sorted({event for unit in sample for event in units[unit]})] += 1
+    assert np.allclose(probabilities, expected / (len(samples_0) * len(samples_1)))
+
+
+def test_complete_sample_is_exact(model):
+    heatmap, frequencies = model.compute_heatmap()[0], model.variant_frequencies
+    model.update_sample_fraction(1.0)
+    sample = model._ocels[0].sample
+    assert sample.sampled_units == sample.population_units
+    assert (model.compute_heatmap()[0].to_numpy() == heatmap.to_numpy()).all()
+    assert model.variant_frequencies == pytest.approx(frequencies)
+
+
+def test_estimates_are_weighted(model):
+    model.update_sample_fraction(0.3)
+    log = model._ocels[0]
+    sample = log.sample
+    # The weights of the process executions add up to the number of units in the event log
+    weights = sample.execution_weights(log._process_executions())
+    assert weights.sum() == pytest.approx(sample.population_units)
+    assert sum(model.variant_frequencies.values()) == pytest.approx(1)
+    # Events are sampled at least as likely as the units containing them
+    event_weights = sample.event_weights(log.ocel.events[log.ocel.event_id_column])
+    assert (event_weights >= 1).all() and event_weights.max() <= weights.max() + 1e-9
+    assert model.sampling_error("_compute_heatmap")["strata"] == sample.strata >= 1
+
+
+def clusters_log(clusters):
+    """ An event log of separate object clusters, each with one object per given type and two shared events """
+    events, objects, relations = [], [], []
+    for cluster, object_types in enumerate(clusters):
+        for i, activity in enumerate(["create", "close"]):
+            eid = f"e{cluster}_{i}"
+            timestamp = pd.Timestamp("2023-01-01") + pd.Timedelta(hours=2 * cluster + i)
+            events.append({"ocel:eid": eid, "ocel:activity": activity, "ocel:timestamp": timestamp})
+            relations += [{"ocel:eid": eid, "ocel:oid": f"{ot}{cluster}", "ocel:type": ot, "ocel:activity": activity,
+                           "ocel:timestamp": timestamp} for ot in object_types]
+        objects += [{"ocel:oid": f"{ot}{cluster}", "ocel:type": ot} for ot in object_types]
+    return OCEL(events=pd.DataFrame(events), objects=pd.DataFrame(objects), relations=pd.DataFrame(relations))
+
+
+def test_small_strata_are_in_every_group():
+    # 40 clusters of orders, 2 of orders with items: fewer than the random groups
+    ocel = clusters_log([["order"]] * 40 + [["order", "item"]] * 2)
+    sample = StratifiedSample(ocel, 0.2, execution_extraction="connected_components", groups=5)
+    assert sample.strata == 2 and sample.groups == 5
+    # Object types in alphabetical order: item, order
+    exact = Pm4pyEventLog(None, ocel=ocel)._compute_heatmap()[0].to_numpy()
+    for group in range(sample.groups):
+        group_log = sample.log(group)
+        weights = sample.execution_weights(ProcessExecutions(group_log, "connected_components",
+                                                             compute_variants=False), group)
+        assert weights.sum() == pytest.approx(42)
+        # The completely sampled stratum is estimated exactly by every group
+        heatmap = Pm4pyEventLog(None, ocel=group_log, sample=sample, sample_group=group)._compute_heatmap()[0]
+        assert heatmap.to_numpy()[0, 1] == exact[0, 1] == 4